@@ -7,9 +7,10 @@ from .creature_dnd import generate_dnd_pdf
 from .creature_swn import generate_swn_pdf
 from .creature_cofmini import generate_cofmini_pdf
 from .creature_timothee import generate_timothee_pdf
+from .preview import generate_preview
 
 # Pour compatibilité avec l'ancien code
 from .creature_dnd import generate_dnd_pdf as generate_all_creatures_pdf
 
 __version__ = "2.0.0"
-__all__ = ["load_creature", "generate_dnd_pdf", "generate_swn_pdf", "generate_cofmini_pdf", "generate_timothee_pdf", "generate_all_creatures_pdf"]
+__all__ = ["load_creature", "generate_dnd_pdf", "generate_swn_pdf", "generate_cofmini_pdf", "generate_timothee_pdf", "generate_preview", "generate_all_creatures_pdf"]
@@ -0,0 +1,157 @@
+"""
+Tables d'analyse du bestiaire
+
+`bestiary_table` transforme une liste de créatures d'un système en table
+colonnaire (une colonne NumPy par métrique, une ligne par créature) :
+niveau ou FP, points de vie, défense, dégâts moyens par round, points de vie
+effectifs contre des bonus d'attaque typiques, nombre de traits et de
+capacités. Les statistiques de combat viennent de `combat_profile`, les
+valeurs absentes valent NaN.
+
+La table s'écrit en CSV pour les tableurs et en `.npz` (archive NumPy
+compressée, une entrée par colonne) pour un rechargement instantané.
+"""
+
+import csv
+import math
+import re
+
+from .base_generator import parse_swn_title
+from .dice import _numpy
+from .simulation import combat_profile
+
+# Bonus d'attaque typiques pour le calcul des points de vie effectifs
+TYPICAL_ATTACK_BONUSES = (3, 5, 7, 9)
+
+_CR_RE = re.compile(r"^\s*(\d+)(?:\s*/\s*(\d+))?")
+_SWN_LEVEL_RE = re.compile(r"Niv(?:eau|\.)?\s*(\d+)", re.IGNORECASE)
+
+TEXT_COLUMNS = ("name", "type")
+NUMERIC_COLUMNS = (
+    "level", "units", "hit_points", "defense", "attack_bonus", "attacks",
+    "average_damage", "damage_per_round",
+) + tuple(f"ehp_{bonus}" for bonus in TYPICAL_ATTACK_BONUSES) + ("traits", "abilities")
+COLUMNS = TEXT_COLUMNS + NUMERIC_COLUMNS
+
+# Listes comptées comme traits et comme capacités, par système
+TRAIT_FIELDS = {
+    "dnd": ("traits",),
+    "swn": ("capacities",),
+    "cofmini": ("capacites_speciales",),
+    "timothee": ("capacites_speciales",),
+}
+ABILITY_FIELDS = {
+    "dnd": ("actions", "reactions", "legendary_actions"),
+    "swn": ("weapons",),
+    "cofmini": ("attaques",),
+    "timothee": ("attaques",),
+}
+
+
+def hit_probability(attack_bonus, defense):
+    """Probabilité de toucher au d20 (20 touche toujours, 1 rate toujours)"""
+    return min(0.95, max(0.05, (21 - (defense - attack_bonus)) / 20))
+
+
+def creature_level(creature_data, system):
+    """Niveau (COF, SWN) ou facteur de puissance (D&D, « 1/4 » -> 0.25) ; NaN si absent"""
+    if system == "dnd":
+        match = _CR_RE.match(str(creature_data.get("challenge_rating", "")))
+        if not match:
+            return math.nan
+        numerator, denominator = match.groups()
+        return int(numerator) / int(denominator or 1)
+    if system == "swn":
+        match = _SWN_LEVEL_RE.search(str(creature_data.get("title", "")))
+        return int(match.group(1)) if match else math.nan
+    level = creature_data.get("niveau")
+    return float(level) if isinstance(level, (int, float)) else math.nan
+
+
+def creature_display_name(creature_data, system):
+    """Nom court d'une créature (sans le sous-titre SWN)"""
+    if system == "swn":
+        return parse_swn_title(str(creature_data.get("title", "")))[0] or "Créature inconnue"
+    return str(creature_data.get("name", "Créature inconnue"))
+
+
+def _count(creature_data, fields):
+    return sum(len(creature_data.get(field) or []) for field in fields)
+
+
+def creature_metrics(creature_data, system):
+    """Ligne de la table d'analyse pour une créature"""
+    row = dict.fromkeys(NUMERIC_COLUMNS, math.nan)
+    row["name"] = creature_display_name(creature_data, system)
+    row["type"] = str(creature_data.get("type", ""))
+    row["level"] = creature_level(creature_data, system)
+    row["traits"] = _count(creature_data, TRAIT_FIELDS.get(system, ()))
+    row["abilities"] = _count(creature_data, ABILITY_FIELDS.get(system, ()))
+
+    try:
+        combatants = combat_profile(creature_data, system)
+    except ValueError:
+        return row
+
+    unit = combatants[0]
+    units = len(combatants)
+    hit_points = unit.hit_points * units
+    average = unit.damage.average if unit.damage is not None else math.nan
+    row.update(
+        units=units,
+        hit_points=hit_points,
+        defense=unit.defense,
+        attack_bonus=unit.attack_bonus if unit.damage is not None else math.nan,
+        attacks=unit.attacks,
+        average_damage=average,
+        damage_per_round=average * unit.attacks * units,
+    )
+    for bonus in TYPICAL_ATTACK_BONUSES:
+        row[f"ehp_{bonus}"] = hit_points / hit_probability(bonus, unit.defense)
+    return row
+
+
+def bestiary_table(creatures, system):
+    """Table colonnaire {colonne: tableau NumPy} d'une liste de créatures"""
+    np = _numpy()
+    columns = {column: [] for column in COLUMNS}
+    for creature_data in creatures:
+        row = creature_metrics(creature_data, system)
+        for column in COLUMNS:
+            columns[column].append(row[column])
+
+    table = {column: np.array(columns[column], dtype=str) for column in TEXT_COLUMNS}
+    table.update({column: np.array(columns[column], dtype=float) for column in NUMERIC_COLUMNS})
+    return table
+
+
+def write_csv(table, path):
+    """Écrit la table en CSV (valeurs absentes laissées vides)"""
+    columns = [column for column in COLUMNS if column in table]
+    rows = len(table[columns[0]]) if columns else 0
+    with open(path, "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        data = []
+        for column in columns:
+            values = table[column].tolist()
+            if column in NUMERIC_COLUMNS:
+                values = ["" if math.isnan(v) else f"{v:g}" for v in values]
+            data.append(values)
+        writer.writerows(zip(*data) if rows else [])
+    return path
+
+
+def write_columnar(table, path):
+    """Écrit la table au format colonnaire binaire (.npz compressé)"""
+    np = _numpy()
+    with open(path, "wb") as f:
+        np.savez_compressed(f, **table)
+    return path
+
+
+def read_columnar(path):
+    """Relit une table écrite par write_columnar"""
+    np = _numpy()
+    with np.load(path) as archive:
+        return {column: archive[column] for column in archive.files}
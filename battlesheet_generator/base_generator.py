@@ -1,5 +1,17 @@
+import copy
 import json
+import os
+from datetime import datetime, timezone
+from pathlib import Path
+from fontTools import ttLib
 from fpdf import FPDF
+from fpdf.fonts import TTFFont, SubsetMap
+from .portraits import get_portrait, portrait_dimensions, PORTRAIT_SIZE_MM
+from .dice import format_with_average
+from .sizeprofile import profiled_section, SizeProfile
+from .guards import render_guard
+from .navigation import Navigation
+from .draft import DraftFPDF, add_draft_fonts, draft_multi_cell
 
 # Constantes communes
 A6_WIDTH_MM = 105
@@ -9,6 +21,19 @@ FONT_BOLD_PATH = "fonts/DejaVuSans-Bold.ttf"
 FONT_CAESAR_PATH = "fonts/CaesarDressing-Regular.ttf"
 FONT_ORBITRON_PATH = "fonts/Orbitron-Regular.ttf"
 FONT_ORBITRON_BOLD_PATH = "fonts/Orbitron-Bold.ttf"
+BODY_FONT_SIZE = 7  # Taille de référence du corps de texte (pt)
+
+# Polices du document : (famille, style, fichier)
+CARD_FONTS = (
+    ("DejaVu", "", FONT_PATH),
+    ("DejaVu", "B", FONT_BOLD_PATH),
+    ("Caesar", "", FONT_CAESAR_PATH),
+    ("Orbitron", "", FONT_ORBITRON_PATH),
+    ("Orbitron", "B", FONT_ORBITRON_BOLD_PATH),
+)
+
+# Polices analysées une fois par processus : (famille, style) -> TTFFont modèle
+_font_templates = {}
 
 def safe_text(text):
     """Nettoie le texte des caractères problématiques si nécessaire"""
@@ -16,6 +41,37 @@ def safe_text(text):
         return ', '.join(str(item) for item in text)
     return str(text)
 
+def card_scale(pdf):
+    """Échelle du texte de la carte en cours (1.0 sauf en mode ajustement)"""
+    return getattr(pdf, "text_scale", 1.0)
+
+def scaled(pdf, value):
+    """Applique l'échelle de la carte à une hauteur de ligne ou un espacement (mm)"""
+    return value * card_scale(pdf)
+
+def set_card_font(pdf, family, style="", size=BODY_FONT_SIZE):
+    """Sélectionne une police dont la taille suit l'échelle de la carte"""
+    pdf.set_font(family, style, size=size * card_scale(pdf))
+
+def card_option(pdf, name, default=None):
+    """Valeur d'une option de rendu des cartes (voir create_pdf_base)"""
+    return getattr(pdf, "card_options", {}).get(name, default)
+
+def is_draft(pdf):
+    """Vrai en mode brouillon : décorations simplifiées (voir draft.py)"""
+    return bool(card_option(pdf, "draft"))
+
+def format_damage_text(damage, options=None):
+    """Texte de dégâts, suivi de la moyenne si l'option de rendu dice_average est active"""
+    text = safe_text(damage)
+    if (options or {}).get("dice_average"):
+        return format_with_average(text)
+    return text
+
+def format_damage(pdf, damage):
+    """Texte de dégâts de la carte, suivi de la moyenne si l'option dice_average est active"""
+    return format_damage_text(damage, getattr(pdf, "card_options", None))
+
 def safe_multi_cell(pdf, width, height, text, border=0):
     """Cellule multi-ligne avec gestion sécurisée du texte"""
     if not text or text.strip() == "":
@@ -31,35 +87,39 @@ def safe_multi_cell(pdf, width, height, text, border=0):
     # S'assurer que nous sommes à la marge gauche
     pdf.set_x(pdf.l_margin)
     
-    # Utiliser multi_cell avec la largeur calculée
-    pdf.multi_cell(actual_width, height, text_str, border=border)
+    # Utiliser multi_cell avec la largeur calculée (découpage rapide en brouillon)
+    if is_draft(pdf):
+        draft_multi_cell(pdf, actual_width, height, text_str, border=border)
+    else:
+        pdf.multi_cell(actual_width, height, text_str, border=border)
 
+@profiled_section
 def draw_section_title(pdf, title):
     """Dessine un titre de section professionnel avec une ligne de séparation"""
     # Espacement avant le titre
-    pdf.ln(2)
+    pdf.ln(scaled(pdf, 2))
     
     # Configuration pour le titre (plus grand et en bleu foncé)
-    pdf.set_font("DejaVu", size=10)
+    set_card_font(pdf, "DejaVu", size=10)
     pdf.set_text_color(0, 0, 139)  # Bleu foncé (DarkBlue)
     
     # Calculer la position pour centrer ou aligner à gauche
     title_width = pdf.get_string_width(title)
     
     # Option 1: Titre avec ligne de séparation à droite
-    pdf.cell(title_width + 4, 4, title, ln=False)
+    pdf.cell(title_width + 4, scaled(pdf, 4), title, ln=False)
     
     # Ligne de séparation à droite du titre
     remaining_width = pdf.w - pdf.l_margin - pdf.r_margin - title_width - 4
-    if remaining_width > 0:
+    if remaining_width > 0 and not is_draft(pdf):
         pdf.set_draw_color(100, 100, 100)  # Gris foncé
-        current_y = pdf.get_y() + 2
+        current_y = pdf.get_y() + scaled(pdf, 2)
         pdf.line(pdf.get_x(), current_y, pdf.get_x() + remaining_width, current_y)
     
-    pdf.ln(4)
+    pdf.ln(scaled(pdf, 4))
     
     # Retour à la police normale et couleur noire
-    pdf.set_font("DejaVu", size=8)
+    set_card_font(pdf, "DejaVu", size=8)
     pdf.set_text_color(0, 0, 0)  # Noir
 
 def load_creature(filepath):
@@ -67,37 +127,128 @@ def load_creature(filepath):
     with open(filepath, "r", encoding="utf-8") as f:
         return json.load(f)
 
-def create_pdf_base():
-    """Crée un PDF de base avec les polices configurées"""
-    pdf = FPDF(format=(A6_WIDTH_MM, A6_HEIGHT_MM))
+def reproducible_creation_date():
+    """Date de création fixée par SOURCE_DATE_EPOCH (builds reproductibles), ou None"""
+    epoch = os.environ.get("SOURCE_DATE_EPOCH")
+    if not epoch:
+        return None
+    return datetime.fromtimestamp(int(epoch), tz=timezone.utc)
+
+def add_cached_font(pdf, family, style, path):
+    """Ajoute une police au PDF sans réanalyser le fichier TTF à chaque document
+
+    Les métriques (largeurs, cmap, descripteur) sont lues une fois par
+    processus puis partagées. Chaque document reçoit son propre objet
+    fontTools, chargé paresseusement, et sa propre table de sous-ensemble,
+    car fpdf modifie les deux lors de l'écriture.
+    """
+    key = (family.lower(), style)
+    template = _font_templates.get(key)
+    if template is None:
+        template = TTFFont(pdf, Path(path), f"{family.lower()}{style}", style)
+        _font_templates[key] = template
+
+    font = copy.copy(template)
+    font.i = len(pdf.fonts) + 1
+    font.ttfont = ttLib.TTFont(font.ttffile, recalcTimestamp=False, fontNumber=0, lazy=True)
+    font.missing_glyphs = []
+    font.subset = SubsetMap(font)
+    pdf.fonts[font.fontkey] = font
+
+def create_pdf_base(options=None):
+    """Crée un PDF de base avec les polices configurées
+
+    `options` est un dictionnaire d'options de rendu lues par les sections
+    (par exemple {"dice_average": True} pour afficher la moyenne des dégâts).
+    Avec {"size_report": True}, le PDF porte un `SizeProfile` (pdf.size_profile) ;
+    "time_budget", "isolate" ou "limits" y ajoutent un `RenderGuard`
+    (pdf.render_guard, voir guards.py) et {"toc": True} une `Navigation`
+    (index, signets et destinations nommées, pdf.navigation).
+    Avec {"draft": True}, le PDF est un brouillon rapide : polices standard aux
+    largeurs des vraies polices, flux non compressés (voir draft.py).
+
+    Si SOURCE_DATE_EPOCH est défini, la date de création est fixée : l'identifiant
+    du fichier étant dérivé du contenu et de cette date, des entrées identiques
+    produisent alors un PDF identique à l'octet près.
+    """
+    options = dict(options or {})
+    pdf = (DraftFPDF if options.get("draft") else FPDF)(format=(A6_WIDTH_MM, A6_HEIGHT_MM))
     pdf.set_auto_page_break(auto=True, margin=5)
+    pdf.card_options = options
+    if pdf.card_options.get("size_report"):
+        pdf.size_profile = SizeProfile()
+    guard = render_guard(pdf.card_options)
+    if guard:
+        pdf.render_guard = guard
+    if pdf.card_options.get("toc"):
+        pdf.navigation = Navigation()
+    
+    creation_date = reproducible_creation_date()
+    if creation_date:
+        pdf.set_creation_date(creation_date)
     
-    # Ajouter les polices
-    pdf.add_font("DejaVu", "", FONT_PATH, uni=True)
-    pdf.add_font("DejaVu", "B", FONT_BOLD_PATH, uni=True)
-    pdf.add_font("Caesar", "", FONT_CAESAR_PATH, uni=True)
-    pdf.add_font("Orbitron", "", FONT_ORBITRON_PATH, uni=True)
-    pdf.add_font("Orbitron", "B", FONT_ORBITRON_BOLD_PATH, uni=True)
+    if options.get("draft"):
+        pdf.set_compression(False)
+        add_draft_fonts(pdf)
+    else:
+        # Ajouter les polices (analysées une seule fois par processus)
+        for family, style, path in CARD_FONTS:
+            add_cached_font(pdf, family, style, path)
     pdf.set_font("DejaVu", size=8)
     
     return pdf
 
-def draw_creature_title(pdf, name, creature_type=""):
+def begin_portrait(pdf, portrait):
+    """Dessine la vignette en haut à gauche de la carte et décale la marge gauche pour le titre
+
+    Retourne l'état à passer à end_portrait, ou None si la créature n'a pas de portrait.
+    """
+    image_path = get_portrait(portrait)
+    if not image_path:
+        return None
+
+    width, height = portrait_dimensions(image_path)
+    top = pdf.get_y()
+    left_margin = pdf.l_margin
+    x = left_margin + (PORTRAIT_SIZE_MM - width) / 2
+    if is_draft(pdf):
+        # Brouillon : simple cadre à la place de l'image
+        pdf.rect(x, top, width, height)
+    else:
+        pdf.image(image_path, x=x, y=top, w=width, h=height)
+    pdf.set_left_margin(left_margin + PORTRAIT_SIZE_MM + 2)
+    pdf.set_x(pdf.l_margin)
+    return left_margin, top + PORTRAIT_SIZE_MM + 1
+
+def end_portrait(pdf, state):
+    """Restaure la marge gauche et place le curseur sous la vignette"""
+    if state is None:
+        return
+
+    left_margin, bottom = state
+    pdf.set_left_margin(left_margin)
+    pdf.set_xy(left_margin, max(pdf.get_y(), bottom))
+
+@profiled_section
+def draw_creature_title(pdf, name, creature_type="", portrait=None):
     """Dessine le titre de la créature (nom + type)"""
     pdf.add_page()
+    portrait_state = begin_portrait(pdf, portrait)
     
     # Titre en rouge avec la police CaesarDressing
-    pdf.set_font("Caesar", size=12)
+    set_card_font(pdf, "Caesar", size=12)
     pdf.set_text_color(200, 0, 0)  # Rouge
-    pdf.cell(0, 6, safe_text(name), ln=True, align="C")
+    pdf.cell(0, scaled(pdf, 6), safe_text(name), ln=True, align="C")
     
     # Remettre la couleur en noir et la police DejaVu pour le reste
     pdf.set_text_color(0, 0, 0)  # Noir
-    pdf.set_font("DejaVu", size=7)
+    set_card_font(pdf, "DejaVu", size=7)
     
     if creature_type:
-        pdf.cell(0, 4, f"Type : {creature_type}", ln=True, align="C")
-        pdf.ln(2)
+        pdf.cell(0, scaled(pdf, 4), f"Type : {creature_type}", ln=True, align="C")
+        pdf.ln(scaled(pdf, 2))
+
+    end_portrait(pdf, portrait_state)
 
 def wrap_text_to_lines(text, max_chars_per_line=45, max_lines=2):
     """Découpe un texte en lignes en respectant les mots et une limite de caractères/lignes"""
@@ -157,58 +308,82 @@ def parse_swn_title(title):
     # Si aucun séparateur trouvé, tout est considéré comme le nom
     return title.strip(), ""
 
-def draw_creature_title_swn(pdf, full_title, role=""):
+def swn_title_lines(full_title, role=""):
+    """(nom, lignes du sous-titre ou None, lignes du rôle ou None) d'un titre SWN"""
+    name, subtitle = parse_swn_title(full_title)
+    subtitle_lines = None
+    if subtitle:
+        # Orbitron est plus large : moins de caractères par ligne
+        subtitle_lines = [line for line in wrap_text_to_lines(subtitle, max_chars_per_line=40, max_lines=2) if line.strip()]
+    role_lines = None
+    if role:
+        role_lines = [line for line in wrap_text_to_lines(role, max_chars_per_line=55, max_lines=2) if line.strip()]
+    return name, subtitle_lines, role_lines
+
+def draw_creature_title_swn(pdf, full_title, role="", portrait=None):
     """Dessine le titre d'une créature SWN avec un style moderne/sci-fi utilisant Orbitron"""
+    name, subtitle_lines, role_lines = swn_title_lines(full_title, role)
+    draw_scifi_title(pdf, name, subtitle_lines, role_lines, portrait)
+
+@profiled_section
+def draw_scifi_title(pdf, name, subtitle_lines=None, role_lines=None, portrait=None):
+    """Dessine un titre sci-fi (Orbitron) à partir de lignes déjà découpées (voir swn_title_lines)"""
     pdf.add_page()
-    
-    # Parser le titre pour séparer nom et sous-titre
-    name, subtitle = parse_swn_title(full_title)
+    portrait_state = begin_portrait(pdf, portrait)
     
     # Titre principal avec Orbitron Bold en couleur cyan/bleu pour un look sci-fi authentique
-    pdf.set_font("Orbitron", "B", size=12)
+    set_card_font(pdf, "Orbitron", "B", size=12)
     pdf.set_text_color(0, 150, 200)  # Cyan/bleu technologique
-    pdf.cell(0, 6, safe_text(name), ln=True, align="C")
+    pdf.cell(0, scaled(pdf, 6), safe_text(name), ln=True, align="C")
     
     # Ligne décorative sous le titre principal pour effet sci-fi
-    pdf.set_draw_color(0, 150, 200)  # Même couleur que le titre
-    line_y = pdf.get_y() - 1
-    margin = 20  # Marges pour que la ligne ne prenne pas toute la largeur
-    pdf.line(pdf.l_margin + margin, line_y, pdf.w - pdf.r_margin - margin, line_y)
+    if not is_draft(pdf):
+        pdf.set_draw_color(0, 150, 200)  # Même couleur que le titre
+        line_y = pdf.get_y() - scaled(pdf, 1)
+        margin = 20  # Marges pour que la ligne ne prenne pas toute la largeur
+        pdf.line(pdf.l_margin + margin, line_y, pdf.w - pdf.r_margin - margin, line_y)
     
     # Remettre la couleur en noir et la police DejaVu pour le reste
     pdf.set_text_color(0, 0, 0)  # Noir
-    pdf.set_font("DejaVu", size=7)
-    pdf.ln(2)  # Espacement après la ligne
+    set_card_font(pdf, "DejaVu", size=7)
+    pdf.ln(scaled(pdf, 2))  # Espacement après la ligne
     
-    # Afficher le sous-titre sur maximum 2 lignes avec Orbitron Regular
-    if subtitle:
+    # Sous-titre sur maximum 2 lignes avec Orbitron Regular
+    if subtitle_lines is not None:
         # Sous-titre en gris foncé avec Orbitron Regular pour cohérence
         pdf.set_text_color(60, 60, 60)  # Gris foncé
-        pdf.set_font("Orbitron", size=7)
-        
-        # Découper le sous-titre en lignes (Orbitron est plus large, donc moins de caractères)
-        subtitle_lines = wrap_text_to_lines(subtitle, max_chars_per_line=40, max_lines=2)
-        
+        set_card_font(pdf, "Orbitron", size=7)
         for line in subtitle_lines:
-            if line.strip():  # Ne pas afficher les lignes vides
-                pdf.cell(0, 4, safe_text(line), ln=True, align="C")
+            pdf.cell(0, scaled(pdf, 4), safe_text(line), ln=True, align="C")
     
-    # Afficher le rôle s'il existe avec un style sci-fi
-    if role:
-        pdf.set_font("DejaVu", size=6)  # Plus petit
+    # Rôle avec un style sci-fi
+    if role_lines is not None:
+        set_card_font(pdf, "DejaVu", size=6)  # Plus petit
         pdf.set_text_color(100, 100, 100)  # Gris moyen pour différencier du sous-titre
         
         # Ajouter un petit espacement avant le rôle
-        pdf.ln(1)
-        
-        # Découper le rôle aussi s'il est trop long
-        role_lines = wrap_text_to_lines(role, max_chars_per_line=55, max_lines=2)
+        pdf.ln(scaled(pdf, 1))
         for line in role_lines:
-            if line.strip():
-                pdf.cell(0, 3, safe_text(line), ln=True, align="C")
+            pdf.cell(0, scaled(pdf, 3), safe_text(line), ln=True, align="C")
         
         # Remettre les paramètres par défaut
-        pdf.set_font("DejaVu", size=7)
+        set_card_font(pdf, "DejaVu", size=7)
         pdf.set_text_color(0, 0, 0)
     
-    pdf.ln(2)
+    pdf.ln(scaled(pdf, 2))
+
+    end_portrait(pdf, portrait_state)
+
+def draw_placeholder_card(pdf, name, reason):
+    """Carte de remplacement d'une fiche qui n'a pas pu être rendue"""
+    pdf.add_page()
+    set_card_font(pdf, "DejaVu", "B", size=12)
+    pdf.set_text_color(120, 120, 120)  # Gris
+    pdf.cell(0, 8, safe_text(name) or "Créature inconnue", ln=True, align="C")
+
+    set_card_font(pdf, "DejaVu", size=8)
+    pdf.cell(0, 5, "Fiche indisponible", ln=True, align="C")
+    pdf.ln(4)
+    pdf.set_x(pdf.l_margin)
+    pdf.multi_cell(0, 4, safe_text(reason)[:300], align="C")
+    pdf.set_text_color(0, 0, 0)  # Noir
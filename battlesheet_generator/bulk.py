@@ -0,0 +1,202 @@
+"""
+Entrées en masse : tableaux JSON, JSON Lines et entrée standard
+
+Un export de base de données tient souvent dans un seul gros fichier. En
+plus des fiches individuelles (un objet JSON par fichier), le chargement
+accepte :
+
+- un fichier `.json` contenant un tableau de créatures ;
+- un fichier `.jsonl` / `.ndjson` (une créature par ligne) ;
+- l'entrée standard (`-`), tableau JSON ou JSON Lines.
+
+Les fichiers sont lus par blocs et découpés enregistrement par
+enregistrement : seul le texte de l'enregistrement en cours est en mémoire,
+quelle que soit la taille du fichier. Chaque enregistrement est numéroté
+(à partir de 1, la ligne pour JSON Lines) pour situer les erreurs.
+"""
+
+import io
+import json
+import re
+import sys
+from pathlib import Path
+
+# Source désignant l'entrée standard
+STDIN = "-"
+
+# Extensions des fichiers JSON Lines
+JSON_LINES_SUFFIXES = (".jsonl", ".ndjson")
+
+# Motifs des fichiers de créatures d'un dossier
+CREATURE_PATTERNS = ("*.json",) + tuple(f"*{suffix}" for suffix in JSON_LINES_SUFFIXES)
+
+# Taille des blocs lus (caractères)
+CHUNK_SIZE = 1 << 16
+
+# Caractères structurants d'un tableau JSON, et fin d'une chaîne ouverte
+_STRUCTURE_RE = re.compile(r'["\[\]{},]')
+_STRING_END_RE = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_SPACE_RE = re.compile(r"[ \t\r\n]*")
+_DECODER = json.JSONDecoder()
+
+
+class BulkInputError(ValueError):
+    """Fichier en masse mal formé ou enregistrement invalide"""
+
+
+def is_stdin(source):
+    return str(source) == STDIN
+
+
+def record_label(source, number):
+    """Libellé d'un enregistrement dans les événements : 'export.jsonl#12'"""
+    return f"{'stdin' if is_stdin(source) else source}#{number}"
+
+
+def _first_char(text):
+    return text.lstrip("\ufeff \t\r\n")[:1]
+
+
+def is_bulk_source(source):
+    """Vrai pour l'entrée standard, un fichier JSON Lines ou un fichier contenant un tableau JSON"""
+    if is_stdin(source) or Path(source).suffix.lower() in JSON_LINES_SUFFIXES:
+        return True
+    with open(source, "r", encoding="utf-8") as f:
+        head = f.read(256)
+        while head and not _first_char(head):
+            head = f.read(256)
+    return _first_char(head) == "["
+
+
+def _json_lines(head, stream):
+    """Lignes non vides (numéro de ligne, texte), `head` étant le début déjà lu du flux"""
+    lines = head.split("\n")
+    tail = lines.pop()
+    number = 0
+    for number, line in enumerate(lines, 1):
+        if line.strip():
+            yield number, line
+    for line in stream:
+        if tail:
+            line, tail = tail + line, ""
+        number += 1
+        if line.strip():
+            yield number, line
+    if tail.strip():
+        yield number + 1, tail
+
+
+def _scan_element(buffer, start, stream, chunk_size, number):
+    """Cherche la fin de l'élément commençant à `start`, en lisant d'autres blocs au besoin
+
+    Retourne (texte, séparateur ',' ou ']', tampon, début de l'élément suivant).
+    """
+    pos = start
+    depth = 0
+    while True:
+        match = _STRUCTURE_RE.search(buffer, pos)
+        string_end = None
+        if match is not None and match.group() == '"':
+            string_end = _STRING_END_RE.match(buffer, match.end())
+        if match is None or (match.group() == '"' and string_end is None):
+            # Élément incomplet : lire le bloc suivant, sans garder les éléments déjà lus
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                raise BulkInputError(f"enregistrement {number + 1}: tableau JSON non terminé")
+            pos = (len(buffer) if match is None else match.start()) - start
+            buffer, start = buffer[start:] + chunk, 0
+            continue
+
+        token = match.group()
+        pos = match.end()
+        if token == '"':
+            pos = string_end.end()
+        elif token in "[{":
+            depth += 1
+        elif depth:
+            if token != ",":
+                depth -= 1
+        elif token == "}":
+            raise BulkInputError(f"enregistrement {number + 1}: '}}' inattendu")
+        else:
+            # Virgule ou crochet fermant au niveau du tableau : fin de l'élément
+            return buffer[start:match.start()].strip(), token, buffer, pos
+
+
+def _json_array(head, stream, chunk_size):
+    """Éléments (numéro, texte) d'un tableau JSON lu par blocs"""
+    buffer = head.lstrip("\ufeff \t\r\n")[1:]
+    start = 0
+    number = 0
+    while True:
+        # Voie rapide : élément complet dans le tampon, suivi de son séparateur
+        first = _SPACE_RE.match(buffer, start).end()
+        try:
+            end = _DECODER.raw_decode(buffer, first)[1]
+        except json.JSONDecodeError:
+            end = None
+        separator = _SPACE_RE.match(buffer, end).end() if end is not None else len(buffer)
+        if separator < len(buffer) and buffer[separator] in ",]":
+            text, token, start = buffer[first:end], buffer[separator], separator + 1
+        else:
+            text, token, buffer, start = _scan_element(buffer, start, stream, chunk_size, number)
+
+        if token == "," or text or number:
+            number += 1
+            yield number, text
+        if token == "]":
+            rest = buffer[start:]
+            while not rest.strip():
+                rest = stream.read(chunk_size)
+                if not rest:
+                    return
+            raise BulkInputError(f"contenu inattendu après la fin du tableau (après l'enregistrement {number})")
+
+
+def iter_records(source, chunk_size=CHUNK_SIZE):
+    """Enregistrements (numéro, texte JSON) d'un fichier en masse ou de l'entrée standard
+
+    Le format est déduit de l'extension (JSON Lines) ou du premier caractère
+    (`[` pour un tableau JSON). Lève BulkInputError si la structure du
+    fichier est invalide ; le texte de chaque enregistrement est analysé par
+    l'appelant (`parse_record`).
+    """
+    if is_stdin(source):
+        stream = io.TextIOWrapper(sys.stdin.buffer, encoding="utf-8")
+    else:
+        stream = open(source, "r", encoding="utf-8")
+    try:
+        head = stream.read(chunk_size)
+        while head and not _first_char(head):
+            chunk = stream.read(chunk_size)
+            if not chunk:
+                break
+            head += chunk
+        if not is_stdin(source) and Path(source).suffix.lower() in JSON_LINES_SUFFIXES:
+            yield from _json_lines(head, stream)
+        elif _first_char(head) == "[":
+            yield from _json_array(head, stream, chunk_size)
+        elif is_stdin(source):
+            yield from _json_lines(head, stream)
+        else:
+            raise BulkInputError("le fichier doit contenir un tableau JSON")
+    finally:
+        if is_stdin(source):
+            # Ne pas fermer l'entrée standard avec l'enveloppe texte
+            stream.detach()
+        else:
+            stream.close()
+
+
+def parse_record(text, limits=None):
+    """Analyse un enregistrement ; avec `limits` (guards.Limits), applique les garde-fous"""
+    if not text.strip():
+        raise BulkInputError("enregistrement vide")
+    if limits is not None:
+        from .guards import parse_guarded_creature
+
+        return parse_guarded_creature(text, limits)
+    creature_data = json.loads(text)
+    if not isinstance(creature_data, dict):
+        raise BulkInputError("l'enregistrement doit être un objet JSON")
+    return creature_data
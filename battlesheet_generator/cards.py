@@ -0,0 +1,216 @@
+"""
+Représentation intermédiaire des cartes
+
+Chaque système compile une créature en carte : une liste de blocs stylés,
+indépendants du système et de la surface de dessin. Une carte ne contient
+que des dictionnaires, listes, textes et nombres ; elle se sérialise donc
+telle quelle en JSON. Types de blocs :
+
+- `title` / `scifi_title` : titre de la carte (nom, type ou sous-titre et
+  rôle déjà découpés en lignes, portrait) ;
+- `section` : groupe de blocs nommé, mesuré par le profil de taille ;
+- `heading` : titre de section ;
+- `columns` : lignes clé-valeur sur deux colonnes ;
+- `table` : tableau de cellules encadrées et centrées ;
+- `entry` : paragraphe étiqueté (étiquette en gras, lignes de texte) ;
+- `paragraph` / `line` : texte sur plusieurs lignes ou sur une seule ;
+- `space` : espacement vertical.
+
+Les hauteurs (mm) et tailles de police (pt) sont celles de l'échelle 1 ;
+`draw_card` applique l'échelle de la carte en cours. L'interprétation des
+données (champs absents, 'N/A', « Nom : description », allonge ou portée,
+moyenne des dés...) a lieu une fois, à la compilation : re-rendu, mise en
+page d'ajustement, brouillon et aperçu SVG repartent de la même carte,
+mémorisée par empreinte du contenu de la fiche et des options qui la
+modifient. Ce cache vit en mémoire, pour la durée du processus : les cartes
+ne sont pas conservées d'une exécution à l'autre. Avec l'option `hyphenate`, les textes des paragraphes et des
+entrées reçoivent à la compilation leurs coupures françaises (voir
+hyphenation.py).
+"""
+
+import hashlib
+import json
+
+from .base_generator import (
+    draw_creature_title, draw_scifi_title, draw_section_title, safe_multi_cell, set_card_font, scaled,
+)
+from .hyphenation import hyphenate_text
+from .memo import LruCache
+from .sizeprofile import profiled
+
+# Options de rendu qui changent le contenu compilé d'une carte
+CARD_CONTENT_OPTIONS = ("dice_average", "hyphenate")
+
+# Cartes compilées : empreinte -> carte (les moins récemment utilisées sont oubliées)
+CARD_CACHE_SIZE = 4096
+_card_cache = LruCache(CARD_CACHE_SIZE)
+
+
+def card_cache_key(system, creature_data, options=None):
+    """Empreinte SHA-256 d'une fiche, de son système et des options qui modifient sa carte"""
+    options = options or {}
+    relevant = {name: options[name] for name in CARD_CONTENT_OPTIONS if name in options}
+    payload = json.dumps([system, relevant, creature_data], sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def compiled_card(pdf, system, creature_data, compile_func):
+    """Carte d'une fiche pour les options de `pdf`, compilée une seule fois par contenu"""
+    options = getattr(pdf, "card_options", None) or {}
+    key = card_cache_key(system, creature_data, options)
+    card = _card_cache.get(key)
+    if card is None:
+        card = compile_func(creature_data, options)
+        if options.get("hyphenate"):
+            card = hyphenate_blocks(card)
+        _card_cache[key] = card
+    return card
+
+
+def hyphenate_blocks(blocks):
+    """Copie des blocs dont les paragraphes et les lignes d'entrées portent leurs coupures"""
+    result = []
+    for block in blocks:
+        if block["kind"] == "section":
+            block = dict(block, blocks=hyphenate_blocks(block["blocks"]))
+        elif block["kind"] == "paragraph":
+            block = dict(block, text=hyphenate_text(block["text"]))
+        elif block["kind"] == "entry":
+            block = dict(block, lines=[hyphenate_text(text) for text in block["lines"]])
+        result.append(block)
+    return result
+
+
+# --- Dessin --------------------------------------------------------------------
+
+def _full_width(pdf):
+    return pdf.w - 2 * pdf.l_margin - 2
+
+
+def _draw_title(pdf, block):
+    draw_creature_title(pdf, block["name"], block["type"], block["portrait"])
+
+
+def _draw_scifi_title(pdf, block):
+    draw_scifi_title(pdf, block["name"], block["subtitle"], block["role"], block["portrait"])
+
+
+def _draw_section(pdf, block):
+    with profiled(pdf, block["name"]):
+        draw_blocks(pdf, block["blocks"])
+
+
+def _draw_heading(pdf, block):
+    draw_section_title(pdf, block["text"])
+
+
+def _draw_columns(pdf, block):
+    set_card_font(pdf, "DejaVu", size=block["size"])
+    col_width = (pdf.w - 2 * pdf.l_margin - 4) / 2
+    line_height = scaled(pdf, block["height"])
+    for left, right in block["rows"]:
+        pdf.cell(col_width, line_height, left, border=0)
+        pdf.cell(col_width, line_height, right, border=0, ln=True)
+
+
+def _draw_table(pdf, block):
+    inset = block["inset"]
+    row_height = scaled(pdf, block["height"])
+    for row, size in zip(block["rows"], block["sizes"]):
+        set_card_font(pdf, "DejaVu", size=size)
+        col_width = (pdf.w - 2 * pdf.l_margin - 2 * inset) / len(row)
+        if inset:
+            pdf.set_x(pdf.l_margin + inset)
+        for text in row:
+            pdf.cell(col_width, row_height, text, border=1, align="C")
+        pdf.ln()
+
+
+def _draw_entry(pdf, block):
+    height = scaled(pdf, block["height"])
+    if block["label"] is not None:
+        set_card_font(pdf, "DejaVu", "B", size=block["size"])
+        safe_multi_cell(pdf, _full_width(pdf), height, block["label"])
+    set_card_font(pdf, "DejaVu", size=block["size"])
+    for text in block["lines"]:
+        safe_multi_cell(pdf, _full_width(pdf), height, text)
+
+
+def _draw_paragraph(pdf, block):
+    set_card_font(pdf, "DejaVu", size=block["size"])
+    if block["x"] is not None:
+        pdf.set_xy(block["x"], pdf.get_y())
+    width = _full_width(pdf) if block["width"] is None else block["width"]
+    safe_multi_cell(pdf, width, scaled(pdf, block["height"]), block["text"])
+
+
+def _draw_line(pdf, block):
+    set_card_font(pdf, "DejaVu", size=block["size"])
+    pdf.set_xy(block["x"], pdf.get_y())
+    pdf.cell(0, scaled(pdf, block["height"]), block["text"])
+    pdf.ln(scaled(pdf, block["height"]))
+
+
+def _draw_space(pdf, block):
+    pdf.ln(scaled(pdf, block["height"]))
+
+
+_DRAWERS = {
+    "title": _draw_title,
+    "scifi_title": _draw_scifi_title,
+    "section": _draw_section,
+    "heading": _draw_heading,
+    "columns": _draw_columns,
+    "table": _draw_table,
+    "entry": _draw_entry,
+    "paragraph": _draw_paragraph,
+    "line": _draw_line,
+    "space": _draw_space,
+}
+
+
+def draw_blocks(pdf, blocks):
+    for block in blocks:
+        _DRAWERS[block["kind"]](pdf, block)
+
+
+def draw_card(pdf, card):
+    """Dessine une carte compilée sur une surface compatible FPDF (PDF, LayoutCanvas, SvgCanvas)"""
+    draw_blocks(pdf, card)
+
+
+# --- Construction des blocs (utilisée par les compilateurs des systèmes) --------
+
+def section(name, blocks):
+    return {"kind": "section", "name": name, "blocks": blocks}
+
+
+def heading(text):
+    return {"kind": "heading", "text": text}
+
+
+def columns(rows, size=7, height=3):
+    return {"kind": "columns", "rows": rows, "size": size, "height": height}
+
+
+def table(rows, sizes, height, inset=0):
+    return {"kind": "table", "rows": rows, "sizes": sizes, "height": height, "inset": inset}
+
+
+def entry(label, lines, size=7, height=3):
+    """Paragraphe étiqueté ; les lignes vides, qui ne seraient pas dessinées, sont omises"""
+    return {"kind": "entry", "label": label, "lines": [text for text in lines if text and text.strip()],
+            "size": size, "height": height}
+
+
+def paragraph(text, size=7, height=3, x=None, width=None):
+    """Texte sur plusieurs lignes ; sans largeur, toute la largeur utile de la carte"""
+    return {"kind": "paragraph", "text": text, "size": size, "height": height, "x": x, "width": width}
+
+
+def line(text, size, height, x=10):
+    return {"kind": "line", "text": text, "size": size, "height": height, "x": x}
+
+
+def space(height):
+    return {"kind": "space", "height": height}
@@ -0,0 +1,57 @@
+"""
+Livret combiné : toutes les créatures de plusieurs systèmes dans un seul PDF
+
+`main.py all` écrit un PDF par système, et chacun intègre son propre
+sous-ensemble de DejaVu (et de Caesar pour D&D et COF Mini). Le livret
+combiné rend tous les systèmes dans le même document : chaque police n'y
+est intégrée qu'une fois, avec un sous-ensemble couvrant les glyphes de
+tous les systèmes, ce qui réduit l'archive et accélère son ouverture.
+
+Chaque système reçoit un signet de premier niveau sur sa première carte.
+Avec l'option `toc`, les index couvrent tout le livret et les signets des
+créatures sont placés sous celui de leur système (voir navigation.py).
+"""
+
+from .base_generator import create_pdf_base
+from .pipeline import is_output_path, render_creatures, write_pdf
+from .systems import get_system
+
+COMBINED_OUTPUT = "Bestiaire_Complet.pdf"
+COMBINED_LABEL = "Tous systèmes"
+
+
+def generate_combined_pdf(books, output=COMBINED_OUTPUT, on_event=None, fit=None, options=None):
+    """Génère un seul PDF pour plusieurs systèmes
+
+    `books` est une liste de couples (clé du système, créatures), rendus dans
+    cet ordre ; les systèmes sans créature sont omis. Les autres paramètres
+    sont ceux des fonctions `generate_*_pdf` ; retourne le résultat de
+    write_pdf (None -> bytes).
+    """
+    books = [(system, creatures) for system, creatures in books if creatures]
+    pdf = create_pdf_base(options)
+    navigation = getattr(pdf, "navigation", None)
+    if navigation is not None:
+        navigation.reserve(pdf, sum(len(creatures) for _, creatures in books))
+
+    sections = []
+    for system, creatures in books:
+        info = get_system(system)
+        sections.append((info["name"], pdf.page + 1))
+        if navigation is not None:
+            navigation.begin_group(info["name"], system)
+        render_creatures(pdf, creatures, info["generate_page"], info["name"], on_event,
+                         info["name_field"], fit)
+
+    if navigation is None:
+        # Sans index, seuls les systèmes reçoivent un signet
+        page, y = pdf.page, pdf.y
+        for title, first_page in sections:
+            pdf.page, pdf.y = first_page, pdf.t_margin
+            pdf.start_section(title)
+        pdf.page, pdf.y = page, y
+
+    result = write_pdf(pdf, output, COMBINED_LABEL, on_event)
+    if not on_event and is_output_path(output):
+        print(f"✅ PDF combiné généré : {output}")
+    return result
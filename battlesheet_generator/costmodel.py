@@ -0,0 +1,231 @@
+"""
+Modèle de coût du rendu et ordonnancement des tâches parallèles
+
+Le temps de rendu d'une fiche varie beaucoup : une créature D&D chargée de
+traits et d'actions coûte bien plus qu'une carte COF Mini de trois lignes.
+Découper les tâches à nombre égal de créatures laisse donc des processus
+inactifs pendant que le dernier termine. Ce module :
+
+- prédit le coût d'une fiche (ms) à partir de caractéristiques bon marché
+  (`creature_features` : longueur du texte, nombre d'entrées des listes,
+  portrait), avec un modèle linéaire par système ;
+- calibre ce modèle sur des rendus réels (`calibrate`, moindres carrés) et
+  l'enregistre dans `.cache/cost_model.json` (ou
+  `$BATTLESHEET_CACHE_DIR/cost_model.json`) ; sans calibration, des
+  coefficients mesurés sur les fiches d'exemple sont utilisés ;
+- répartit les tâches : `lpt_schedule` (la plus longue d'abord, au
+  processus le moins chargé) et `balanced_shards` (tranches contiguës de
+  coûts proches, quand l'ordre des pages doit être conservé).
+
+Seuls les coûts relatifs servent à l'ordonnancement : le même modèle vaut
+pour le rendu des pages et pour la mesure de l'ajustement.
+"""
+
+import heapq
+import json
+import os
+import time
+from pathlib import Path
+
+from .dice import _numpy
+
+COST_MODEL_PATH = Path(os.environ.get("BATTLESHEET_CACHE_DIR", ".cache")) / "cost_model.json"
+
+# Caractéristiques d'une fiche, dans l'ordre des coefficients
+FEATURES = ("card", "text_chars", "entries", "portrait")
+
+# Coefficients par défaut (ms par unité), mesurés sur les fiches d'exemple
+DEFAULT_WEIGHTS = {
+    "dnd": {"card": 2.2, "text_chars": 0.017, "entries": 0.1, "portrait": 0.5},
+    "swn": {"card": 0.0, "text_chars": 0.0145, "entries": 0.5, "portrait": 0.5},
+    "cofmini": {"card": 2.1, "text_chars": 0.0136, "entries": 0.0, "portrait": 0.5},
+    "timothee": {"card": 2.1, "text_chars": 0.0136, "entries": 0.0, "portrait": 0.5},
+}
+
+# Nombre de rendus mesurés par fiche lors de la calibration (le plus rapide est retenu)
+CALIBRATION_REPEATS = 3
+
+# En dessous de ce nombre de fiches, les coefficients par défaut sont seulement mis à l'échelle
+MIN_CALIBRATION_SAMPLES = len(FEATURES) + 1
+
+
+def _text_length(value):
+    if isinstance(value, str):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_text_length(item) for item in value.values())
+    if isinstance(value, list):
+        return sum(_text_length(item) for item in value)
+    return 0
+
+
+def creature_features(creature_data):
+    """Caractéristiques d'une fiche (voir FEATURES), sans la rendre"""
+    entries = sum(len(value) for value in creature_data.values() if isinstance(value, list))
+    return (1.0, float(_text_length(creature_data)), float(entries), 1.0 if creature_data.get("portrait") else 0.0)
+
+
+class CostModel:
+    """Coût de rendu prédit (ms) : combinaison linéaire des caractéristiques, par système"""
+
+    def __init__(self, weights=None):
+        self.weights = {system: dict(values) for system, values in (weights or DEFAULT_WEIGHTS).items()}
+
+    def predict(self, system, creature_data):
+        weights = self.weights.get(system) or DEFAULT_WEIGHTS.get(system) or DEFAULT_WEIGHTS["dnd"]
+        return sum(weights.get(name, 0.0) * value for name, value in zip(FEATURES, creature_features(creature_data)))
+
+    def predict_all(self, system, creatures):
+        return [self.predict(system, creature_data) for creature_data in creatures]
+
+    def to_dict(self):
+        return {"features": list(FEATURES), "weights": self.weights}
+
+    @classmethod
+    def from_dict(cls, data):
+        if list(data.get("features", [])) != list(FEATURES):
+            raise ValueError("Modèle de coût incompatible (caractéristiques différentes)")
+        return cls(dict(DEFAULT_WEIGHTS, **data["weights"]))
+
+
+_model = None
+
+
+def load_cost_model(path=None):
+    """Modèle calibré enregistré, sinon modèle par défaut (mémorisé pour le chemin par défaut)"""
+    global _model
+    if path is None and _model is not None:
+        return _model
+    model = CostModel()
+    try:
+        with open(path or COST_MODEL_PATH, "r", encoding="utf-8") as f:
+            model = CostModel.from_dict(json.load(f))
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    if path is None:
+        _model = model
+    return model
+
+
+def save_cost_model(model, path=None):
+    global _model
+    path = Path(path or COST_MODEL_PATH)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(model.to_dict(), f, indent=2)
+    _model = None
+    return path
+
+
+def measure_render_cost(system, creature_data, repeats=CALIBRATION_REPEATS):
+    """Temps de rendu mesuré d'une fiche (ms), compilation de la carte comprise"""
+    from .base_generator import create_pdf_base
+    from .cards import _card_cache
+    from .systems import get_system
+
+    page_func = get_system(system)["generate_page"]
+    best = None
+    for _ in range(repeats):
+        _card_cache.clear()
+        pdf = create_pdf_base()
+        start = time.perf_counter()
+        page_func(pdf, creature_data)
+        elapsed = (time.perf_counter() - start) * 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def calibrate(samples, model=None, repeats=CALIBRATION_REPEATS):
+    """Ajuste les coefficients des systèmes de `samples` ({système: [fiches]}) sur des rendus réels
+
+    Moindres carrés à coefficients positifs : une caractéristique dont le
+    coefficient serait négatif (sans effet mesurable) est retirée et
+    l'ajustement recommencé ; une caractéristique constante dans
+    l'échantillon (aucun portrait...) garde son coefficient par défaut. Avec
+    moins de MIN_CALIBRATION_SAMPLES fiches, les coefficients par défaut sont
+    multipliés par le rapport entre coûts mesurés et prédits.
+    Retourne (modèle, {système: erreur relative moyenne}).
+    """
+    np = _numpy()
+    model = CostModel((model or load_cost_model()).weights)
+    errors = {}
+    for system, creatures in samples.items():
+        if not creatures:
+            continue
+        # Premier rendu non mesuré : polices et caches chargés
+        measure_render_cost(system, creatures[0], 1)
+        features = np.array([creature_features(creature_data) for creature_data in creatures])
+        costs = np.array([measure_render_cost(system, creature_data, repeats) for creature_data in creatures])
+
+        weights = dict(DEFAULT_WEIGHTS.get(system, DEFAULT_WEIGHTS["dnd"]))
+        if len(creatures) < MIN_CALIBRATION_SAMPLES:
+            predicted = features @ np.array([weights[name] for name in FEATURES])
+            ratio = float(costs.sum() / predicted.sum())
+            model.weights[system] = {name: value * ratio for name, value in weights.items()}
+            errors[system] = float(np.mean(np.abs(predicted * ratio - costs) / costs))
+            continue
+
+        active = [i for i in range(len(FEATURES)) if i == 0 or np.ptp(features[:, i]) > 0]
+        fixed = [i for i in range(len(FEATURES)) if i not in active]
+        target = costs - features[:, fixed] @ np.array([weights[FEATURES[i]] for i in fixed])
+        while active:
+            solution = np.linalg.lstsq(features[:, active], target, rcond=None)[0]
+            if solution.min() >= 0:
+                break
+            dropped = active.pop(int(solution.argmin()))
+            weights[FEATURES[dropped]] = 0.0
+        for i, value in zip(active, solution):
+            weights[FEATURES[i]] = float(value)
+
+        model.weights[system] = weights
+        predicted = np.array(model.predict_all(system, creatures))
+        errors[system] = float(np.mean(np.abs(predicted - costs) / costs))
+    return model, errors
+
+
+# --- Ordonnancement --------------------------------------------------------------
+
+def lpt_schedule(costs, count):
+    """Répartit des tâches indépendantes en `count` lots de coûts proches
+
+    Ordonnancement LPT : les tâches sont prises de la plus coûteuse à la moins
+    coûteuse et confiées au lot le moins chargé. Retourne les lots (listes
+    d'index de `costs`), du plus chargé au moins chargé, sans lot vide.
+    """
+    count = max(1, min(count, len(costs)))
+    heap = [(0.0, index) for index in range(count)]
+    bins = [[] for _ in range(count)]
+    loads = [0.0] * count
+    for task in sorted(range(len(costs)), key=lambda i: -costs[i]):
+        load, index = heapq.heappop(heap)
+        bins[index].append(task)
+        loads[index] = load + costs[task]
+        heapq.heappush(heap, (loads[index], index))
+    order = sorted(range(count), key=lambda i: -loads[i])
+    return [bins[i] for i in order if bins[i]]
+
+
+def balanced_shards(costs, count):
+    """Découpe une suite en au plus `count` tranches contiguës de coûts proches
+
+    Les bornes sont placées au plus près des multiples de coût total / count,
+    chaque tranche gardant au moins une tâche. Retourne des couples (début, fin).
+    """
+    total = len(costs)
+    count = max(1, min(count, total))
+    overall = sum(costs)
+    bounds = []
+    start = 0
+    cumulative = 0.0
+    for shard in range(1, count):
+        target = overall * shard / count
+        end = start + 1
+        cumulative += costs[start]
+        # Il doit rester au moins une tâche par tranche suivante
+        while end < total - (count - shard) and abs(cumulative + costs[end] - target) < abs(cumulative - target):
+            cumulative += costs[end]
+            end += 1
+        bounds.append((start, end))
+        start = end
+    bounds.append((start, total))
+    return bounds
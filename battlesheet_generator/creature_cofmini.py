@@ -2,33 +2,26 @@
 Générateur de fiches de créatures pour COF Mini
 """
 
-from .base_generator import create_pdf_base, safe_text, safe_multi_cell, draw_section_title, draw_creature_title
+from .base_generator import create_pdf_base, safe_text, format_damage_text
+from .cards import compiled_card, draw_card, section, heading, paragraph, line, space
+from .pipeline import render_creatures, write_pdf
 
-def generate_cofmini_defenses_section(pdf, creature_data):
-    """Génère la section défenses pour COF Mini"""
-    pdf.set_font("DejaVu", size=9)
-    
+def compile_cofmini_defenses_section(creature_data, options):
+    """Section défenses pour COF Mini"""
     # Défense et Points de vie
     defense = creature_data.get("defenses", {}).get("defense", "N/A")
     points_de_vie = creature_data.get("defenses", {}).get("points_de_vie", "N/A")
-    
+
     defense_text = f"Défense {defense} • Points de vie {points_de_vie}"
-    
-    pdf.set_xy(10, pdf.get_y())
-    pdf.cell(0, 4, safe_text(defense_text))
-    pdf.ln(4)
+    return section("cofmini_defenses", [line(safe_text(defense_text), 9, 4)])
 
-def generate_cofmini_stats_section(pdf, creature_data):
-    """Génère la section caractéristiques pour COF Mini"""
+def compile_cofmini_stats_section(creature_data, options):
+    """Section caractéristiques pour COF Mini"""
     caracteristiques = creature_data.get("caracteristiques", {})
-    
+
     if not caracteristiques:
-        return
-    
-    draw_section_title(pdf, "CARACTÉRISTIQUES")
-    
-    pdf.set_font("DejaVu", size=9)
-    
+        return section("cofmini_stats", [])
+
     # Formater les caractéristiques avec des signes + ou -
     stats_parts = []
     for stat, value in caracteristiques.items():
@@ -36,62 +29,55 @@ def generate_cofmini_stats_section(pdf, creature_data):
             stats_parts.append(f"{stat.capitalize()} +{value}")
         else:
             stats_parts.append(f"{stat.capitalize()} {value}")
-    
+
     stats_text = " • ".join(stats_parts)
-    
-    pdf.set_xy(10, pdf.get_y())
-    safe_multi_cell(pdf, 85, 4, stats_text)
-    pdf.ln(2)
+    return section("cofmini_stats", [
+        heading("CARACTÉRISTIQUES"),
+        paragraph(stats_text, 9, 4, x=10, width=85),
+        space(2),
+    ])
 
-def generate_cofmini_attacks_section(pdf, creature_data):
-    """Génère la section attaques pour COF Mini"""
+def compile_cofmini_attacks_section(creature_data, options):
+    """Section attaques pour COF Mini"""
     attaques = creature_data.get("attaques", [])
-    
+
     if not attaques:
-        return
-    
-    draw_section_title(pdf, "ATTAQUES")
-    
-    pdf.set_font("DejaVu", size=9)
-    
+        return section("cofmini_attacks", [])
+
+    blocks = [heading("ATTAQUES")]
     for attaque in attaques:
         nom = attaque.get("nom", "Attaque")
-        degats = attaque.get("degats", "")
+        degats = format_damage_text(attaque.get("degats", ""), options)
         type_attaque = attaque.get("type", "")
-        
+
         # Formater l'attaque
         if type_attaque:
             attack_text = f"{nom} ({type_attaque}): {degats}"
         else:
             attack_text = f"{nom}: {degats}"
-        
-        pdf.set_xy(10, pdf.get_y())
-        pdf.cell(0, 4, safe_text(attack_text))
-        pdf.ln(4)
-    
-    pdf.ln(1)
-
-def generate_cofmini_capacites_section(pdf, creature_data):
-    """Génère la section capacités spéciales pour COF Mini"""
+        blocks.append(line(safe_text(attack_text), 9, 4))
+
+    blocks.append(space(1))
+    return section("cofmini_attacks", blocks)
+
+def compile_cofmini_capacites_section(creature_data, options):
+    """Section capacités spéciales pour COF Mini"""
     capacites = creature_data.get("capacites_speciales", [])
-    
+
     if not capacites:
-        return
-    
-    draw_section_title(pdf, "CAPACITÉS SPÉCIALES")
-    
-    pdf.set_font("DejaVu", size=9)
-    
+        return section("cofmini_capacites", [])
+
+    blocks = [heading("CAPACITÉS SPÉCIALES")]
     for capacite in capacites:
         nom = capacite.get("nom", "Capacité")
         description = capacite.get("description", "")
         portee = capacite.get("portee", "")
         difficulte = capacite.get("difficulte", "")
         deplacement = capacite.get("deplacement", "")
-        
+
         # Créer le texte de la capacité
         capacity_text = f"{nom}: {description}"
-        
+
         # Ajouter des informations supplémentaires si disponibles
         if portee:
             capacity_text += f" (Portée: {portee})"
@@ -99,55 +85,59 @@ def generate_cofmini_capacites_section(pdf, creature_data):
             capacity_text += f" (Difficulté: {difficulte})"
         if deplacement:
             capacity_text += f" (Déplacement: {deplacement})"
-        
-        pdf.set_xy(10, pdf.get_y())
-        safe_multi_cell(pdf, 85, 4, capacity_text)
-        pdf.ln(2)
 
-def generate_cofmini_pdf(creatures, output_path):
+        blocks.append(paragraph(capacity_text, 9, 4, x=10, width=85))
+        blocks.append(space(2))
+    return section("cofmini_capacites", blocks)
+
+def cofmini_title(creature_data):
+    """Bloc titre COF Mini : nom suivi du niveau"""
+    niveau = creature_data.get("niveau", "")
+    name = creature_data.get("name", "Créature sans nom")
+    title = f"{name} (Niveau {niveau})" if niveau != "" else name
+    return {"kind": "title", "name": safe_text(title), "type": "", "portrait": creature_data.get("portrait")}
+
+def cofmini_description(creature_data):
+    """Description de la créature (plus petite, sans italique), si présente"""
+    description = creature_data.get("description", "")
+    if not description:
+        return []
+    return [paragraph(description, 8, 4, x=10, width=85), space(3)]
+
+def compile_cofmini_sections(creature_data, options):
+    """Défenses, caractéristiques, attaques et capacités (partagées avec JDR Timothée)"""
+    return [
+        compile_cofmini_defenses_section(creature_data, options),
+        compile_cofmini_stats_section(creature_data, options),
+        compile_cofmini_attacks_section(creature_data, options),
+        compile_cofmini_capacites_section(creature_data, options),
+    ]
+
+def compile_cofmini_card(creature_data, options=None):
+    """Compile une créature COF Mini en carte (voir cards.py)"""
+    options = options or {}
+    card = [cofmini_title(creature_data)] + cofmini_description(creature_data)
+
+    # Type (si disponible)
+    type_creature = creature_data.get("type", "")
+    if type_creature:
+        card.append(line(safe_text(f"Type: {type_creature}"), 8, 4))
+
+    return card + compile_cofmini_sections(creature_data, options)
+
+def generate_cofmini_creature_page(pdf, creature_data):
+    """Génère une page complète pour une créature COF Mini"""
+    draw_card(pdf, compiled_card(pdf, "cofmini", creature_data, compile_cofmini_card))
+
+def generate_cofmini_pdf(creatures, output_path, on_event=None, fit=None, options=None):
     """
     Génère un PDF avec les fiches de créatures COF Mini
+
+    `output_path` est un chemin, un flux binaire ou None ; retourne le
+    résultat de write_pdf (chemin, flux, ou bytes si None).
     """
-    pdf = create_pdf_base()
-    
-    for i, creature_data in enumerate(creatures):
-        # Titre de la créature avec niveau
-        niveau = creature_data.get("niveau", "")
-        name = creature_data.get("name", "Créature sans nom")
-        if niveau != "":
-            title = f"{name} (Niveau {niveau})"
-        else:
-            title = name
-        
-        draw_creature_title(pdf, title)
-        
-        # Description
-        description = creature_data.get("description", "")
-        if description:
-            pdf.set_font("DejaVu", size=8)  # Pas d'italique, juste plus petit
-            pdf.set_xy(10, pdf.get_y())
-            safe_multi_cell(pdf, 85, 4, description)
-            pdf.ln(3)
-        
-        # Type (si disponible)
-        type_creature = creature_data.get("type", "")
-        if type_creature:
-            pdf.set_font("DejaVu", size=8)
-            pdf.set_xy(10, pdf.get_y())
-            pdf.cell(0, 4, safe_text(f"Type: {type_creature}"))
-            pdf.ln(4)
-        
-        # Défenses
-        generate_cofmini_defenses_section(pdf, creature_data)
-        
-        # Caractéristiques
-        generate_cofmini_stats_section(pdf, creature_data)
-        
-        # Attaques
-        generate_cofmini_attacks_section(pdf, creature_data)
-        
-        # Capacités spéciales
-        generate_cofmini_capacites_section(pdf, creature_data)
-    
-    pdf.output(output_path)
-    return True
+    pdf = create_pdf_base(options)
+
+    render_creatures(pdf, creatures, generate_cofmini_creature_page, "COF Mini", on_event, fit=fit)
+
+    return write_pdf(pdf, output_path, "COF Mini", on_event)
@@ -1,73 +1,54 @@
 from .base_generator import *
+from .cards import compiled_card, draw_card, section, heading, columns, table, entry, paragraph, space
+from .pipeline import render_creatures, write_pdf, is_output_path
 
-def generate_dnd_defenses_section(pdf, creature_data):
-    """Génère la section défenses et capacités pour D&D avec layout en deux colonnes"""
-    draw_section_title(pdf, "DÉFENSES & CAPACITÉS")
-    
-    pdf.set_font("DejaVu", size=7)
-    
-    # Configuration pour deux colonnes avec marges de sécurité
-    total_width = pdf.w - 2 * pdf.l_margin - 4  # Marges de sécurité
-    col_width = total_width / 2
-    line_height = 3
-    
+def compile_dnd_defenses_section(creature_data, options):
+    """Section défenses et capacités pour D&D avec layout en deux colonnes"""
     # Première ligne : PV | Vitesse
     pv_text = f"PV: {safe_text(creature_data.get('hit_points', 'N/A'))}"
     vitesse_text = f"Vitesse: {safe_text(creature_data.get('speed', 'N/A'))}"
-    
+
     # Limiter la largeur du texte si nécessaire
     if len(pv_text) > 25:
         pv_text = pv_text[:22] + "..."
     if len(vitesse_text) > 25:
         vitesse_text = vitesse_text[:22] + "..."
-    
-    pdf.cell(col_width, line_height, pv_text, border=0)
-    pdf.cell(col_width, line_height, vitesse_text, border=0, ln=True)
-    
+
     # Deuxième ligne : CA | Vision
     senses = creature_data.get('senses', {})
     ca_text = f"CA: {safe_text(creature_data.get('armor_class', 'N/A'))}"
     vision_text = f"Vision: {safe_text(senses.get('darkvision', 'N/A'))}, PP: {safe_text(senses.get('passive_perception', 'N/A'))}"
-    
+
     # Limiter la largeur du texte si nécessaire
     if len(vision_text) > 25:
         vision_text = f"Vision: {safe_text(senses.get('darkvision', 'N/A'))}"
-    
-    pdf.cell(col_width, line_height, ca_text, border=0)
-    pdf.cell(col_width, line_height, vision_text, border=0, ln=True)
-    
-    pdf.ln(2)  # Espacement avant les immunités/vulnérabilités
-    
-    # Section immunités et vulnérabilités avec largeur contrôlée
-    safe_width = pdf.w - 2 * pdf.l_margin - 2
-    
-    # Vérifier s'il y a des immunités aux dégâts
-    damage_immunities = creature_data.get('damage_immunities', [])
-    if damage_immunities:
-        safe_multi_cell(pdf, safe_width, 3, f"Immunités dégâts: {safe_text(damage_immunities)}")
-    
-    # Vérifier s'il y a des immunités aux états
-    condition_immunities = creature_data.get('condition_immunities', [])
-    if condition_immunities:
-        safe_multi_cell(pdf, safe_width, 3, f"Immunités états: {safe_text(condition_immunities)}")
-    
-    # Vérifier s'il y a des vulnérabilités
-    vulnerabilities = creature_data.get('vulnerabilities', [])
-    if vulnerabilities:
-        safe_multi_cell(pdf, safe_width, 3, f"Vulnérabilités: {safe_text(vulnerabilities)}")
-    
-    pdf.ln(2)  # Espacement après la section
-
-def generate_dnd_multi_unit_table(pdf, creature_data):
-    """Génère un tableau simple pour les créatures D&D multi-unités"""
+
+    blocks = [
+        heading("DÉFENSES & CAPACITÉS"),
+        columns([[pv_text, vitesse_text], [ca_text, vision_text]]),
+        space(2),  # Espacement avant les immunités/vulnérabilités
+    ]
+
+    # Immunités aux dégâts, aux états et vulnérabilités
+    for label, key in (("Immunités dégâts", 'damage_immunities'), ("Immunités états", 'condition_immunities'),
+                       ("Vulnérabilités", 'vulnerabilities')):
+        values = creature_data.get(key, [])
+        if values:
+            blocks.append(paragraph(f"{label}: {safe_text(values)}"))
+
+    blocks.append(space(2))  # Espacement après la section
+    return section("dnd_defenses", blocks)
+
+def compile_dnd_multi_unit_table(creature_data, options):
+    """Tableau simple des PV pour les créatures D&D multi-unités"""
     units = creature_data.get('units', creature_data.get('unite', 1))  # Chercher 'units' ou 'unite'
-    
+
     # Si pas d'unités multiples, ne pas afficher le tableau
     if not units or units <= 1:
-        return
-    
+        return section("dnd_multi_unit_table", [])
+
     hit_points_str = creature_data.get('hit_points', '0')
-    
+
     # Extraire la valeur numérique des PV
     try:
         # Chercher le premier nombre dans la chaîne
@@ -79,42 +60,32 @@ def generate_dnd_multi_unit_table(pdf, creature_data):
             base_hp = 20  # Valeur par défaut
     except (ValueError, AttributeError):
         base_hp = 20
-    
-    # Espacement avant le tableau
-    pdf.ln(3)
-    
-    # Calculer la largeur des colonnes
-    table_width = pdf.w - 2 * pdf.l_margin - 4
-    col_width = table_width / units
-    row_height = 4
-    
-    # Une seule ligne : PV correspondants
-    pdf.set_font("DejaVu", size=6)
-    pdf.set_x(pdf.l_margin + 2)
-    for i in range(units, 0, -1):  # De units à 1
-        hp_value = (base_hp * i) // units  # Division entière pour éviter les décimales
-        pdf.cell(col_width, row_height, f"{hp_value}", border=1, align="C")
-    pdf.ln()
-    
-    pdf.ln(1)  # Espacement après le tableau
-
-def generate_dnd_stats_table(pdf, creature_data):
-    """Génère un tableau des statistiques D&D avec modificateurs et jets de sauvegarde"""
+
+    # Une seule ligne : PV correspondants, de units à 1 (division entière pour éviter les décimales)
+    row = [f"{(base_hp * i) // units}" for i in range(units, 0, -1)]
+    return section("dnd_multi_unit_table", [
+        space(3),  # Espacement avant le tableau
+        table([row], [6], 4, inset=2),
+        space(1),  # Espacement après le tableau
+    ])
+
+def compile_dnd_stats_table(creature_data, options):
+    """Tableau des statistiques D&D avec modificateurs et jets de sauvegarde"""
     stats = creature_data.get("stats", {})
     modifiers = creature_data.get("modifiers", {})
     saving_throws = creature_data.get("saving_throws", {})
-    
+
     if not stats:
-        return
-    
+        return section("dnd_stats_table", [])
+
     # Vérifier s'il y a des jets de sauvegarde différents des modificateurs normaux
     has_different_saving_throws = False
     js_display_values = {}  # Stocke les valeurs à afficher pour chaque stat
-    
+
     for stat_name in stats.keys():
         normal_mod = modifiers.get(stat_name, 0)
         saving_throw = saving_throws.get(stat_name, None)
-        
+
         # Si le jet de sauvegarde existe et est différent du modificateur normal
         if saving_throw is not None and saving_throw != "" and saving_throw != normal_mod:
             has_different_saving_throws = True
@@ -124,166 +95,143 @@ def generate_dnd_stats_table(pdf, creature_data):
         else:
             # Cellule vide si identique au modificateur normal ou absent
             js_display_values[stat_name] = ""
-    
-    # Configuration du tableau
-    num_stats = len(stats)
-    col_width = (pdf.w - 2 * pdf.l_margin) / num_stats
-    row_height = 3.5
-    
-    # Ligne 1: Noms des caractéristiques
-    pdf.set_font("DejaVu", size=7)
-    for stat_name in stats.keys():
-        pdf.cell(col_width, row_height, safe_text(stat_name), border=1, align="C")
-    pdf.ln()
-    
-    # Ligne 2: Valeurs
-    pdf.set_font("DejaVu", size=6)
-    for stat_name, stat_value in stats.items():
-        pdf.cell(col_width, row_height, safe_text(stat_value), border=1, align="C")
-    pdf.ln()
-    
-    # Ligne 3: Modificateurs
+
+    # Ligne 1 : noms des caractéristiques, ligne 2 : valeurs, ligne 3 : modificateurs
+    rows = [
+        [safe_text(stat_name) for stat_name in stats.keys()],
+        [safe_text(stat_value) for stat_value in stats.values()],
+    ]
+    mod_row = []
     for stat_name in stats.keys():
         mod_value = modifiers.get(stat_name, "—")
-        mod_text = f"+{mod_value}" if isinstance(mod_value, int) and mod_value >= 0 else safe_text(mod_value)
-        pdf.cell(col_width, row_height, mod_text, border=1, align="C")
-    pdf.ln()
-    
-    # Ligne 4: Jets de sauvegarde (seulement si au moins un est différent du modificateur normal)
+        mod_row.append(f"+{mod_value}" if isinstance(mod_value, int) and mod_value >= 0 else safe_text(mod_value))
+    rows.append(mod_row)
+
+    # Ligne 4 : jets de sauvegarde (seulement si au moins un est différent du modificateur normal)
     if has_different_saving_throws:
-        for stat_name in stats.keys():
-            pdf.cell(col_width, row_height, js_display_values[stat_name], border=1, align="C")
-        pdf.ln()
+        rows.append([js_display_values[stat_name] for stat_name in stats.keys()])
+
+    return section("dnd_stats_table", [table(rows, [7] + [6] * (len(rows) - 1), 3.5)])
 
-def generate_dnd_traits(pdf, creature_data):
-    """Génère la section traits spéciaux pour D&D"""
+def compile_dnd_traits(creature_data, options):
+    """Section traits spéciaux pour D&D"""
     traits = creature_data.get("traits", [])
     if not traits:
-        return
-        
-    draw_section_title(pdf, "TRAITS")
-    pdf.set_font("DejaVu", size=7)
-    
+        return section("dnd_traits", [])
+
+    blocks = [heading("TRAITS")]
     for trait in traits:
-        safe_width = pdf.w - 2 * pdf.l_margin - 2
-        
         trait_name = safe_text(trait.get('name', 'Trait inconnu'))
         trait_description = safe_text(trait.get('description', ''))
-        
-        # Nom du trait en gras
-        pdf.set_font("DejaVu", "B", size=7)  # Gras
-        safe_multi_cell(pdf, safe_width, 3, f"{trait_name}:")
-        pdf.set_font("DejaVu", size=7)  # Retour à la police normale
-        
-        # Description du trait
-        if trait_description:
-            safe_multi_cell(pdf, safe_width, 3, trait_description)
-        
-        pdf.ln(1)  # Espacement entre les traits
-    
-    pdf.ln(1)  # Espacement après la section traits
-
-def generate_dnd_actions(pdf, creature_data):
-    """Génère la section attaques/actions pour D&D"""
-    draw_section_title(pdf, "ATTAQUES")
-    pdf.set_font("DejaVu", size=7)
-    
+
+        # Nom du trait en gras, puis sa description
+        blocks.append(entry(f"{trait_name}:", [trait_description]))
+        blocks.append(space(1))  # Espacement entre les traits
+
+    blocks.append(space(1))  # Espacement après la section traits
+    return section("dnd_traits", blocks)
+
+def compile_dnd_actions(creature_data, options):
+    """Section attaques/actions pour D&D"""
+    blocks = [heading("ATTAQUES")]
+
     for action in creature_data.get("actions", []):
-        # Largeur sécurisée pour éviter les débordements
-        safe_width = pdf.w - 2 * pdf.l_margin - 2
-        
         action_name = safe_text(action.get('name', 'Action inconnue'))
         action_type = safe_text(action.get('type', ''))
         attack_bonus = action.get('attack_bonus', '')
         damage = action.get('damage', '')
         damage_type = action.get('damage_type', '')
-        
-        # Première ligne : nom et type de l'attaque
+
+        # Première ligne (en gras) : nom et type de l'attaque
         if action_type and action_type != 'Type inconnu':
             attack_text = f"{action_name} ({action_type})"
         else:
             attack_text = action_name
-        
-        # Afficher le nom de l'attaque en gras
-        pdf.set_font("DejaVu", "B", size=7)  # Gras
-        safe_multi_cell(pdf, safe_width, 3, attack_text)
-        pdf.set_font("DejaVu", size=7)  # Retour à la police normale
-        
+        lines = []
+
         # Deuxième ligne : bonus d'attaque et dégâts (seulement si définis)
         damage_parts = []
         if attack_bonus and attack_bonus != 'N/A':
             damage_parts.append(f"Attaque: +{attack_bonus}")
         if damage and damage != 'N/A' and damage_type and damage_type != 'N/A':
-            damage_parts.append(f"Dégâts: {damage} {damage_type}")
+            damage_parts.append(f"Dégâts: {format_damage_text(damage, options)} {damage_type}")
         elif damage and damage != 'N/A':
-            damage_parts.append(f"Dégâts: {damage}")
-            
+            damage_parts.append(f"Dégâts: {format_damage_text(damage, options)}")
+
         if damage_parts:
-            damage_text = ", ".join(damage_parts)
-            safe_multi_cell(pdf, safe_width, 3, damage_text)
-        
+            lines.append(", ".join(damage_parts))
+
         # Troisième ligne : reach/range de manière sécurisée (seulement si défini)
         reach = action.get('reach', '')
         range_val = action.get('range', '')
         portee = reach if reach else range_val
-        
+
         if portee and portee != '—':
-            portee_text = f"Portée: {safe_text(portee)}"
-            safe_multi_cell(pdf, safe_width, 3, portee_text)
-        
+            lines.append(f"Portée: {safe_text(portee)}")
+
         # Quatrième ligne : description de l'action (si présente)
         description = action.get('description', '')
         if description:
-            desc_text = f"Description: {safe_text(description)}"
-            safe_multi_cell(pdf, safe_width, 3, desc_text)
-        
+            lines.append(f"Description: {safe_text(description)}")
+
         # Cinquième ligne : effet spécial (si présent)
         effect = action.get('effect', '')
         if effect:
-            effect_text = f"Effet: {safe_text(effect)}"
-            safe_multi_cell(pdf, safe_width, 3, effect_text)
-        
-        pdf.ln(1)  # Espacement entre les attaques
+            lines.append(f"Effet: {safe_text(effect)}")
 
-def generate_dnd_creature_page(pdf, creature_data):
-    """Génère une page complète pour une créature D&D"""
+        blocks.append(entry(attack_text, lines))
+        blocks.append(space(1))  # Espacement entre les attaques
+    return section("dnd_actions", blocks)
+
+def compile_dnd_card(creature_data, options=None):
+    """Compile une créature D&D en carte (voir cards.py)"""
+    options = options or {}
     # Construire le type avec le nombre d'unités si applicable
     creature_type = safe_text(creature_data.get('type', 'Type inconnu'))
     units = creature_data.get('units', creature_data.get('unite', 1))
-    
+
     if units and units > 1:
         type_display = f"{creature_type} (x{units})"
     else:
         type_display = creature_type
-    
-    # Titre de la créature
-    draw_creature_title(pdf, creature_data.get("name", "Nom inconnu"), type_display)
-
-    # Défenses et capacités en premier
-    generate_dnd_defenses_section(pdf, creature_data)
-
-    # Stats principales
-    draw_section_title(pdf, "STATISTIQUES PRINCIPALES")
-    generate_dnd_stats_table(pdf, creature_data)
-    pdf.ln(2)
-
-    # Traits spéciaux
-    generate_dnd_traits(pdf, creature_data)
-
-    # Attaques
-    generate_dnd_actions(pdf, creature_data)
-    
-    # Tableau des unités multiples en bas de la fiche (si applicable)
-    generate_dnd_multi_unit_table(pdf, creature_data)
-
-def generate_dnd_pdf(creatures_data_list, output="DnD_Creatures.pdf"):
-    """Génère un PDF avec toutes les créatures D&D"""
-    pdf = create_pdf_base()
-    
+
+    return [
+        # Titre de la créature
+        {"kind": "title", "name": safe_text(creature_data.get("name", "Nom inconnu")), "type": type_display,
+         "portrait": creature_data.get("portrait")},
+        # Défenses et capacités en premier
+        compile_dnd_defenses_section(creature_data, options),
+        # Stats principales
+        heading("STATISTIQUES PRINCIPALES"),
+        compile_dnd_stats_table(creature_data, options),
+        space(2),
+        # Traits spéciaux
+        compile_dnd_traits(creature_data, options),
+        # Attaques
+        compile_dnd_actions(creature_data, options),
+        # Tableau des unités multiples en bas de la fiche (si applicable)
+        compile_dnd_multi_unit_table(creature_data, options),
+    ]
+
+def generate_dnd_creature_page(pdf, creature_data):
+    """Génère une page complète pour une créature D&D"""
+    draw_card(pdf, compiled_card(pdf, "dnd", creature_data, compile_dnd_card))
+
+def generate_dnd_pdf(creatures_data_list, output="DnD_Creatures.pdf", on_event=None, fit=None, options=None):
+    """Génère un PDF avec toutes les créatures D&D
+
+    Si on_event est fourni, il reçoit les événements de rendu et d'écriture
+    au lieu du message de fin affiché sur la console. Si fit est une taille
+    minimale (pt), le texte de chaque fiche est réduit pour tenir sur une carte.
+    `options` est transmis à create_pdf_base. `output` est un chemin, un flux
+    binaire ou None ; retourne le résultat de write_pdf (None -> bytes).
+    """
+    pdf = create_pdf_base(options)
+
     # Générer une page pour chaque créature
-    for creature_data in creatures_data_list:
-        generate_dnd_creature_page(pdf, creature_data)
-    
-    pdf.output(output)
-    print(f"✅ PDF D&D généré : {output}")
-    return output
+    render_creatures(pdf, creatures_data_list, generate_dnd_creature_page, "D&D", on_event, fit=fit)
+
+    result = write_pdf(pdf, output, "D&D", on_event)
+    if not on_event and is_output_path(output):
+        print(f"✅ PDF D&D généré : {output}")
+    return result
@@ -1,156 +1,117 @@
 from .base_generator import *
+from .cards import compiled_card, draw_card, section, heading, columns, entry, space
+from .pipeline import render_creatures, write_pdf, is_output_path
 
-def generate_swn_stats_section(pdf, creature_data):
-    """Génère la section statistiques pour SWN"""
-    draw_section_title(pdf, "STATISTIQUES")
-    
-    pdf.set_font("DejaVu", size=7)
+def compile_swn_stats_section(creature_data, options):
+    """Section statistiques pour SWN"""
     stats = creature_data.get("stats", {})
-    
+
     if not stats:
-        return
-    
-    # Configuration pour deux colonnes
-    total_width = pdf.w - 2 * pdf.l_margin - 4
-    col_width = total_width / 2
-    line_height = 3
-    
-    # Organiser les stats par importance
+        return section("swn_stats", [heading("STATISTIQUES")])
+
+    # Organiser les stats par importance sur deux colonnes
     left_stats = ["PV", "CA", "Initiative", "Effort"]
     right_stats = ["Moral", "Déplacement", "Réaction mentale", "Réaction physique", "Réaction évasion"]
-    
-    # Colonne de gauche
-    max_lines = max(len(left_stats), len(right_stats))
-    
-    for i in range(max_lines):
-        # Stat de gauche
-        if i < len(left_stats):
-            stat_name = left_stats[i]
-            if stat_name in stats:
-                left_text = f"{stat_name}: {safe_text(stats[stat_name])}"
-            else:
-                left_text = ""
-        else:
-            left_text = ""
-            
-        # Stat de droite
-        if i < len(right_stats):
-            stat_name = right_stats[i]
-            if stat_name in stats:
-                right_text = f"{stat_name}: {safe_text(stats[stat_name])}"
-            else:
-                right_text = ""
-        else:
-            right_text = ""
-        
-        # Afficher la ligne
-        pdf.cell(col_width, line_height, left_text, border=0)
-        pdf.cell(col_width, line_height, right_text, border=0, ln=True)
-    
-    pdf.ln(2)
-
-def generate_swn_capacities(pdf, creature_data):
-    """Génère la section capacités spéciales pour SWN"""
+
+    rows = []
+    for i in range(max(len(left_stats), len(right_stats))):
+        row = []
+        for column in (left_stats, right_stats):
+            stat_name = column[i] if i < len(column) else None
+            row.append(f"{stat_name}: {safe_text(stats[stat_name])}" if stat_name in stats else "")
+        rows.append(row)
+
+    return section("swn_stats", [heading("STATISTIQUES"), columns(rows), space(2)])
+
+def compile_swn_capacities(creature_data, options):
+    """Section capacités spéciales pour SWN"""
     capacities = creature_data.get("capacities", [])
     if not capacities:
-        return
-        
-    draw_section_title(pdf, "CAPACITÉS SPÉCIALES")
-    pdf.set_font("DejaVu", size=7)
-    
-    safe_width = pdf.w - 2 * pdf.l_margin - 2
-    
+        return section("swn_capacities", [])
+
+    blocks = [heading("CAPACITÉS SPÉCIALES")]
     for capacity in capacities:
         # Les capacités SWN sont des strings avec le nom et la description
         capacity_text = safe_text(capacity)
-        
+
         # Essayer de séparer le nom de la description (généralement "Nom : description")
         if ":" in capacity_text:
-            parts = capacity_text.split(":", 1)
-            capacity_name = parts[0].strip()
-            capacity_desc = parts[1].strip()
-            
-            # Nom en gras
-            pdf.set_font("DejaVu", "B", size=7)
-            safe_multi_cell(pdf, safe_width, 3, f"{capacity_name}:")
-            pdf.set_font("DejaVu", size=7)
-            
-            # Description
-            safe_multi_cell(pdf, safe_width, 3, capacity_desc)
+            capacity_name, capacity_desc = (part.strip() for part in capacity_text.split(":", 1))
+            blocks.append(entry(f"{capacity_name}:", [capacity_desc]))
         else:
             # Si pas de séparation claire, afficher tel quel
-            safe_multi_cell(pdf, safe_width, 3, capacity_text)
-        
-        pdf.ln(1)  # Espacement entre les capacités
-    
-    pdf.ln(1)
-
-def generate_swn_weapons(pdf, creature_data):
-    """Génère la section armes pour SWN"""
+            blocks.append(entry(None, [capacity_text]))
+
+        blocks.append(space(1))  # Espacement entre les capacités
+
+    blocks.append(space(1))
+    return section("swn_capacities", blocks)
+
+def compile_swn_weapons(creature_data, options):
+    """Section armes pour SWN"""
     weapons = creature_data.get("weapons", [])
     if not weapons:
-        return
-        
-    draw_section_title(pdf, "ARMES")
-    pdf.set_font("DejaVu", size=7)
-    
+        return section("swn_weapons", [])
+
+    blocks = [heading("ARMES")]
     for weapon in weapons:
-        safe_width = pdf.w - 2 * pdf.l_margin - 2
-        
         weapon_name = safe_text(weapon.get('name', 'Arme inconnue'))
-        damage = safe_text(weapon.get('damage', ''))
+        damage = format_damage_text(weapon.get('damage', ''), options)
         range_val = safe_text(weapon.get('range', ''))
         trait = safe_text(weapon.get('trait', ''))
-        
-        # Nom de l'arme en gras
-        pdf.set_font("DejaVu", "B", size=7)
-        safe_multi_cell(pdf, safe_width, 3, weapon_name)
-        pdf.set_font("DejaVu", size=7)
-        
+        lines = []
+
         # Dégâts et portée
         weapon_stats = []
         if damage:
             weapon_stats.append(f"Dégâts: {damage}")
         if range_val:
             weapon_stats.append(f"Portée: {range_val}")
-            
         if weapon_stats:
-            stats_text = ", ".join(weapon_stats)
-            safe_multi_cell(pdf, safe_width, 3, stats_text)
-        
+            lines.append(", ".join(weapon_stats))
+
         # Trait spécial
         if trait:
-            trait_text = f"Trait: {trait}"
-            safe_multi_cell(pdf, safe_width, 3, trait_text)
-        
-        pdf.ln(1)  # Espacement entre les armes
+            lines.append(f"Trait: {trait}")
 
-def generate_swn_creature_page(pdf, creature_data):
-    """Génère une page complète pour une créature SWN"""
-    # Titre et rôle
-    title = safe_text(creature_data.get("title", "Créature inconnue"))
-    role = safe_text(creature_data.get("role", ""))
-    
+        # Nom de l'arme en gras
+        blocks.append(entry(weapon_name, lines))
+        blocks.append(space(1))  # Espacement entre les armes
+    return section("swn_weapons", blocks)
+
+def compile_swn_card(creature_data, options=None):
+    """Compile une créature SWN en carte (voir cards.py)"""
+    options = options or {}
     # Titre de la créature avec support des sous-titres longs
-    draw_creature_title_swn(pdf, title, role)
+    name, subtitle_lines, role_lines = swn_title_lines(safe_text(creature_data.get("title", "Créature inconnue")),
+                                                       safe_text(creature_data.get("role", "")))
+    return [
+        {"kind": "scifi_title", "name": name, "subtitle": subtitle_lines, "role": role_lines,
+         "portrait": creature_data.get("portrait")},
+        compile_swn_stats_section(creature_data, options),
+        compile_swn_capacities(creature_data, options),
+        compile_swn_weapons(creature_data, options),
+    ]
 
-    # Statistiques
-    generate_swn_stats_section(pdf, creature_data)
+def generate_swn_creature_page(pdf, creature_data):
+    """Génère une page complète pour une créature SWN"""
+    draw_card(pdf, compiled_card(pdf, "swn", creature_data, compile_swn_card))
 
-    # Capacités spéciales
-    generate_swn_capacities(pdf, creature_data)
+def generate_swn_pdf(creatures_data_list, output="SWN_Creatures.pdf", on_event=None, fit=None, options=None):
+    """Génère un PDF avec toutes les créatures SWN
 
-    # Armes
-    generate_swn_weapons(pdf, creature_data)
+    Si on_event est fourni, il reçoit les événements de rendu et d'écriture
+    au lieu du message de fin affiché sur la console. Si fit est une taille
+    minimale (pt), le texte de chaque fiche est réduit pour tenir sur une carte.
+    `options` est transmis à create_pdf_base. `output` est un chemin, un flux
+    binaire ou None ; retourne le résultat de write_pdf (None -> bytes).
+    """
+    pdf = create_pdf_base(options)
 
-def generate_swn_pdf(creatures_data_list, output="SWN_Creatures.pdf"):
-    """Génère un PDF avec toutes les créatures SWN"""
-    pdf = create_pdf_base()
-    
     # Générer une page pour chaque créature
-    for creature_data in creatures_data_list:
-        generate_swn_creature_page(pdf, creature_data)
-    
-    pdf.output(output)
-    print(f"✅ PDF SWN généré : {output}")
-    return output
+    render_creatures(pdf, creatures_data_list, generate_swn_creature_page, "SWN", on_event, name_field="title", fit=fit)
+
+    result = write_pdf(pdf, output, "SWN", on_event)
+    if not on_event and is_output_path(output):
+        print(f"✅ PDF SWN généré : {output}")
+    return result
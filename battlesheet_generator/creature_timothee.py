@@ -6,44 +6,38 @@ caractéristiques, attaques, capacités) afin d'assurer un rendu et
 une structure cohérents entre les deux systèmes.
 """
 
-from .base_generator import create_pdf_base, safe_text, safe_multi_cell, draw_creature_title
-from .creature_cofmini import (
-    generate_cofmini_defenses_section,
-    generate_cofmini_stats_section,
-    generate_cofmini_attacks_section,
-    generate_cofmini_capacites_section,
-)
+from .base_generator import create_pdf_base
+from .cards import compiled_card, draw_card
+from .pipeline import render_creatures, write_pdf
+from .creature_cofmini import cofmini_title, cofmini_description, compile_cofmini_sections
 
 
-def generate_timothee_pdf(creatures, output_path):
+def compile_timothee_card(creature_data, options=None):
+    """Compile une créature JDR Timothée en carte (voir cards.py)
+
+    Titre et description optionnelle, puis les sections COF Mini pour la
+    cohérence visuelle.
+    """
+    options = options or {}
+    return ([cofmini_title(creature_data)] + cofmini_description(creature_data)
+            + compile_cofmini_sections(creature_data, options))
+
+
+def generate_timothee_creature_page(pdf, creature_data):
+    """Génère une page complète pour une créature JDR Timothée"""
+    draw_card(pdf, compiled_card(pdf, "timothee", creature_data, compile_timothee_card))
+
+
+def generate_timothee_pdf(creatures, output_path, on_event=None, fit=None, options=None):
     """Génère un PDF avec les fiches pour le système JDR Timothée.
 
     Le format attendu des créatures est compatible avec COF Mini. Le
     rendu utilise les mêmes sections et styles que COF Mini.
+    `output_path` est un chemin, un flux binaire ou None ; retourne le
+    résultat de write_pdf (chemin, flux, ou bytes si None).
     """
-    pdf = create_pdf_base()
-
-    for creature_data in creatures:
-        niveau = creature_data.get("niveau", "")
-        name = creature_data.get("name", "Créature sans nom")
-        title = f"{name} (Niveau {niveau})" if niveau != "" else name
-
-        # Titre (ajoute automatiquement une page)
-        draw_creature_title(pdf, title)
-
-        # Description (optionnelle)
-        description = creature_data.get("description", "")
-        if description:
-            pdf.set_font("DejaVu", size=8)
-            pdf.set_xy(10, pdf.get_y())
-            safe_multi_cell(pdf, 85, 4, description)
-            pdf.ln(3)
-
-        # Réutiliser les sections COF Mini pour cohérence visuelle
-        generate_cofmini_defenses_section(pdf, creature_data)
-        generate_cofmini_stats_section(pdf, creature_data)
-        generate_cofmini_attacks_section(pdf, creature_data)
-        generate_cofmini_capacites_section(pdf, creature_data)
-
-    pdf.output(output_path)
-    return True
+    pdf = create_pdf_base(options)
+
+    render_creatures(pdf, creatures, generate_timothee_creature_page, "JDR Timothée", on_event, fit=fit)
+
+    return write_pdf(pdf, output_path, "JDR Timothée", on_event)
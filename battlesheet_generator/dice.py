@@ -0,0 +1,365 @@
+"""
+Moteur d'expressions de dés
+
+Les dégâts des fiches (« 1d8+4 », « 2d6 + 1 », « 7 (4 * (1d6 + 2 + 3)) »...)
+sont compilés une seule fois en un petit arbre mémorisé. Moyenne, minimum
+et maximum se calculent directement sur l'arbre ; la distribution complète
+est obtenue par convolution NumPy, avec des distributions de groupes de
+dés (« 2d6 ») elles aussi mémorisées et partagées par tout le bestiaire.
+
+Les fragments non numériques (« niveau du sort ») sont ignorés pour le
+calcul et conservés dans `DiceExpression.extra`.
+"""
+
+import re
+from functools import lru_cache
+
+_TOKEN_RE = re.compile(r"\s*(?:(\d*)[dD](\d+)|(\d+)|([-+*()]))")
+# « 7 (4 * (1d6 + 2 + 3)) » : moyenne déjà indiquée devant l'expression
+_PRECOMPUTED_RE = re.compile(r"^\s*(\d+)\s*\((.*)\)\s*$")
+_DICE_RE = re.compile(r"\d*[dD]\d+")
+
+# Bornes des expressions acceptées : au-delà, les distributions deviendraient
+# trop coûteuses en temps ou en mémoire (fiches non fiables comprises)
+MAX_DICE_COUNT = 1000
+MAX_DICE_SIDES = 1000
+MAX_FACTOR = 1000
+MAX_SPAN = 20_000             # écart entre valeurs minimale et maximale
+
+
+class DiceSyntaxError(ValueError):
+    """Expression de dés invalide"""
+
+
+# --- Arbre d'expression ------------------------------------------------------
+# Nœuds : ("const", n) ; ("dice", nombre, faces) ; ("add", a, b) ; ("sub", a, b) ;
+# ("mul", k, expr) avec k constant.
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match or match.end() == position:
+            raise DiceSyntaxError(f"Caractère inattendu dans '{text}' à la position {position}")
+        count, sides, number, operator = match.groups()
+        if sides is not None:
+            count, sides = int(count or 1), int(sides)
+            if sides < 1 or count < 0:
+                raise DiceSyntaxError(f"Dé invalide dans '{text}': {match.group().strip()}")
+            tokens.append(("dice", count, sides))
+        elif number is not None:
+            tokens.append(("const", int(number)))
+        else:
+            tokens.append(("op", operator))
+        position = match.end()
+        while position < len(text) and text[position].isspace():
+            position += 1
+    return tokens
+
+
+class _Parser:
+    """Analyseur descendant récursif : somme de produits de facteurs"""
+
+    def __init__(self, tokens, text):
+        self.tokens = tokens
+        self.text = text
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def take(self):
+        token = self.peek()
+        self.index += 1
+        return token
+
+    def parse(self):
+        node = self.expression()
+        if self.peek() is not None:
+            raise DiceSyntaxError(f"Expression de dés invalide: '{self.text}'")
+        return node
+
+    def expression(self):
+        node = self.term()
+        while self.peek() in (("op", "+"), ("op", "-")):
+            operator = self.take()[1]
+            right = self.term()
+            node = ("add", node, right) if operator == "+" else ("sub", node, right)
+        return node
+
+    def term(self):
+        node = self.factor()
+        while self.peek() == ("op", "*"):
+            self.take()
+            right = self.factor()
+            if node[0] == "const":
+                node = ("mul", node[1], right)
+            elif right[0] == "const":
+                node = ("mul", right[1], node)
+            else:
+                raise DiceSyntaxError(f"Produit de deux jets non supporté: '{self.text}'")
+        return node
+
+    def factor(self):
+        token = self.take()
+        if token is None:
+            raise DiceSyntaxError(f"Expression de dés incomplète: '{self.text}'")
+        if token[0] in ("const", "dice"):
+            return token
+        if token == ("op", "("):
+            node = self.expression()
+            if self.take() != ("op", ")"):
+                raise DiceSyntaxError(f"Parenthèse non fermée: '{self.text}'")
+            return node
+        if token == ("op", "-"):
+            return ("mul", -1, self.factor())
+        raise DiceSyntaxError(f"Expression de dés invalide: '{self.text}'")
+
+
+def _bounds(node):
+    """(minimum, maximum, moyenne) d'un nœud"""
+    kind = node[0]
+    if kind == "const":
+        return node[1], node[1], float(node[1])
+    if kind == "dice":
+        count, sides = node[1], node[2]
+        return count, count * sides, count * (sides + 1) / 2
+    if kind == "mul":
+        low, high, mean = _bounds(node[2])
+        factor = node[1]
+        low, high = low * factor, high * factor
+        return min(low, high), max(low, high), mean * factor
+    left_low, left_high, left_mean = _bounds(node[1])
+    right_low, right_high, right_mean = _bounds(node[2])
+    if kind == "add":
+        return left_low + right_low, left_high + right_high, left_mean + right_mean
+    return left_low - right_high, left_high - right_low, left_mean - right_mean
+
+
+def _check_limits(node, text):
+    """Refuse les groupes de dés, multiplicateurs et étendues hors des bornes du module"""
+    kind = node[0]
+    if kind == "dice":
+        if node[1] > MAX_DICE_COUNT or node[2] > MAX_DICE_SIDES:
+            raise DiceSyntaxError(f"Trop de dés ou de faces dans '{text}': {node[1]}d{node[2]} "
+                                  f"(limites {MAX_DICE_COUNT}d{MAX_DICE_SIDES})")
+    elif kind == "mul":
+        if abs(node[1]) > MAX_FACTOR:
+            raise DiceSyntaxError(f"Multiplicateur trop grand dans '{text}': {node[1]} (limite {MAX_FACTOR})")
+        _check_limits(node[2], text)
+    elif kind in ("add", "sub"):
+        _check_limits(node[1], text)
+        _check_limits(node[2], text)
+
+
+def _checked(node, text):
+    _check_limits(node, text)
+    low, high, _ = _bounds(node)
+    if high - low > MAX_SPAN:
+        raise DiceSyntaxError(f"Expression de dés trop étendue: '{text}' ({low} à {high}, limite {MAX_SPAN})")
+    return node
+
+
+def _format(node):
+    kind = node[0]
+    if kind == "const":
+        return str(node[1])
+    if kind == "dice":
+        return f"{node[1]}d{node[2]}"
+    if kind == "mul":
+        inner = _format(node[2])
+        if node[2][0] in ("add", "sub"):
+            inner = f"({inner})"
+        return f"{node[1]}*{inner}"
+    operator = "+" if kind == "add" else "-"
+    right = _format(node[2])
+    if kind == "sub" and node[2][0] in ("add", "sub"):
+        right = f"({right})"
+    return f"{_format(node[1])}{operator}{right}"
+
+
+# --- Distributions (NumPy) ---------------------------------------------------
+
+def _numpy():
+    try:
+        import numpy
+    except ImportError:
+        raise ImportError("NumPy est requis pour les distributions de dégâts (pip install numpy)") from None
+    return numpy
+
+
+@lru_cache(maxsize=None)
+def dice_group_distribution(count, sides):
+    """Distribution de `count`d`sides` : (valeur minimale, tableau de probabilités)"""
+    np = _numpy()
+    # Exponentiation rapide : log2(count) convolutions au lieu de count
+    power = np.full(sides, 1.0 / sides)
+    result = np.ones(1)
+    remaining = count
+    while remaining:
+        if remaining & 1:
+            result = np.convolve(result, power)
+        remaining >>= 1
+        if remaining:
+            power = np.convolve(power, power)
+    result.flags.writeable = False
+    return count, result
+
+
+def _distribution(node):
+    """Distribution d'un nœud : (valeur minimale, tableau de probabilités par pas de 1)"""
+    np = _numpy()
+    kind = node[0]
+    if kind == "const":
+        return node[1], np.ones(1)
+    if kind == "dice":
+        return dice_group_distribution(node[1], node[2])
+    if kind == "mul":
+        offset, probabilities = _distribution(node[2])
+        factor = node[1]
+        if factor == 0:
+            return 0, np.ones(1)
+        spread = np.zeros((len(probabilities) - 1) * abs(factor) + 1)
+        spread[::abs(factor)] = probabilities
+        if factor < 0:
+            return (offset + len(probabilities) - 1) * factor, spread[::-1]
+        return offset * factor, spread
+    left_offset, left = _distribution(node[1])
+    right_offset, right = _distribution(node[2])
+    if kind == "add":
+        return left_offset + right_offset, np.convolve(left, right)
+    # Soustraction : convolution avec la distribution retournée
+    right_max = right_offset + len(right) - 1
+    return left_offset - right_max, np.convolve(left, right[::-1])
+
+
+class DiceExpression:
+    """Expression de dés compilée ; utiliser `parse_dice` pour profiter du cache"""
+
+    __slots__ = ("text", "node", "extra", "minimum", "maximum", "average", "_distribution")
+
+    def __init__(self, text, node, extra=""):
+        self.text = text
+        self.node = node
+        self.extra = extra
+        self.minimum, self.maximum, self.average = _bounds(node)
+        self._distribution = None
+
+    @property
+    def expression(self):
+        """Forme normalisée (« 1d8+4 »)"""
+        return _format(self.node)
+
+    @property
+    def has_dice(self):
+        return _DICE_RE.search(self.expression) is not None
+
+    def distribution(self):
+        """(valeurs, probabilités) sous forme de tableaux NumPy"""
+        if self._distribution is None:
+            np = _numpy()
+            offset, probabilities = _distribution(self.node)
+            values = np.arange(offset, offset + len(probabilities))
+            values.flags.writeable = False
+            probabilities = np.asarray(probabilities)
+            self._distribution = (values, probabilities)
+        return self._distribution
+
+    def __repr__(self):
+        return f"DiceExpression({self.expression!r}, moyenne={self.average:g})"
+
+
+@lru_cache(maxsize=4096)
+def parse_dice(text):
+    """Compile une expression de dés (mémorisé)
+
+    Lève DiceSyntaxError si rien n'est exploitable ou si l'expression dépasse
+    les bornes du module (MAX_DICE_COUNT, MAX_DICE_SIDES, MAX_FACTOR, MAX_SPAN).
+    """
+    source = str(text).strip()
+    precomputed = _PRECOMPUTED_RE.match(source)
+    if precomputed and _DICE_RE.search(precomputed.group(2)):
+        source = precomputed.group(2)
+
+    try:
+        node = _Parser(_tokenize(source), text).parse()
+    except DiceSyntaxError:
+        pass
+    else:
+        return DiceExpression(text, _checked(node, text))
+
+    # Expression mêlant dés et texte libre : garder les termes numériques de tête
+    match = re.match(r"[\d\sdD+\-*()]+", source)
+    if not match:
+        raise DiceSyntaxError(f"Aucune expression de dés dans '{text}'")
+    head = match.group(0).rstrip(" +-*(dD")
+    if not head:
+        raise DiceSyntaxError(f"Aucune expression de dés dans '{text}'")
+    try:
+        node = _Parser(_tokenize(head), text).parse()
+    except DiceSyntaxError:
+        raise DiceSyntaxError(f"Expression de dés invalide: '{text}'") from None
+    extra = source[len(head):].strip(" +")
+    return DiceExpression(text, _checked(node, text), extra)
+
+
+def try_parse_dice(text):
+    """Comme parse_dice mais retourne None pour un texte sans dés exploitables"""
+    if text is None or text == "" or text == "N/A":
+        return None
+    try:
+        return parse_dice(str(text))
+    except DiceSyntaxError:
+        return None
+
+
+def format_with_average(text):
+    """Ajoute la moyenne arrondie à l'inférieur après les dés : « 1d8+4 (8) »
+
+    Le texte est laissé tel quel s'il ne contient pas de dés ou si la moyenne
+    est déjà indiquée en tête (« 7 (4 * (1d6 + 5)) »).
+    """
+    text = str(text)
+    if _PRECOMPUTED_RE.match(text):
+        return text
+    dice = try_parse_dice(text)
+    if dice is None or not dice.has_dice:
+        return text
+    return f"{text} ({int(dice.average // 1)})"
+
+
+def damage_statistics(texts):
+    """Statistiques de dégâts de tout un bestiaire en un seul passage
+
+    Chaque expression distincte n'est compilée et convoluée qu'une fois.
+    Retourne un dictionnaire texte -> {"expression", "average", "minimum",
+    "maximum", "values", "probabilities"} ; les textes sans dés sont ignorés.
+    """
+    statistics = {}
+    for text in set(str(t) for t in texts if t not in (None, "")):
+        dice = try_parse_dice(text)
+        if dice is None:
+            continue
+        values, probabilities = dice.distribution()
+        statistics[text] = {
+            "expression": dice.expression,
+            "average": dice.average,
+            "minimum": dice.minimum,
+            "maximum": dice.maximum,
+            "values": values,
+            "probabilities": probabilities,
+        }
+    return statistics
+
+
+def creature_damage_expressions(creature_data):
+    """Textes de dégâts d'une créature, quel que soit son système"""
+    expressions = []
+    for action in creature_data.get("actions", []) or []:
+        expressions.append(action.get("damage"))
+    for attaque in creature_data.get("attaques", []) or []:
+        expressions.append(attaque.get("degats"))
+    for weapon in creature_data.get("weapons", []) or []:
+        expressions.append(weapon.get("damage"))
+    return [text for text in expressions if text not in (None, "", "N/A")]
@@ -0,0 +1,335 @@
+"""
+Rendu réparti par file de tâches locale
+
+Une construction est découpée en tranches de créatures ; chaque tranche est
+une tâche d'une file SQLite (un simple fichier, partageable entre plusieurs
+processus ou machines via un disque commun). Aucun service externe :
+
+- `JobQueue.submit` enregistre les tranches d'un livret : des suites
+  contiguës de créatures de coûts de rendu prédits proches (voir
+  costmodel.py), pas de nombres égaux de créatures ;
+- `run_worker` prend la tâche en attente la plus coûteuse avec un bail
+  (`lease`) de durée limitée, rend la tranche avec la fonction
+  `generate_*_pdf` du système et stocke le PDF partiel. Une tâche dont le
+  bail expire (processus arrêté) est reprise par un autre processus ; une
+  tâche en échec est retentée jusqu'à `max_attempts` fois ;
+- `coordinate` attend la fin des tranches et les assemble dans l'ordre
+  (`merge_pdfs`) pour produire le livret final.
+
+Avec l'option `toc`, les tranches sont rendues sans index : chaque tâche
+enregistre la première page de ses créatures, et le coordinateur construit
+un seul index, les signets et les destinations nommées du livret assemblé
+(`navigation_frame`), comme pour un rendu en un seul processus.
+"""
+
+import json
+import os
+import socket
+import sqlite3
+import time
+
+from .costmodel import load_cost_model, balanced_shards
+from .events import BuildEvent, FAILED, RENDERED, WRITTEN
+from .navigation import navigation_frame
+from .pdfmerge import add_named_destinations, merge_pdfs, page_count
+from .pipeline import output_label
+from .systems import get_system
+
+# Nombre moyen de créatures par tâche
+DEFAULT_SHARD_SIZE = 50
+
+# Durée d'un bail (s) : au-delà, la tâche est rendue à un autre processus
+DEFAULT_LEASE_SECONDS = 120
+
+# Nombre maximal de tentatives par tâche
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Intervalle de scrutation de la file (s)
+POLL_INTERVAL = 0.2
+
+PENDING = "pending"
+LEASED = "leased"
+DONE = "done"
+FAILED_TASK = "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS builds (
+    id INTEGER PRIMARY KEY,
+    system TEXT NOT NULL,
+    output TEXT NOT NULL,
+    shards INTEGER NOT NULL,
+    created REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    build_id INTEGER NOT NULL REFERENCES builds(id),
+    shard INTEGER NOT NULL,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    cost REAL NOT NULL DEFAULT 0,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    max_attempts INTEGER NOT NULL,
+    worker TEXT,
+    lease_expires REAL,
+    result BLOB,
+    pages TEXT,
+    error TEXT,
+    PRIMARY KEY (build_id, shard)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks(status, lease_expires);
+"""
+
+
+class DistributedBuildError(RuntimeError):
+    """Construction répartie impossible à terminer"""
+
+
+def worker_name():
+    """Identifiant d'un processus de rendu : machine et numéro de processus"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class JobQueue:
+    """File de tâches de rendu stockée dans une base SQLite"""
+
+    def __init__(self, path, timeout=30.0):
+        self.path = str(path)
+        # Journal classique plutôt que WAL : utilisable sur un disque partagé
+        # entre machines, tant qu'il respecte les verrous de fichiers
+        self.connection = sqlite3.connect(self.path, timeout=timeout, isolation_level=None)
+        self.connection.executescript(_SCHEMA)
+        columns = {row[1] for row in self.connection.execute("PRAGMA table_info(tasks)")}
+        if "cost" not in columns:
+            # File créée avant le modèle de coût
+            self.connection.execute("ALTER TABLE tasks ADD COLUMN cost REAL NOT NULL DEFAULT 0")
+        if "pages" not in columns:
+            # File créée avant l'index des livrets répartis
+            self.connection.execute("ALTER TABLE tasks ADD COLUMN pages TEXT")
+
+    def close(self):
+        self.connection.close()
+
+    def _transaction(self):
+        # BEGIN IMMEDIATE : un seul processus à la fois peut prendre un bail
+        self.connection.execute("BEGIN IMMEDIATE")
+
+    def submit(self, system, output, creatures, shard_size=DEFAULT_SHARD_SIZE, fit=None, options=None,
+               max_attempts=DEFAULT_MAX_ATTEMPTS):
+        """Enregistre un livret découpé en tranches ; retourne l'identifiant de la construction
+
+        Le livret compte autant de tranches que de paquets de `shard_size`
+        créatures, mais leurs bornes équilibrent le coût de rendu prédit.
+        L'option `toc` n'est pas transmise aux tranches : l'index est
+        construit par le coordinateur pour tout le livret.
+        """
+        shard_size = max(1, shard_size)
+        options = dict(options or {})
+        toc = bool(options.pop("toc", False))
+        costs = load_cost_model().predict_all(system, creatures)
+        bounds = balanced_shards(costs, -(-len(creatures) // shard_size)) if creatures else []
+        shards = [(creatures[start:end], sum(costs[start:end])) for start, end in bounds]
+        self._transaction()
+        try:
+            cursor = self.connection.execute(
+                "INSERT INTO builds (system, output, shards, created) VALUES (?, ?, ?, ?)",
+                (system, str(output), len(shards), time.time()))
+            build_id = cursor.lastrowid
+            self.connection.executemany(
+                "INSERT INTO tasks (build_id, shard, payload, status, cost, max_attempts) VALUES (?, ?, ?, ?, ?, ?)",
+                [(build_id, index, json.dumps({"system": system, "creatures": shard, "fit": fit,
+                                               "options": options, "toc": toc}, ensure_ascii=False),
+                  PENDING, cost, max_attempts) for index, (shard, cost) in enumerate(shards)])
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return build_id
+
+    def lease(self, worker, lease_seconds=DEFAULT_LEASE_SECONDS):
+        """Prend la tâche disponible la plus coûteuse ; retourne (build, tranche, données) ou None"""
+        now = time.time()
+        self._transaction()
+        try:
+            row = self.connection.execute(
+                "SELECT build_id, shard, payload FROM tasks"
+                " WHERE (status = ? OR (status = ? AND lease_expires < ?)) AND attempts < max_attempts"
+                " ORDER BY build_id, cost DESC, shard LIMIT 1", (PENDING, LEASED, now)).fetchone()
+            if row is not None:
+                self.connection.execute(
+                    "UPDATE tasks SET status = ?, worker = ?, attempts = attempts + 1, lease_expires = ?"
+                    " WHERE build_id = ? AND shard = ?", (LEASED, worker, now + lease_seconds, row[0], row[1]))
+            self.expire(now)
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        if row is None:
+            return None
+        return row[0], row[1], json.loads(row[2])
+
+    def expire(self, now=None):
+        """Bail expiré sans tentative restante : la tâche est définitivement en échec"""
+        self.connection.execute(
+            "UPDATE tasks SET status = ?, error = COALESCE(error, 'bail expiré')"
+            " WHERE status = ? AND lease_expires < ? AND attempts >= max_attempts",
+            (FAILED_TASK, LEASED, time.time() if now is None else now))
+
+    def complete(self, build_id, shard, worker, result, pages=None):
+        """Stocke le PDF partiel d'une tâche (ignoré si le bail a été repris par un autre processus)
+
+        `pages` : première page de chaque créature dans le PDF partiel.
+        """
+        cursor = self.connection.execute(
+            "UPDATE tasks SET status = ?, result = ?, pages = ?, error = NULL WHERE build_id = ? AND shard = ?"
+            " AND status = ? AND worker = ?",
+            (DONE, sqlite3.Binary(result), json.dumps(pages or []), build_id, shard, LEASED, worker))
+        return cursor.rowcount == 1
+
+    def fail(self, build_id, shard, worker, error):
+        """Rend la tâche à la file, ou la marque en échec après la dernière tentative"""
+        self.connection.execute(
+            "UPDATE tasks SET status = CASE WHEN attempts >= max_attempts THEN ? ELSE ? END, error = ?"
+            " WHERE build_id = ? AND shard = ? AND status = ? AND worker = ?",
+            (FAILED_TASK, PENDING, error, build_id, shard, LEASED, worker))
+
+    def build(self, build_id):
+        """Système, destination et nombre de tranches d'une construction"""
+        row = self.connection.execute("SELECT system, output, shards FROM builds WHERE id = ?",
+                                      (build_id,)).fetchone()
+        if row is None:
+            raise DistributedBuildError(f"Construction inconnue: {build_id}")
+        return {"system": row[0], "output": row[1], "shards": row[2]}
+
+    def status(self, build_id):
+        """Nombre de tâches par état pour une construction"""
+        rows = self.connection.execute("SELECT status, COUNT(*) FROM tasks WHERE build_id = ? GROUP BY status",
+                                       (build_id,)).fetchall()
+        return dict(rows)
+
+    def errors(self, build_id):
+        return self.connection.execute("SELECT shard, error FROM tasks WHERE build_id = ? AND status = ?"
+                                       " ORDER BY shard", (build_id, FAILED_TASK)).fetchall()
+
+    def results(self, build_id):
+        """PDF partiels d'une construction terminée, dans l'ordre des tranches"""
+        return [row[0] for row in self.connection.execute(
+            "SELECT result FROM tasks WHERE build_id = ? ORDER BY shard", (build_id,))]
+
+    def shards(self, build_id):
+        """(données, premières pages des créatures) de chaque tranche, dans l'ordre"""
+        return [(json.loads(row[0]), json.loads(row[1] or "[]")) for row in self.connection.execute(
+            "SELECT payload, pages FROM tasks WHERE build_id = ? ORDER BY shard", (build_id,))]
+
+    def pending(self):
+        """Nombre de tâches encore à rendre (en attente ou en cours)"""
+        return self.connection.execute("SELECT COUNT(*) FROM tasks WHERE status IN (?, ?)",
+                                       (PENDING, LEASED)).fetchone()[0]
+
+
+def render_task(payload):
+    """Rend une tranche ; retourne (PDF en bytes, première page de chaque créature)"""
+    info = get_system(payload["system"])
+    pages = []
+
+    def on_event(event):
+        if event.kind == RENDERED:
+            pages.append(event.page)
+
+    data = info["generate_pdf"](payload["creatures"], None, on_event=on_event,
+                                fit=payload["fit"], options=payload["options"])
+    return data, pages
+
+
+def run_worker(queue_path, worker=None, lease_seconds=DEFAULT_LEASE_SECONDS, idle_timeout=10.0, on_event=None):
+    """Rend les tâches de la file jusqu'à `idle_timeout` secondes sans tâche ; retourne le nombre rendu
+
+    `idle_timeout` à None attend indéfiniment de nouvelles tâches.
+    """
+    worker = worker or worker_name()
+    queue = JobQueue(queue_path)
+    rendered = 0
+    idle_since = time.monotonic()
+    try:
+        while True:
+            task = queue.lease(worker, lease_seconds)
+            if task is None:
+                if idle_timeout is not None and time.monotonic() - idle_since >= idle_timeout:
+                    return rendered
+                time.sleep(POLL_INTERVAL)
+                continue
+
+            build_id, shard, payload = task
+            start = time.perf_counter()
+            name = f"construction {build_id}, tranche {shard + 1}"
+            system = get_system(payload["system"])["name"]
+            try:
+                result, pages = render_task(payload)
+            except Exception as e:
+                queue.fail(build_id, shard, worker, str(e) or type(e).__name__)
+                if on_event:
+                    on_event(BuildEvent(FAILED, system=system, name=name, index=shard,
+                                        elapsed=time.perf_counter() - start, error=str(e)))
+            else:
+                queue.complete(build_id, shard, worker, result, pages)
+                rendered += 1
+                if on_event:
+                    on_event(BuildEvent(RENDERED, system=system, name=name, index=shard,
+                                        total=len(payload["creatures"]), elapsed=time.perf_counter() - start))
+            idle_since = time.monotonic()
+    finally:
+        queue.close()
+
+
+def _merge_with_navigation(system, parts, shards):
+    """Assemble les tranches derrière un index commun, avec signets et destinations nommées"""
+    creatures = []
+    page_counts = []
+    for data, (payload, starts) in zip(parts, shards):
+        creatures += payload["creatures"]
+        ends = starts[1:] + [page_count(data) + 1]
+        page_counts += [end - start for start, end in zip(starts, ends)]
+    frame, destinations = navigation_frame(creatures, page_counts, system, shards[0][0]["options"])
+    return add_named_destinations(merge_pdfs(parts, frame), destinations)
+
+
+def coordinate(queue_path, build_id, output=None, timeout=None, on_event=None):
+    """Attend la fin des tranches d'une construction puis écrit le livret assemblé
+
+    `output` (chemin ou flux binaire) remplace la destination enregistrée.
+    Lève DistributedBuildError si une tranche échoue définitivement ou si
+    `timeout` est dépassé.
+    """
+    queue = JobQueue(queue_path)
+    start = time.perf_counter()
+    try:
+        build = queue.build(build_id)
+        while True:
+            queue.expire()
+            status = queue.status(build_id)
+            if status.get(FAILED_TASK):
+                details = "; ".join(f"tranche {shard + 1}: {error}" for shard, error in queue.errors(build_id))
+                raise DistributedBuildError(f"Construction {build_id} en échec ({details})")
+            if status.get(DONE, 0) == build["shards"]:
+                break
+            if timeout is not None and time.perf_counter() - start > timeout:
+                raise DistributedBuildError(f"Construction {build_id} inachevée après {timeout:g}s ({status})")
+            time.sleep(POLL_INTERVAL)
+
+        parts = queue.results(build_id)
+        shards = queue.shards(build_id)
+        if shards and shards[0][0].get("toc"):
+            data = _merge_with_navigation(build["system"], parts, shards)
+        else:
+            data = merge_pdfs(parts)
+    finally:
+        queue.close()
+
+    destination = build["output"] if output is None else output
+    if hasattr(destination, "write"):
+        destination.write(data)
+    else:
+        with open(destination, "wb") as f:
+            f.write(data)
+    if on_event:
+        on_event(BuildEvent(WRITTEN, system=get_system(build["system"])["name"], output=output_label(destination),
+                            total=build["shards"], elapsed=time.perf_counter() - start))
+    return destination
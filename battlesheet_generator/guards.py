@@ -0,0 +1,286 @@
+"""
+Garde-fous pour les fiches de créatures non fiables
+
+Quand les fichiers viennent de joueurs ou d'un formulaire d'envoi, un seul
+fichier pathologique ne doit ni bloquer ni faire échouer tout le livret :
+
+- `load_guarded_creature` applique des `Limits` (taille du fichier, longueur
+  des chaînes et des listes, profondeur d'imbrication, nombre d'unités)
+  pendant l'analyse : le texte est parcouru une fois, avant que `json` ne
+  construise le moindre objet ;
+- `RenderGuard` rend chaque créature avec un budget de temps. En mode service
+  (`isolate`), la fiche est d'abord rendue à blanc dans un processus séparé,
+  limité en mémoire et tué au-delà du budget ; le document principal ne voit
+  que des fiches déjà éprouvées. Une fiche en échec est remplacée par une
+  carte de remplacement et le reste du lot continue.
+
+Les chemins écrits dans une fiche (base `extends`, portrait) sont lus dans
+le dossier de la fiche et ne peuvent pas en sortir (`contained_path`).
+"""
+
+import json
+import multiprocessing
+import os
+import re
+import signal
+import threading
+import time
+from dataclasses import dataclass, asdict, fields
+from pathlib import Path
+
+# Jetons structurants du texte JSON : chaînes, crochets et accolades, virgules
+_JSON_TOKEN_RE = re.compile(r'"(?:[^"\\]|\\.)*"|[\[\]{},]', re.DOTALL)
+
+# Options de rendu propres aux garde-fous (voir create_pdf_base)
+GUARD_OPTIONS = ("limits", "time_budget", "isolate")
+
+# Budget de temps par fiche quand les garde-fous sont actifs (s)
+DEFAULT_TIME_BUDGET = 2.0
+
+# Temps laissé au processus isolé pour démarrer et renvoyer son résultat (s)
+ISOLATION_GRACE = 1.0
+
+
+class LimitExceeded(ValueError):
+    """Fiche refusée car elle dépasse une limite"""
+
+
+class RenderTimeout(Exception):
+    """Rendu d'une fiche interrompu au-delà du budget de temps"""
+
+
+@dataclass
+class Limits:
+    """Limites appliquées aux fiches non fiables (0 désactive une limite)"""
+
+    max_file_size: int = 1_000_000
+    max_string_length: int = 20_000
+    max_list_length: int = 500
+    max_depth: int = 16
+    max_units: int = 50
+
+    @classmethod
+    def from_dict(cls, data):
+        """Limites par défaut surchargées par un dictionnaire (clés inconnues refusées)"""
+        known = {f.name for f in fields(cls)}
+        unknown = set(data) - known
+        if unknown:
+            raise ValueError(f"Limite(s) inconnue(s): {', '.join(sorted(unknown))} (disponibles: {', '.join(sorted(known))})")
+        return cls(**{key: int(value) for key, value in data.items()})
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def load_limits(path):
+    """Lit un fichier JSON de limites, par exemple {"max_file_size": 200000}"""
+    with open(path, "r", encoding="utf-8") as f:
+        return Limits.from_dict(json.load(f))
+
+
+def check_json_text(text, limits):
+    """Parcourt un texte JSON et refuse les chaînes, listes et imbrications hors limites"""
+    stack = []  # [caractère ouvrant, nombre d'éléments]
+    for match in _JSON_TOKEN_RE.finditer(text):
+        token = match.group()
+        if token[0] == '"':
+            if limits.max_string_length and len(token) - 2 > limits.max_string_length:
+                raise LimitExceeded(f"chaîne de {len(token) - 2} caractères (limite {limits.max_string_length})")
+        elif token in "[{":
+            stack.append([token, 1])
+            if limits.max_depth and len(stack) > limits.max_depth:
+                raise LimitExceeded(f"imbrication de profondeur {len(stack)} (limite {limits.max_depth})")
+        elif token in "]}":
+            if stack:
+                stack.pop()
+        elif stack and stack[-1][0] == "[":
+            stack[-1][1] += 1
+            if limits.max_list_length and stack[-1][1] > limits.max_list_length:
+                raise LimitExceeded(f"liste de plus de {limits.max_list_length} éléments")
+
+
+def check_creature(creature_data, limits):
+    """Vérifications propres aux fiches : objet JSON, nombre d'unités raisonnable"""
+    if not isinstance(creature_data, dict):
+        raise LimitExceeded("la fiche doit être un objet JSON")
+    for key in ("units", "unite"):
+        units = creature_data.get(key)
+        if units is None:
+            continue
+        if not isinstance(units, int) or isinstance(units, bool):
+            raise LimitExceeded(f"'{key}' doit être un entier")
+        if limits.max_units and units > limits.max_units:
+            raise LimitExceeded(f"'{key}' vaut {units} (limite {limits.max_units})")
+
+
+def contained_path(directory, relative):
+    """Chemin `relative` pris dans `directory`, ou None s'il en sort (chemin absolu, '..')
+
+    La vérification est lexicale : un lien symbolique placé dans le dossier
+    reste suivi, une fiche ne peut pas désigner un fichier hors du dossier.
+    """
+    base = os.path.abspath(directory)
+    path = os.path.normpath(os.path.join(base, str(relative)))
+    if path == base or os.path.commonpath([base, path]) != base:
+        return None
+    return Path(path)
+
+
+def load_guarded_creature(filepath, limits):
+    """Charge une fiche en appliquant les limites avant et pendant l'analyse"""
+    with open(filepath, "rb") as f:
+        data = f.read(limits.max_file_size + 1) if limits.max_file_size else f.read()
+    if limits.max_file_size and len(data) > limits.max_file_size:
+        raise LimitExceeded(f"fichier de plus de {limits.max_file_size} octets")
+    return parse_guarded_creature(data.decode("utf-8"), limits, check_size=False)
+
+
+def parse_guarded_creature(text, limits, check_size=True):
+    """Analyse le texte d'une fiche (ou d'un enregistrement d'un fichier en masse) sous limites"""
+    if check_size and limits.max_file_size and len(text.encode("utf-8")) > limits.max_file_size:
+        raise LimitExceeded(f"enregistrement de plus de {limits.max_file_size} octets")
+    check_json_text(text, limits)
+    creature_data = json.loads(text)
+    check_creature(creature_data, limits)
+    return creature_data
+
+
+def _rollback(pdf, mark):
+    """Retire du document les pages et le contenu ajoutés depuis `mark`"""
+    page, length = mark
+    for number in range(pdf.page, page, -1):
+        del pdf.pages[number]
+    pdf.page = page
+    if page:
+        del pdf.pages[page].contents[length:]
+
+
+def _raise_timeout(signum, frame):
+    raise RenderTimeout()
+
+
+class _Deadline:
+    """Interrompt le bloc au-delà de `seconds` (SIGALRM, fil principal uniquement)"""
+
+    def __init__(self, seconds):
+        self.seconds = seconds
+        self.armed = (seconds and hasattr(signal, "SIGALRM")
+                      and threading.current_thread() is threading.main_thread())
+
+    def __enter__(self):
+        if self.armed:
+            self.previous = signal.signal(signal.SIGALRM, _raise_timeout)
+            signal.setitimer(signal.ITIMER_REAL, self.seconds)
+        return self
+
+    def __exit__(self, *exc):
+        if self.armed:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, self.previous)
+        return False
+
+
+def _init_isolated_worker(memory_mb):
+    try:
+        import resource
+    except ImportError:
+        return
+    if memory_mb:
+        limit = memory_mb * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+
+
+def _trial_render(page_func, creature_data, fit, options):
+    """Rend une fiche dans un document jetable (exécuté dans le processus isolé)"""
+    from .base_generator import create_pdf_base
+    from .pipeline import render_creature
+
+    pdf = create_pdf_base(options)
+    try:
+        render_creature(pdf, creature_data, page_func, fit)
+    except Exception as e:
+        return str(e) or type(e).__name__
+    return None
+
+
+class RenderGuard:
+    """Rendu des fiches avec budget de temps et, en mode service, isolation
+
+    `render` retourne (échelle, tient sur une carte) comme `render_creature`,
+    ou lève une exception après avoir retiré du document la fiche partielle.
+    """
+
+    def __init__(self, time_budget=DEFAULT_TIME_BUDGET, isolate=False, memory_mb=512):
+        self.time_budget = time_budget
+        self.isolate = isolate
+        self.memory_mb = memory_mb
+        self._pool = None
+
+    def _trial(self, page_func, creature_data, fit, options):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(1, initializer=_init_isolated_worker, initargs=(self.memory_mb,))
+        result = self._pool.apply_async(_trial_render, (page_func, creature_data, fit, options))
+        timeout = self.time_budget + ISOLATION_GRACE if self.time_budget else None
+        try:
+            error = result.get(timeout)
+        except multiprocessing.TimeoutError:
+            self._restart()
+            raise RenderTimeout() from None
+        except Exception as e:
+            # Processus mort (mémoire, plantage) : le suivant repart d'un processus neuf
+            self._restart()
+            raise RuntimeError(f"processus de rendu interrompu ({type(e).__name__})") from None
+        if error:
+            raise RuntimeError(error)
+
+    def _restart(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool = None
+
+    def render(self, pdf, creature_data, page_func, fit=None):
+        from .pipeline import render_creature
+
+        options = {key: value for key, value in getattr(pdf, "card_options", {}).items()
+                   if key not in GUARD_OPTIONS}
+        start = time.perf_counter()
+        if self.isolate:
+            try:
+                self._trial(page_func, creature_data, fit, options)
+            except RenderTimeout:
+                raise RenderTimeout(f"rendu de plus de {self.time_budget:g}s") from None
+
+        mark = (pdf.page, len(pdf.pages[pdf.page].contents) if pdf.page else 0)
+        remaining = self.time_budget - (time.perf_counter() - start) if self.time_budget else 0
+        if self.time_budget and remaining <= 0:
+            raise RenderTimeout(f"rendu de plus de {self.time_budget:g}s")
+        try:
+            with _Deadline(remaining):
+                return render_creature(pdf, creature_data, page_func, fit)
+        except RenderTimeout:
+            _rollback(pdf, mark)
+            raise RenderTimeout(f"rendu de plus de {self.time_budget:g}s") from None
+        except Exception:
+            _rollback(pdf, mark)
+            raise
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
+
+
+def render_guard(options):
+    """RenderGuard décrit par des options de rendu, ou None si aucun garde-fou n'est demandé"""
+    if not options or not any(key in options for key in GUARD_OPTIONS):
+        return None
+    return RenderGuard(options.get("time_budget", DEFAULT_TIME_BUDGET), bool(options.get("isolate")))
+
+
+def creature_limits(options):
+    """Limits décrites par des options de rendu ({"limits": {...}}), ou None"""
+    if not options or "limits" not in options:
+        return None
+    return Limits.from_dict(options["limits"] or {})
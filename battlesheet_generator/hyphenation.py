@@ -0,0 +1,120 @@
+"""
+Césure française
+
+Les motifs de césure (algorithme de Liang, comme les motifs TeX) décrivent
+la coupure syllabique du français : coupure devant une consonne suivie
+d'une voyelle (« ré-gé-né-ra-tion »), entre deux consonnes (« ar-mure »),
+jamais à l'intérieur des groupes inséparables (bl, br, ch, gn, ph, tr...).
+Ils sont compilés une fois par processus en un trie compact (dictionnaires
+imbriqués, valeurs de motifs partagées), et le résultat de chaque mot est
+mémorisé : une carte ne coûte qu'une recherche par mot déjà rencontré.
+
+Les coupures sont insérées sous forme de tirets conditionnels (U+00AD) :
+FPDF coupe la ligne à cet endroit en affichant un trait d'union, et
+`layout.wrap_paragraph` reproduit ce découpage. Un tiret conditionnel non
+utilisé n'est pas écrit.
+"""
+
+import re
+
+SOFT_HYPHEN = "\u00ad"
+
+# Nombre minimal de lettres avant et après une coupure (valeurs TeX du français)
+LEFT_MIN = 2
+RIGHT_MIN = 3
+# Les mots plus courts ne sont jamais coupés
+MIN_WORD_LENGTH = LEFT_MIN + RIGHT_MIN + 1
+
+VOWELS = "aàâäeéèêëiîïoôöuùûüyÿæœ"
+# x entre deux voyelles ne se coupe pas (« exa-men ») : pas de coupure devant x
+CONSONANTS = "bcçdfghjklmnpqrstvwz"
+# Groupes de consonnes qui ne se séparent pas et passent ensemble à la ligne
+INSEPARABLE = (
+    "bl", "br", "ch", "cl", "cr", "dr", "fl", "fr", "gl", "gn", "gr", "kl", "kr",
+    "ph", "pl", "pr", "rh", "th", "tr", "vr", "wh",
+)
+INSEPARABLE_TRIPLES = ("chl", "chr", "phl", "phr", "thr")
+
+# Mots coupables : lettres seulement (les apostrophes, chiffres et traits d'union séparent les mots)
+_WORD_RE = re.compile(r"[^\W\d_]{%d,}" % MIN_WORD_LENGTH)
+
+# Trie compilé (voir compile_patterns) et coupures mémorisées : mot -> mot avec tirets conditionnels
+_trie = None
+_hyphenated_words = {}
+
+
+def french_patterns():
+    """Motifs de Liang du français : lettres entrecoupées de chiffres de priorité"""
+    patterns = [f"1{consonant}{vowel}" for consonant in CONSONANTS for vowel in VOWELS]
+    patterns += [f"1{first}2{second}" for first, second in INSEPARABLE]
+    patterns += [f"1{first}2{second}2{third}" for first, second, third in INSEPARABLE_TRIPLES]
+    return patterns
+
+
+def compile_patterns(patterns):
+    """Compile des motifs de Liang en trie : lettre -> nœud, valeurs du motif sous la clé ''
+
+    Les tuples de valeurs identiques sont partagés entre les nœuds.
+    """
+    trie = {}
+    shared_points = {}
+    for pattern in patterns:
+        letters = re.sub(r"\d", "", pattern)
+        points = [0] * (len(letters) + 1)
+        position = 0
+        for char in pattern:
+            if char.isdigit():
+                points[position] = int(char)
+            else:
+                position += 1
+        node = trie
+        for letter in letters:
+            node = node.setdefault(letter, {})
+        points = tuple(points)
+        node[""] = shared_points.setdefault(points, points)
+    return trie
+
+
+def _get_trie():
+    global _trie
+    if _trie is None:
+        _trie = compile_patterns(french_patterns())
+    return _trie
+
+
+def hyphen_positions(word):
+    """Positions (index de lettre) où `word` peut être coupé"""
+    trie = _get_trie()
+    padded = f".{word.lower()}."
+    values = [0] * (len(padded) + 1)
+    for start in range(len(padded)):
+        node = trie
+        for offset in range(start, len(padded)):
+            node = node.get(padded[offset])
+            if node is None:
+                break
+            points = node.get("")
+            if points:
+                for index, value in enumerate(points, start):
+                    if value > values[index]:
+                        values[index] = value
+    # values[i + 1] : entre les lettres i - 1 et i du mot
+    return [i for i in range(LEFT_MIN, len(word) - RIGHT_MIN + 1) if values[i + 1] % 2]
+
+
+def hyphenate_word(word):
+    """Mot avec un tiret conditionnel à chaque coupure possible (mémorisé)"""
+    result = _hyphenated_words.get(word)
+    if result is None:
+        result = word
+        # Sigles et noms en capitales (« PNJ », « McAllister ») laissés entiers
+        if not any(char.isupper() for char in word[1:]):
+            for position in reversed(hyphen_positions(word)):
+                result = result[:position] + SOFT_HYPHEN + result[position:]
+        _hyphenated_words[word] = result
+    return result
+
+
+def hyphenate_text(text):
+    """Texte dont les mots assez longs portent leurs coupures en tirets conditionnels"""
+    return _WORD_RE.sub(lambda match: hyphenate_word(match.group()), text)
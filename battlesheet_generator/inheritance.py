@@ -0,0 +1,320 @@
+"""
+Héritage entre fiches et bibliothèque de capacités partagées
+
+Une fiche peut déclarer `"extends": "<base>"` : elle reprend alors la fiche
+`<base>.json` du même dossier (un nom de fichier, sans chemin) et n'écrit
+que ses différences. La fusion est récursive pour les objets ; une valeur
+`null` supprime la clé héritée, une liste remplace la liste héritée, et une
+clé suffixée par `+` lui ajoute des éléments :
+
+    {"extends": "_troll", "name": "Troll des cavernes",
+     "defenses": {"points_de_vie": 45},
+     "capacites_speciales+": [{"ref": "allonge"}]}
+
+Dans n'importe quelle liste, un élément `{"ref": "<id>"}` est remplacé par
+l'entrée `<id>` de la bibliothèque `_abilities.json` du dossier (texte ou
+objet). `"values"` remplit les champs `{nom}` de l'entrée, les autres clés
+remplacent celles d'une entrée objet :
+
+    _abilities.json : {"regeneration": {"nom": "Régénération",
+                                        "description": "Récupère {pv} PV au début de son tour."}}
+    fiche           : {"ref": "regeneration", "values": {"pv": 5}}
+
+Les fichiers dont le nom commence par `_` (bases communes, bibliothèque) ne
+sont pas des cartes : la découverte des fiches les ignore.
+
+`CreatureResolver` construit le graphe d'héritage, détecte les cycles et
+mémorise chaque fiche résolue. Quand une base ou une entrée de la
+bibliothèque change, seules les fiches qui en dépendent sont invalidées
+(`update`, `update_library` retournent leurs noms) ; `dependents` donne les
+fiches à reconstruire après la modification d'une base.
+"""
+
+import copy
+import json
+import os
+import re
+from dataclasses import asdict
+from pathlib import Path
+
+from .base_generator import load_creature
+from .guards import contained_path, load_guarded_creature
+
+# Bibliothèque de capacités d'un dossier de fiches
+LIBRARY_FILE = "_abilities.json"
+
+# Champ `{nom}` d'une entrée de la bibliothèque
+_PLACEHOLDER_RE = re.compile(r"\{(\w+)\}")
+
+# Résolveurs par dossier (et limites de chargement), conservés entre les chargements
+_resolvers = {}
+
+
+class InheritanceError(ValueError):
+    """Héritage ou référence de capacité impossible à résoudre"""
+
+
+def needs_resolution(creature_data):
+    """Vrai si une fiche hérite d'une base ou référence la bibliothèque"""
+    if "extends" in creature_data:
+        return True
+    return any(isinstance(item, dict) and "ref" in item
+               for value in creature_data.values() if isinstance(value, list) for item in value)
+
+
+def merge_creature(base, child):
+    """Fiche `child` appliquée sur `base` (voir les règles de fusion du module)"""
+    result = copy.deepcopy(base)
+    for key, value in child.items():
+        if key == "extends":
+            continue
+        if key.endswith("+") and isinstance(value, list):
+            key = key[:-1]
+            inherited = result.get(key, [])
+            if not isinstance(inherited, list):
+                raise InheritanceError(f"'{key}+' ajoute à une valeur qui n'est pas une liste")
+            result[key] = inherited + copy.deepcopy(value)
+        elif value is None:
+            result.pop(key, None)
+        elif isinstance(value, dict) and isinstance(result.get(key), dict):
+            result[key] = merge_creature(result[key], value)
+        else:
+            result[key] = copy.deepcopy(value)
+    return result
+
+
+def _fill(value, values):
+    """Remplit les champs `{nom}` connus des textes d'une entrée ; les autres accolades restent"""
+    if isinstance(value, str):
+        return _PLACEHOLDER_RE.sub(lambda match: str(values.get(match.group(1), match.group(0))), value)
+    if isinstance(value, dict):
+        return {key: _fill(item, values) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_fill(item, values) for item in value]
+    return value
+
+
+def expand_references(creature_data, library, used=None):
+    """Copie d'une fiche dont les éléments `{"ref": id}` sont remplacés par la bibliothèque
+
+    Les identifiants utilisés sont ajoutés à l'ensemble `used`.
+    """
+    result = {}
+    for key, value in creature_data.items():
+        if not isinstance(value, list):
+            result[key] = value
+            continue
+        items = []
+        for item in value:
+            if isinstance(item, dict) and "ref" in item:
+                ability_id = item["ref"]
+                if ability_id not in library:
+                    raise InheritanceError(f"capacité inconnue dans la bibliothèque: '{ability_id}'")
+                if used is not None:
+                    used.add(ability_id)
+                entry = _fill(library[ability_id], item.get("values", {}))
+                overrides = {name: field for name, field in item.items() if name not in ("ref", "values")}
+                if overrides:
+                    if not isinstance(entry, dict):
+                        raise InheritanceError(f"'{ability_id}' est un texte : seules les valeurs "
+                                               f"(\"values\") peuvent être remplacées")
+                    entry = merge_creature(entry, overrides)
+                item = entry
+            items.append(item)
+        result[key] = items
+    return result
+
+
+class CreatureResolver:
+    """Résout l'héritage et les références d'un ensemble de fiches nommées, avec mémorisation
+
+    `load_raw(nom)` fournit la fiche brute d'une base absente de l'ensemble
+    (KeyError si elle n'existe pas).
+    """
+
+    def __init__(self, load_raw=None, library=None):
+        self._load_raw = load_raw
+        self.library = dict(library or {})
+        self._raw = {}
+        self._bases = {}                # nom -> base directe
+        self._children = {}             # base -> fiches qui l'étendent directement
+        self._merged = {}               # nom -> fiche héritée, références non développées
+        self._resolved = {}             # nom -> fiche résolue
+        self._used = {}                 # nom -> identifiants de la bibliothèque utilisés
+
+    def add(self, name, raw):
+        """Ajoute (ou remplace) la fiche brute `name` ; retourne les fiches invalidées"""
+        invalidated = self._invalidate(name) if name in self._raw else set()
+        old_base = self._bases.pop(name, None)
+        if old_base is not None:
+            self._children.get(old_base, set()).discard(name)
+        self._raw[name] = raw
+        base = raw.get("extends")
+        if base is not None:
+            if not isinstance(base, str):
+                raise InheritanceError(f"'{name}': \"extends\" doit être le nom d'une fiche")
+            self._bases[name] = base
+            self._children.setdefault(base, set()).add(name)
+        return invalidated
+
+    update = add
+
+    def update_library(self, library):
+        """Remplace la bibliothèque ; retourne les fiches invalidées par les entrées modifiées"""
+        changed = {ability_id for ability_id in set(self.library) | set(library)
+                   if self.library.get(ability_id) != library.get(ability_id)}
+        self.library = dict(library)
+        invalidated = set()
+        for name, used in list(self._used.items()):
+            if used & changed:
+                invalidated |= self._invalidate(name)
+        return invalidated
+
+    def dependents(self, name):
+        """Fiches qui héritent, directement ou non, de `name`"""
+        result = set()
+        pending = [name]
+        while pending:
+            for child in self._children.get(pending.pop(), ()):
+                if child not in result:
+                    result.add(child)
+                    pending.append(child)
+        return result
+
+    def _invalidate(self, name):
+        invalidated = {name} | self.dependents(name)
+        for dependent in invalidated:
+            self._merged.pop(dependent, None)
+            self._resolved.pop(dependent, None)
+            self._used.pop(dependent, None)
+        return invalidated
+
+    def _raw_creature(self, name):
+        if name not in self._raw:
+            if self._load_raw is None:
+                raise InheritanceError(f"fiche de base introuvable: '{name}'")
+            try:
+                raw = self._load_raw(name)
+            except (KeyError, OSError):
+                raise InheritanceError(f"fiche de base introuvable: '{name}'") from None
+            self.add(name, raw)
+        return self._raw[name]
+
+    def _merge(self, name, chain=()):
+        merged = self._merged.get(name)
+        if merged is not None:
+            return merged
+        if name in chain:
+            cycle = " -> ".join(chain[chain.index(name):] + (name,))
+            raise InheritanceError(f"héritage cyclique: {cycle}")
+        raw = self._raw_creature(name)
+        base = self._bases.get(name)
+        if base is None:
+            merged = {key: value for key, value in raw.items() if key != "extends"}
+        else:
+            merged = merge_creature(self._merge(base, chain + (name,)), raw)
+        self._merged[name] = merged
+        return merged
+
+    def resolve(self, name):
+        """Fiche `name` résolue (héritage puis références), mémorisée jusqu'à invalidation"""
+        resolved = self._resolved.get(name)
+        if resolved is None:
+            used = set()
+            resolved = expand_references(self._merge(name), self.library, used)
+            self._resolved[name] = resolved
+            self._used[name] = used
+        return copy.deepcopy(resolved)
+
+
+class DirectoryResolver(CreatureResolver):
+    """Résolveur des fiches d'un dossier : bases et bibliothèque relues quand leur fichier change"""
+
+    def __init__(self, directory, limits=None):
+        self.directory = Path(directory)
+        self.limits = limits
+        self._stamps = {}               # nom -> (mtime, taille) du fichier lu
+        self._library_stamp = None
+        super().__init__(self._load_file)
+
+    def _read(self, path):
+        return load_creature(path) if self.limits is None else load_guarded_creature(path, self.limits)
+
+    @staticmethod
+    def _stamp(path):
+        stat = os.stat(path)
+        return stat.st_mtime_ns, stat.st_size
+
+    def _load_file(self, name):
+        path = contained_path(self.directory, f"{name}.json")
+        if path is None or path.parent != Path(os.path.abspath(self.directory)):
+            raise InheritanceError(f"fiche de base hors du dossier: '{name}'")
+        if not path.is_file():
+            raise KeyError(name)
+        self._stamps[name] = self._stamp(path)
+        return self._read(path)
+
+    def refresh(self):
+        """Relit la bibliothèque et les bases modifiées sur disque ; retourne les fiches invalidées"""
+        invalidated = set()
+        library_path = self.directory / LIBRARY_FILE
+        stamp = self._stamp(library_path) if library_path.is_file() else None
+        if stamp != self._library_stamp:
+            self._library_stamp = stamp
+            try:
+                library = self._read(library_path) if stamp else {}
+            except json.JSONDecodeError as e:
+                raise InheritanceError(f"bibliothèque invalide '{library_path}': {e}") from None
+            if not isinstance(library, dict):
+                raise InheritanceError(f"'{library_path}' doit contenir un objet id -> capacité")
+            invalidated |= self.update_library(library)
+        for name, stamp in list(self._stamps.items()):
+            path = self.directory / f"{name}.json"
+            current = self._stamp(path) if path.is_file() else None
+            if current != stamp:
+                del self._stamps[name]
+                invalidated |= self._invalidate(name)
+                self._raw.pop(name, None)
+        return invalidated
+
+    def resolve_creature(self, name, creature_data):
+        """Résout une fiche chargée du dossier (nom : nom du fichier sans extension)"""
+        self.refresh()
+        if self._raw.get(name) != creature_data:
+            self._stamps.pop(name, None)
+            self.add(name, creature_data)
+        return self.resolve(name)
+
+
+def directory_resolver(directory, limits=None):
+    """Résolveur partagé d'un dossier de fiches (un par dossier et par limites de chargement)"""
+    key = (str(Path(directory).resolve()), None if limits is None else tuple(asdict(limits).items()))
+    resolver = _resolvers.get(key)
+    if resolver is None:
+        resolver = _resolvers[key] = DirectoryResolver(directory, limits)
+    return resolver
+
+
+def resolve_loaded_creature(source, creature_data, limits=None):
+    """Fiche chargée depuis `source`, son héritage et ses références résolus
+
+    Une fiche lue dans un fichier en masse n'a pas de nom : elle peut étendre
+    une fiche du dossier mais ne sert de base à aucune autre.
+    """
+    if not needs_resolution(creature_data):
+        return creature_data
+    path = Path(str(source).split("#", 1)[0])
+    resolver = directory_resolver(path.parent, limits)
+    if "#" not in str(source) and path.suffix == ".json":
+        return resolver.resolve_creature(path.stem, creature_data)
+    resolver.refresh()
+    name = f"{path.name}#{id(creature_data)}"
+    resolver.add(name, creature_data)
+    try:
+        return resolver.resolve(name)
+    finally:
+        resolver._invalidate(name)
+        resolver._raw.pop(name, None)
+        resolver._bases.pop(name, None)
+        for children in resolver._children.values():
+            children.discard(name)
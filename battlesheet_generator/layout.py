@@ -0,0 +1,336 @@
+"""
+Mesure du texte et mise en page sans rendu
+
+`LayoutCanvas` reproduit le sous-ensemble de l'API FPDF utilisé par les
+fonctions `generate_*_creature_page` (curseur, polices, cellules, sauts de
+page) sans rien dessiner. Le découpage des lignes suit l'algorithme de
+`FPDF.multi_cell` (coupure à la dernière espace, mots trop longs coupés au
+caractère) mais s'appuie sur des largeurs de mots mémorisées : exécuter une
+page sur cette surface ne coûte que quelques additions par mot.
+
+Le mode ajustement (`fit_text_scale`) s'en sert pour chercher la plus grande
+échelle de texte qui tient sur une seule carte.
+"""
+
+from .base_generator import create_pdf_base, A6_WIDTH_MM, A6_HEIGHT_MM, BODY_FONT_SIZE
+from .draft import draft_text
+from .hyphenation import SOFT_HYPHEN
+from .memo import LruCache
+
+PT_TO_MM = 25.4 / 72
+
+# Pas de recherche de la taille du corps de texte (pt)
+FIT_STEP_PT = 0.25
+
+# Instances de mesure partagées : brouillon ou non -> FPDF
+_measure_pdfs = {}
+# Largeur des mots en millièmes d'em : (police, type de police, mot) -> largeur
+WORD_WIDTHS_SIZE = 50_000
+_word_widths = LruCache(WORD_WIDTHS_SIZE)
+
+
+def get_measure_pdf(draft=False):
+    """Instance FPDF partagée servant uniquement à charger les polices et mesurer le texte
+
+    En brouillon, les polices standard aux largeurs précalculées évitent
+    d'analyser les fichiers TTF.
+    """
+    measure_pdf = _measure_pdfs.get(draft)
+    if measure_pdf is None:
+        measure_pdf = create_pdf_base({"draft": True} if draft else None)
+        measure_pdf.add_page()
+        _measure_pdfs[draft] = measure_pdf
+    return measure_pdf
+
+
+def word_units(font, word):
+    """Largeur d'un mot en millièmes d'em (mémorisée par police)"""
+    key = (font.fontkey, font.type, word)
+    width = _word_widths.get(key)
+    if width is None:
+        if font.type == "core":
+            # Police standard du brouillon : mesure du texte tel qu'il sera écrit
+            word = draft_text(word)
+        width = font.get_text_width(word, 1000, None)[1]
+        _word_widths[key] = width
+    return width
+
+
+def _hyphen_break(font, syllables, start, limit):
+    """Nombre de syllabes qui tiennent, suivies d'un trait d'union, après `start` (0 : aucune)"""
+    hyphen = word_units(font, "-")
+    count = 0
+    used = start
+    for syllable in syllables[:-1]:
+        used += word_units(font, syllable)
+        if used + hyphen > limit:
+            break
+        count += 1
+    return count
+
+
+def wrap_paragraph(font, text, size_pt, max_width):
+    """Découpe un paragraphe (sans retour à la ligne) comme FPDF.multi_cell
+
+    Comme FPDF, un mot portant des tirets conditionnels (voir hyphenation.py)
+    est coupé au dernier tiret dont la syllabe et le trait d'union tiennent
+    sur la ligne ; un tiret n'est testé que si le trait d'union y tient.
+    """
+    scale = size_pt * 0.001 * PT_TO_MM  # millièmes d'em -> mm
+    limit = max_width / scale
+    space = word_units(font, " ")
+
+    lines = []
+    line = []
+    width = 0.0
+    for word in text.split(" "):
+        if SOFT_HYPHEN in word:
+            syllables = word.split(SOFT_HYPHEN)
+            while len(syllables) > 1:
+                start = width + space if line else 0.0
+                last = word_units(font, syllables[-1])
+                head = sum(word_units(font, syllable) for syllable in syllables[:-1])
+                if start + max(head + last, head + word_units(font, "-")) <= limit:
+                    break
+                count = _hyphen_break(font, syllables, start, limit)
+                if count:
+                    lines.append(" ".join(line + ["".join(syllables[:count]) + "-"]))
+                    syllables = syllables[count:]
+                elif line:
+                    lines.append(" ".join(line))
+                else:
+                    # Aucune syllabe ne tient : coupure au caractère ci-dessous
+                    break
+                line = []
+                width = 0.0
+            word = "".join(syllables)
+
+        word_width = word_units(font, word)
+        if line:
+            if width + space + word_width <= limit:
+                line.append(word)
+                width += space + word_width
+                continue
+            lines.append(" ".join(line))
+            line = []
+
+        # Mot plus large que la ligne : coupure au caractère
+        while word_width > limit and len(word) > 1:
+            cut = 1
+            used = word_units(font, word[0])
+            while cut < len(word):
+                char_width = word_units(font, word[cut])
+                if used + char_width > limit:
+                    break
+                used += char_width
+                cut += 1
+            lines.append(word[:cut])
+            word = word[cut:]
+            word_width = word_units(font, word)
+
+        line = [word]
+        width = word_width
+
+    if line or not lines:
+        lines.append(" ".join(line))
+    return lines
+
+
+class LayoutCanvas:
+    """Surface compatible FPDF qui calcule la mise en page sans rien dessiner"""
+
+    def __init__(self, text_scale=1.0, options=None):
+        self.card_options = dict(options or {})
+        self._measure = get_measure_pdf(bool(self.card_options.get("draft")))
+        self.text_scale = text_scale
+        self.w = A6_WIDTH_MM
+        self.h = A6_HEIGHT_MM
+        self.l_margin = self._measure.l_margin
+        self.r_margin = self._measure.r_margin
+        self.t_margin = self._measure.t_margin
+        self.b_margin = self._measure.b_margin
+        self.c_margin = self._measure.c_margin
+        self.line_width = self._measure.line_width
+        self.x = self.l_margin
+        self.y = self.t_margin
+        self.pages = []
+        self._lasth = 0
+        self._text_color = (0, 0, 0)
+        self._draw_color = (0, 0, 0)
+        self.set_font("DejaVu", size=8)
+
+    # --- État ---------------------------------------------------------------
+
+    def set_font(self, family=None, style="", size=0):
+        self._measure.set_font(family, style, size)
+        self.font_family = self._measure.font_family
+        self.font_style = self._measure.font_style
+        self.font_size_pt = self._measure.font_size_pt
+        self.font_size = self.font_size_pt * PT_TO_MM
+        self.current_font = self._measure.current_font
+
+    def set_text_color(self, r, g=-1, b=-1):
+        self._text_color = (r, r, r) if g == -1 else (r, g, b)
+
+    def set_draw_color(self, r, g=-1, b=-1):
+        self._draw_color = (r, r, r) if g == -1 else (r, g, b)
+
+    def set_left_margin(self, margin):
+        self.l_margin = margin
+        if self.x < margin:
+            self.x = margin
+
+    def get_x(self):
+        return self.x
+
+    def get_y(self):
+        return self.y
+
+    def set_x(self, x):
+        self.x = x if x >= 0 else self.w + x
+
+    def set_y(self, y):
+        self.x = self.l_margin
+        self.y = y if y >= 0 else self.h + y
+
+    def set_xy(self, x, y):
+        self.set_y(y)
+        self.set_x(x)
+
+    def get_string_width(self, text):
+        return word_units(self.current_font, text) * self.font_size_pt * 0.001 * PT_TO_MM
+
+    # --- Pages --------------------------------------------------------------
+
+    def add_page(self):
+        self.pages.append([])
+        self.x = self.l_margin
+        self.y = self.t_margin
+
+    def _break_if_needed(self, height):
+        if self.y + height > self.h - self.b_margin:
+            x = self.x
+            self.add_page()
+            self.x = x
+
+    # --- Dessin (points d'extension pour les sous-classes) -----------------
+
+    def _emit(self, element):
+        pass
+
+    def _text(self, x, y, height, text, anchor="start", length=None):
+        pass
+
+    def _rect(self, x, y, w, h):
+        pass
+
+    def _wrap(self, text, width):
+        """Lignes d'un paragraphe pour une cellule de largeur `width`"""
+        return wrap_paragraph(self.current_font, text, self.font_size_pt, width - 2 * self.c_margin)
+
+    def line(self, x1, y1, x2, y2):
+        pass
+
+    def image(self, name, x=None, y=None, w=0, h=0):
+        pass
+
+    def rect(self, x, y, w, h, style=None):
+        self._rect(x, y, w, h)
+
+    def cell(self, w=None, h=None, text="", border=0, ln=0, align="L"):
+        if h is None:
+            h = self.font_size
+        self._break_if_needed(h)
+        if not w:
+            w = self.w - self.r_margin - self.x
+
+        if border:
+            self._rect(self.x, self.y, w, h)
+        if text:
+            if align == "C":
+                self._text(self.x + w / 2, self.y, h, text, anchor="middle")
+            elif align == "R":
+                self._text(self.x + w - self.c_margin, self.y, h, text, anchor="end")
+            else:
+                self._text(self.x + self.c_margin, self.y, h, text)
+
+        self._lasth = h
+        if ln == 1 or ln is True:
+            self.x = self.l_margin
+            self.y += h
+        elif ln == 2:
+            self.y += h
+        else:
+            self.x += w
+
+    def multi_cell(self, w, h=None, text="", border=0, align="J"):
+        if h is None:
+            h = self.font_size
+        if not w:
+            w = self.w - self.r_margin - self.x
+
+        x = self.x
+        text_width = w - 2 * self.c_margin
+        for paragraph in str(text).split("\n"):
+            lines = self._wrap(paragraph, w)
+            for i, line in enumerate(lines):
+                self._break_if_needed(h)
+                self.x = x
+                if border:
+                    self._rect(x, self.y, w, h)
+                last = i == len(lines) - 1
+                if align == "J" and not last and " " in line.strip():
+                    self._text(x + self.c_margin, self.y, h, line.rstrip(), length=text_width)
+                elif align == "C":
+                    self._text(x + w / 2, self.y, h, line, anchor="middle")
+                elif align == "R":
+                    self._text(x + w - self.c_margin, self.y, h, line, anchor="end")
+                else:
+                    self._text(x + self.c_margin, self.y, h, line)
+                self.y += h
+
+        self._lasth = h
+        self.x = x + w
+
+    def ln(self, h=None):
+        self.x = self.l_margin
+        if h is not None:
+            self.y += h
+        elif self._lasth:
+            self.y += self._lasth
+        else:
+            self.y += self.font_size
+
+
+def measure_pages(page_func, creature_data, text_scale=1.0, options=None):
+    """Nombre de cartes occupées par une créature à une échelle de texte donnée"""
+    canvas = LayoutCanvas(text_scale, options)
+    page_func(canvas, creature_data)
+    return len(canvas.pages)
+
+
+def fit_text_scale(page_func, creature_data, min_size=5.0, body_size=BODY_FONT_SIZE, options=None):
+    """Cherche la plus grande échelle de texte qui tient sur une carte
+
+    Recherche dichotomique sur la taille du corps de texte, de `body_size`
+    jusqu'à `min_size` par pas de FIT_STEP_PT. Retourne (échelle, tient) ;
+    si rien ne tient, l'échelle minimale est retournée avec tient=False.
+    """
+    if measure_pages(page_func, creature_data, options=options) <= 1:
+        return 1.0, True
+
+    steps = int(round((body_size - min_size) / FIT_STEP_PT))
+    low, high = 1, steps  # nombre de pas de réduction
+    best = None
+    while low <= high:
+        middle = (low + high) // 2
+        scale = (body_size - middle * FIT_STEP_PT) / body_size
+        if measure_pages(page_func, creature_data, scale, options) <= 1:
+            best = scale
+            high = middle - 1
+        else:
+            low = middle + 1
+
+    if best is None:
+        return min_size / body_size, False
+    return best, True
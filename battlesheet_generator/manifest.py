@@ -0,0 +1,239 @@
+"""
+Construction groupée de livrets décrits par un manifeste
+
+Un manifeste JSON décrit plusieurs livrets (système, sélection, options).
+`build_manifest` les produit en une seule invocation :
+
+- chaque dossier de créatures est découvert et chargé une seule fois, et les
+  requêtes d'un même dossier partagent le même `Bestiary` ;
+- en mode ajustement, l'échelle de chaque fiche distincte est calculée une
+  seule fois, puis transmise aux livrets qui la contiennent ;
+- les livrets sont rendus par un pool de processus dont chaque processus
+  charge les polices une fois (`add_cached_font`) et les réutilise pour tous
+  ses livrets ;
+- le travail est réparti selon le coût prédit de chaque fiche (voir
+  costmodel.py) : les mesures d'ajustement en lots de coûts proches, les
+  livrets du plus coûteux au moins coûteux, chaque processus libre prenant
+  le lot ou le livret suivant.
+
+Format :
+
+    {
+      "output_dir": "output/session12",
+      "jobs": 4,
+      "defaults": {"fit": true, "dice_average": true},
+      "booklets": [
+        {"output": "crypte.pdf", "system": "dnd", "query": "type ~ squelette"},
+        {"output": "boss.pdf", "system": "swn", "creatures": ["Umbrokh", "Stalker"]},
+        {"output": "bestiaire.pdf", "system": "cofmini", "fit": 5.5}
+      ]
+    }
+"""
+
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+from .base_generator import create_pdf_base
+from .costmodel import load_cost_model, lpt_schedule
+from .events import BuildEvent, FAILED
+from .layout import get_measure_pdf
+from .pipeline import discover_creature_files, load_creatures, fit_cache_key, cached_fit_scale, seed_fit_cache
+from .query import Bestiary
+from .systems import get_system
+
+# Taille minimale du corps de texte pour "fit": true (pt)
+DEFAULT_FIT_MIN_SIZE = 5.0
+
+# Lots de mesures d'ajustement par processus : des lots plus petits que la
+# part de chaque processus laissent les processus libres reprendre le reste
+BATCHES_PER_PROCESS = 4
+
+# Options de livret reconnues en plus de la sélection
+BOOKLET_OPTIONS = ("fit", "dice_average", "hyphenate")
+
+
+class ManifestError(ValueError):
+    """Manifeste invalide"""
+
+
+def load_manifest(path):
+    """Lit et valide un manifeste ; retourne un dictionnaire normalisé"""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+    except (OSError, json.JSONDecodeError) as e:
+        raise ManifestError(f"Manifeste illisible '{path}': {e}") from None
+
+    if not isinstance(data, dict) or not isinstance(data.get("booklets"), list):
+        raise ManifestError(f"'{path}' doit contenir une liste \"booklets\"")
+
+    defaults = data.get("defaults", {})
+    booklets = []
+    for index, entry in enumerate(data["booklets"]):
+        if not isinstance(entry, dict) or "system" not in entry or "output" not in entry:
+            raise ManifestError(f"Livret {index + 1}: \"system\" et \"output\" sont requis")
+        try:
+            info = get_system(entry["system"])
+        except ValueError as e:
+            raise ManifestError(f"Livret {index + 1}: {e}") from None
+
+        settings = {key: entry.get(key, defaults.get(key)) for key in BOOKLET_OPTIONS}
+        fit = settings["fit"]
+        if fit is True:
+            fit = DEFAULT_FIT_MIN_SIZE
+        booklets.append({
+            "output": entry["output"],
+            "system": entry["system"],
+            "directory": entry.get("directory", info["directory"]),
+            "creatures": entry.get("creatures"),
+            "query": entry.get("query", ""),
+            "fit": float(fit) if fit else None,
+            "options": {name: True for name in ("dice_average", "hyphenate") if settings[name]},
+        })
+
+    return {
+        "output_dir": data.get("output_dir", "output"),
+        "jobs": data.get("jobs"),
+        "booklets": booklets,
+    }
+
+
+class _Library:
+    """Dossiers de créatures chargés une seule fois, avec leurs index de requête"""
+
+    def __init__(self, on_event=None):
+        self.on_event = on_event
+        self._directories = {}
+        self._bestiaries = {}
+
+    def directory(self, directory, system):
+        key = str(Path(directory))
+        if key not in self._directories:
+            name = get_system(system)["name"]
+            sources = []
+            files = discover_creature_files(directory, name, self.on_event)
+            creatures, _ = load_creatures(files, name, self.on_event, sources)
+            self._directories[key] = (creatures, {Path(source).stem: data for source, data in zip(sources, creatures)})
+        return self._directories[key]
+
+    def select(self, booklet):
+        creatures, by_stem = self.directory(booklet["directory"], booklet["system"])
+        if booklet["creatures"]:
+            missing = [stem for stem in booklet["creatures"] if stem not in by_stem]
+            if missing:
+                raise ManifestError(f"{booklet['output']}: créature(s) introuvable(s): {', '.join(missing)}")
+            creatures = [by_stem[stem] for stem in booklet["creatures"]]
+        if booklet["query"]:
+            key = (str(Path(booklet["directory"])), booklet["system"])
+            if key not in self._bestiaries:
+                self._bestiaries[key] = Bestiary(self.directory(*key)[0], booklet["system"])
+            bestiary = self._bestiaries[key]
+            selected = {id(data) for data in bestiary.select(booklet["query"])}
+            creatures = [data for data in creatures if id(data) in selected]
+        return creatures
+
+
+def _warm_worker():
+    """Initialise un processus du pool : polices et surface de mesure chargées une fois"""
+    create_pdf_base()
+    get_measure_pdf()
+
+
+def _fit_scales(items):
+    """Calcule les échelles d'ajustement d'un lot de fiches (exécuté dans le pool)"""
+    results = []
+    for system, creature_data, fit, options in items:
+        page_func = get_system(system)["generate_page"]
+        results.append((fit_cache_key(page_func, creature_data, fit, options),
+                        cached_fit_scale(page_func, creature_data, fit, options)))
+    return results
+
+
+def _build_booklet(job):
+    """Rend un livret (exécuté dans le pool) ; retourne ses événements"""
+    events = []
+    seed_fit_cache(job["fit_scales"])
+    info = get_system(job["system"])
+    start = time.perf_counter()
+    try:
+        Path(job["output"]).parent.mkdir(parents=True, exist_ok=True)
+        info["generate_pdf"](job["creatures"], job["output"], on_event=events.append,
+                             fit=job["fit"], options=job["options"])
+    except Exception as e:
+        events.append(BuildEvent(FAILED, system=info["name"], output=job["output"],
+                                 elapsed=time.perf_counter() - start, error=str(e)))
+    return events
+
+
+def _run_largest_first(pool, func, items, costs):
+    """Applique `func` à `items`, les plus coûteux soumis en premier ; résultats dans l'ordre de `items`"""
+    if pool is None:
+        return [func(item) for item in items]
+    futures = {index: pool.submit(func, items[index])
+               for index in sorted(range(len(items)), key=lambda i: -costs[i])}
+    return [futures[index].result() for index in range(len(items))]
+
+
+def build_manifest(manifest, jobs=None, on_event=None):
+    """Construit tous les livrets d'un manifeste normalisé (voir load_manifest)
+
+    `jobs` est le nombre de processus (par défaut celui du manifeste, sinon le
+    nombre de processeurs) ; 1 construit tout dans le processus courant.
+    Retourne la liste des fichiers produits.
+    """
+    jobs = jobs or manifest.get("jobs") or os.cpu_count() or 1
+    output_dir = Path(manifest["output_dir"])
+    library = _Library(on_event)
+    model = load_cost_model()
+
+    build_jobs = []
+    for booklet in manifest["booklets"]:
+        creatures = library.select(booklet)
+        build_jobs.append({
+            "system": booklet["system"],
+            "output": str(output_dir / booklet["output"]),
+            "creatures": creatures,
+            "fit": booklet["fit"],
+            "options": booklet["options"],
+        })
+    booklet_costs = [sum(model.predict_all(job["system"], job["creatures"])) for job in build_jobs]
+
+    # Échelles d'ajustement : une seule mesure par fiche distincte
+    distinct = {}
+    for job in build_jobs:
+        if job["fit"] is None:
+            continue
+        page_func = get_system(job["system"])["generate_page"]
+        job["keys"] = []
+        for creature_data in job["creatures"]:
+            key = fit_cache_key(page_func, creature_data, job["fit"], job["options"])
+            distinct.setdefault(key, (job["system"], creature_data, job["fit"], job["options"]))
+            job["keys"].append(key)
+
+    pool = ProcessPoolExecutor(max_workers=jobs, initializer=_warm_worker) if jobs > 1 else None
+    try:
+        run = pool.map if pool else map
+        items = list(distinct.values())
+        costs = [model.predict(system, creature_data) for system, creature_data, _, _ in items]
+        batches = [[items[index] for index in batch] for batch in lpt_schedule(costs, jobs * BATCHES_PER_PROCESS)]
+        scales = {}
+        for results in run(_fit_scales, batches):
+            scales.update(results)
+
+        for job in build_jobs:
+            job["fit_scales"] = {key: scales[key] for key in job.pop("keys", [])}
+
+        outputs = []
+        for job, events in zip(build_jobs, _run_largest_first(pool, _build_booklet, build_jobs, booklet_costs)):
+            for event in events:
+                if on_event:
+                    on_event(event)
+            if not any(event.kind == FAILED for event in events):
+                outputs.append(job["output"])
+        return outputs
+    finally:
+        if pool:
+            pool.shutdown()
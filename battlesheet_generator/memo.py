@@ -0,0 +1,32 @@
+"""
+Caches mémoire bornés
+
+Les caches de module (cartes compilées, échelles d'ajustement, largeurs des
+mots) vivent aussi longtemps que le processus : un worker ou un service de
+longue durée finirait par garder tout ce qu'il a déjà rendu. `LruCache` se
+manipule comme un dictionnaire mais oublie les entrées les moins récemment
+utilisées au-delà de sa taille maximale.
+"""
+
+from collections import OrderedDict
+
+
+class LruCache(OrderedDict):
+    """Dictionnaire limité à `maxsize` entrées, les moins récemment utilisées étant retirées"""
+
+    def __init__(self, maxsize, entries=()):
+        self.maxsize = maxsize
+        super().__init__()
+        self.update(entries)
+
+    def get(self, key, default=None):
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return super().__getitem__(key)
+
+    def __setitem__(self, key, value):
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        while len(self) > self.maxsize:
+            self.popitem(last=False)
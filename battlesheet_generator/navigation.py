@@ -0,0 +1,195 @@
+"""
+Navigation dans les gros livrets : index, signets et destinations nommées
+
+Avec l'option de rendu `toc`, le livret commence par deux index (par nom,
+puis par niveau ou FP) avec numéros de page et liens, chaque créature reçoit
+un signet (outline) et une destination nommée (`livret.pdf#nameddest=troll`).
+Dans un livret combiné (voir combined.py), les signets des créatures sont
+regroupés sous celui de leur système.
+
+Le tout se fait en une seule passe : le nombre de créatures étant connu
+avant le rendu, les pages d'index sont réservées en tête de document
+(`insert_toc_placeholder` de fpdf) et ne sont remplies qu'à l'écriture, une
+fois toutes les pages connues. Les destinations nommées sont ajoutées au
+fichier écrit par une mise à jour incrémentale (`add_named_destinations`).
+"""
+
+import math
+import re
+import unicodedata
+
+# Mise en page des index (mm, pt)
+INDEX_LINE_HEIGHT = 4.0
+INDEX_TITLE_HEIGHT = 9.0
+INDEX_FONT_SIZE = 7
+
+_SLUG_RE = re.compile(r"[^a-z0-9]+")
+
+
+def destination_name(name, used):
+    """Nom de destination ASCII et unique dérivé du nom d'une créature"""
+    ascii_name = unicodedata.normalize("NFKD", name).encode("ascii", "ignore").decode()
+    slug = _SLUG_RE.sub("-", ascii_name.lower()).strip("-") or "creature"
+    candidate = slug
+    suffix = 2
+    while candidate in used:
+        candidate = f"{slug}-{suffix}"
+        suffix += 1
+    used.add(candidate)
+    return candidate
+
+
+def format_level(level, system):
+    """Niveau affiché dans l'index : FP fractionnaire en D&D, niveau ailleurs"""
+    if math.isnan(level):
+        return "—"
+    if system == "dnd":
+        for denominator in (2, 4, 8):
+            if 0 < level < 1 and abs(level * denominator - round(level * denominator)) < 1e-9:
+                return f"FP {round(level * denominator)}/{denominator}"
+        return f"FP {level:g}"
+    return f"Niv. {level:g}"
+
+
+def _system_key(system):
+    from .systems import SYSTEMS
+
+    for key, info in SYSTEMS.items():
+        if system in (key, info["name"]):
+            return key
+    return system
+
+
+class Navigation:
+    """Index, signets et destinations nommées d'un document"""
+
+    def __init__(self):
+        self.entries = []  # dictionnaires : name, level, level_label, page, destination, group
+        self.system = ""
+        self.groups = []   # (titre, index de la première créature) des livrets combinés
+        self._used_names = set()
+        self._lines_per_page = None
+        self._outlined = 0  # créatures déjà pourvues d'un signet
+
+    # --- Réservation --------------------------------------------------------
+
+    def _index_pages(self, count):
+        return max(1, math.ceil(count / self._lines_per_page))
+
+    def reserve(self, pdf, count, system=""):
+        """Réserve en tête de document les pages des deux index pour `count` créatures"""
+        self.system = _system_key(system)
+        usable = pdf.h - pdf.t_margin - pdf.b_margin - INDEX_TITLE_HEIGHT
+        self._lines_per_page = max(1, int(usable // INDEX_LINE_HEIGHT))
+        pages = 2 * self._index_pages(count)
+        pdf.add_page()
+        pdf.insert_toc_placeholder(self.render_index, pages)
+        # La page ouverte par la réservation sert à la première créature
+        pdf.page -= 1
+
+    def begin_group(self, title, system):
+        """Ouvre un groupe de créatures (un système d'un livret combiné), signet de premier niveau"""
+        self.system = _system_key(system)
+        self.groups.append((title, len(self.entries)))
+
+    # --- Enregistrement -----------------------------------------------------
+
+    def add(self, creature_data, page):
+        """Enregistre une créature dont la fiche commence à la page `page`"""
+        from .analytics import creature_display_name, creature_level
+
+        name = creature_display_name(creature_data, self.system)
+        level = creature_level(creature_data, self.system)
+        self.entries.append({
+            "name": name,
+            "level": level,
+            "level_label": format_level(level, self.system),
+            "page": page,
+            "destination": destination_name(name, self._used_names),
+            "group": len(self.groups) - 1,
+        })
+
+    def finish(self, pdf):
+        """Ajoute les signets des créatures rendues depuis le dernier appel
+
+        Dans un livret combiné, chaque groupe reçoit un signet de premier
+        niveau et ses créatures sont placées en dessous.
+        """
+        page, y = pdf.page, pdf.y
+        starts = {start: title for title, start in self.groups}
+        level = 1 if self.groups else 0
+        for index in range(self._outlined, len(self.entries)):
+            entry = self.entries[index]
+            pdf.page, pdf.y = entry["page"], pdf.t_margin
+            if index in starts:
+                pdf.start_section(starts[index])
+            pdf.start_section(entry["name"], level=level)
+        self._outlined = len(self.entries)
+        pdf.page, pdf.y = page, y
+
+    def destinations(self):
+        """{nom de destination: numéro de page}"""
+        return {entry["destination"]: entry["page"] for entry in self.entries}
+
+    # --- Rendu différé ------------------------------------------------------
+
+    def _render_list(self, pdf, title, entries, label):
+        from .base_generator import set_card_font
+
+        for start in range(0, max(1, len(entries)), self._lines_per_page):
+            if start:
+                pdf.add_page()
+            pdf.set_xy(pdf.l_margin, pdf.t_margin)
+            set_card_font(pdf, "DejaVu", "B", size=11)
+            pdf.set_text_color(0, 0, 139)  # Bleu foncé (DarkBlue)
+            pdf.cell(0, INDEX_TITLE_HEIGHT - 2, title, ln=True)
+            pdf.set_text_color(0, 0, 0)  # Noir
+            set_card_font(pdf, "DejaVu", size=INDEX_FONT_SIZE)
+
+            width = pdf.w - pdf.l_margin - pdf.r_margin
+            for entry in entries[start:start + self._lines_per_page]:
+                link = pdf.add_link(page=entry["page"])
+                suffix = f"{label(entry)}  {entry['page']}"
+                suffix_width = pdf.get_string_width(suffix) + 2
+                name = entry["name"]
+                while name and pdf.get_string_width(name) > width - suffix_width:
+                    name = name[:-2] + "…"
+                pdf.cell(width - suffix_width, INDEX_LINE_HEIGHT, name, link=link)
+                pdf.cell(suffix_width, INDEX_LINE_HEIGHT, suffix, align="R", link=link, ln=True)
+
+    def render_index(self, pdf, outline):
+        """Remplit les pages réservées (appelé par fpdf à l'écriture du document)"""
+        by_name = sorted(self.entries, key=lambda entry: (entry["name"].casefold(), entry["page"]))
+        # Niveaux propres à chaque système : dans un livret combiné, classement par groupe
+        by_level = sorted(self.entries, key=lambda entry: (entry["group"], math.isnan(entry["level"]),
+                                                            0 if math.isnan(entry["level"]) else entry["level"],
+                                                            entry["name"].casefold()))
+        power_rating = self.system == "dnd" and len(self.groups) <= 1
+        self._render_list(pdf, "Index des créatures", by_name, lambda entry: "")
+        pdf.add_page()
+        self._render_list(pdf, "Par facteur de puissance" if power_rating else "Par niveau",
+                          by_level, lambda entry: entry["level_label"])
+        # Les pages réservées non utilisées restent vides
+        while pdf.page < pdf.toc_placeholder.start_page + pdf.toc_placeholder.pages - 1:
+            pdf.add_page()
+
+
+def navigation_frame(creatures, page_counts, system, options=None):
+    """Cadre de navigation d'un livret assemblé à partir de PDF partiels (voir distributed.py)
+
+    Document fpdf contenant les pages d'index, puis `page_counts[i]` pages
+    vides réservées à la créature i, avec les liens et signets vers ces
+    pages. `merge_pdfs(parts, frame=...)` remplace les pages vides par les
+    pages rendues. Retourne (cadre en bytes, destinations nommées).
+    """
+    from .base_generator import create_pdf_base
+
+    pdf = create_pdf_base({"toc": True, "draft": bool((options or {}).get("draft"))})
+    navigation = pdf.navigation
+    navigation.reserve(pdf, len(creatures), system)
+    for creature_data, count in zip(creatures, page_counts):
+        navigation.add(creature_data, pdf.page + 1)
+        for _ in range(count):
+            pdf.add_page()
+    navigation.finish(pdf)
+    return bytes(pdf.output()), navigation.destinations()
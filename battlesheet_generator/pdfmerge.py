@@ -0,0 +1,228 @@
+"""
+Assemblage et retouche de PDF produits par ce générateur
+
+`merge_pdfs` concatène les pages de plusieurs documents fpdf2 en un seul,
+sans dépendance externe : les objets de chaque document sont relus grâce à
+leur table de références croisées, renumérotés, puis rattachés à un
+catalogue et à un arbre de pages uniques. Les flux (contenus, polices) sont
+recopiés tels quels ; chaque document garde ses propres sous-ensembles de
+polices. Un document « cadre » (index, liens et signets suivis de pages
+vides, voir navigation.navigation_frame) peut envelopper les pages
+assemblées : ses pages vides sont remplacées par les pages rendues.
+
+`add_named_destinations` ajoute des destinations nommées à un document par
+mise à jour incrémentale : le fichier d'origine est conservé tel quel et
+suivi d'un nouveau catalogue et d'une table de références complémentaire.
+"""
+
+import bisect
+import hashlib
+import re
+
+_STARTXREF_RE = re.compile(rb"startxref\s+(\d+)")
+_REF_RE = re.compile(rb"(\d+) 0 R\b")
+_KIDS_RE = re.compile(rb"/Kids\s*\[([^\]]*)\]")
+_COUNT_RE = re.compile(rb"/Count\s+\d+")
+_CONTENTS_RE = re.compile(rb"/Contents\s+(\d+) 0 R")
+_OUTLINES_RE = re.compile(rb"/Outlines\s+(\d+) 0 R")
+
+
+def _trailer_ref(trailer, key):
+    match = re.search(rb"/" + key + rb"\s+(\d+) 0 R", trailer)
+    return int(match.group(1)) if match else None
+
+
+def read_pdf_objects(data):
+    """Objets d'un PDF à tables de références classiques (mises à jour incrémentales comprises)
+
+    Retourne (en-tête, {numéro: corps entre `obj` et `endobj`}, dernier trailer).
+    """
+    offsets = {}
+    boundaries = set()
+    trailer = None
+    xref = int(_STARTXREF_RE.findall(data)[-1])
+    while xref is not None:
+        boundaries.add(xref)
+        lines = data[xref:].split(b"\n")
+        if lines[0].strip() != b"xref":
+            raise ValueError("Table de références croisées introuvable")
+        index = 1
+        while not lines[index].startswith(b"trailer"):
+            first, count = map(int, lines[index].split())
+            for number in range(first, first + count):
+                offset, _, flag = lines[index + 1 + number - first].split()[:3]
+                if flag == b"n":
+                    offsets.setdefault(number, int(offset))
+                    boundaries.add(int(offset))
+            index += count + 1
+        section_trailer = data[data.index(b"trailer", xref):data.index(b"startxref", xref)]
+        trailer = trailer or section_trailer
+        previous = re.search(rb"/Prev\s+(\d+)", section_trailer)
+        xref = int(previous.group(1)) if previous else None
+
+    ordered = sorted(boundaries)
+    objects = {}
+    for number, offset in offsets.items():
+        end = ordered[bisect.bisect_right(ordered, offset)]
+        chunk = data[offset:end]
+        objects[number] = chunk[chunk.index(b"obj") + 3:chunk.rindex(b"endobj")].strip(b"\r\n")
+    header = data[:ordered[0]] if offsets else b"%PDF-1.3\n"
+    return header, objects, trailer
+
+
+def _renumber(body, mapping):
+    """Remplace les références du dictionnaire d'un objet (jamais dans son flux)"""
+    head, separator, stream = body.partition(b"\nstream\n")
+    head = _REF_RE.sub(lambda match: b"%d 0 R" % mapping[int(match.group(1))], head)
+    return head + separator + stream
+
+
+def merge_pdfs(parts, frame=None):
+    """Concatène les pages de plusieurs PDF (bytes) dans l'ordre ; retourne le document en bytes
+
+    Avec `frame`, le document commence par les premières pages du cadre et
+    ses dernières pages, vides, sont remplacées dans l'ordre par les pages
+    assemblées : liens et signets du cadre visent alors les pages rendues.
+    """
+    if not parts:
+        raise ValueError("Aucun document à assembler")
+
+    header = None
+    pages_dict = None
+    info = None
+    bodies = []
+    kids = []
+    next_number = 3  # 1 : arbre de pages, 2 : catalogue
+
+    for data in parts:
+        part_header, objects, trailer = read_pdf_objects(bytes(data))
+        root = _trailer_ref(trailer, b"Root")
+        info_number = _trailer_ref(trailer, b"Info")
+        pages_number = int(re.search(rb"/Pages\s+(\d+) 0 R", objects[root]).group(1))
+        page_numbers = page_objects(objects, root)
+
+        mapping = {pages_number: 1, root: 2}
+        for number in sorted(objects):
+            if number not in mapping and number != info_number:
+                mapping[number] = next_number
+                next_number += 1
+        for number in sorted(objects):
+            if number in (pages_number, root, info_number):
+                continue
+            bodies.append((mapping[number], _renumber(objects[number], mapping)))
+        kids += [mapping[number] for number in page_numbers]
+
+        if header is None:
+            header = part_header
+            pages_dict = objects[pages_number]
+            info = objects.get(info_number)
+
+    outlines = None
+    if frame is not None:
+        kids, outlines, next_number = _wrap_in_frame(bytes(frame), kids, bodies, next_number)
+
+    kid_refs = b"\n".join(b"%d 0 R" % number for number in kids)
+    pages_dict = _KIDS_RE.sub(lambda match: b"/Kids [" + kid_refs + b"]", pages_dict, count=1)
+    pages_dict = _COUNT_RE.sub(b"/Count %d" % len(kids), pages_dict, count=1)
+    catalog = (b"<<\n/OpenAction [%d 0 R /FitH null]\n/PageLayout /OneColumn\n/Pages 1 0 R\n/Type /Catalog\n>>"
+               % kids[0] if kids else b"<<\n/Pages 1 0 R\n/Type /Catalog\n>>")
+    if outlines is not None:
+        catalog = catalog[:-2] + b"/Outlines %d 0 R\n/PageMode /UseOutlines\n>>" % outlines
+    bodies = [(1, pages_dict), (2, catalog)] + bodies
+    if info is not None:
+        bodies.append((next_number, info))
+    bodies.sort()
+
+    out = bytearray(header)
+    offsets = []
+    for number, body in bodies:
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+    file_id = hashlib.md5(bytes(out)).hexdigest().upper().encode()
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(bodies) + 1)
+    for offset in offsets:
+        out += b"%010d 00000 n \n" % offset
+    out += b"trailer\n<<\n/Size %d\n/Root 2 0 R\n" % (len(bodies) + 1)
+    if info is not None:
+        out += b"/Info %d 0 R\n" % next_number
+    out += b"/ID [<%s><%s>]\n>>\nstartxref\n%d\n%%%%EOF\n" % (file_id, file_id, xref)
+    return bytes(out)
+
+
+def _wrap_in_frame(frame, kids, bodies, next_number):
+    """Ajoute les objets du cadre à `bodies` ; retourne (pages, signets du cadre, prochain numéro libre)"""
+    _, objects, trailer = read_pdf_objects(frame)
+    root = _trailer_ref(trailer, b"Root")
+    info_number = _trailer_ref(trailer, b"Info")
+    pages_number = int(re.search(rb"/Pages\s+(\d+) 0 R", objects[root]).group(1))
+    frame_pages = page_objects(objects, root)
+    kept = len(frame_pages) - len(kids)
+    if kept < 0:
+        raise ValueError(f"Le cadre réserve {len(frame_pages)} pages pour {len(kids)} pages assemblées")
+
+    # Pages vides du cadre -> pages rendues ; leurs contenus vides ne sont pas recopiés
+    mapping = {pages_number: 1}
+    skipped = {pages_number, root, info_number}
+    for placeholder, page in zip(frame_pages[kept:], kids):
+        mapping[placeholder] = page
+        skipped.add(placeholder)
+        skipped.update(int(number) for number in _CONTENTS_RE.findall(objects[placeholder]))
+    for number in sorted(objects):
+        if number not in skipped:
+            mapping[number] = next_number
+            next_number += 1
+    for number in sorted(objects):
+        if number not in skipped:
+            bodies.append((mapping[number], _renumber(objects[number], mapping)))
+
+    outlines = _OUTLINES_RE.search(objects[root])
+    return ([mapping[number] for number in frame_pages[:kept]] + kids,
+            mapping[int(outlines.group(1))] if outlines else None, next_number)
+
+
+def page_count(data):
+    """Nombre de pages d'un document"""
+    _, objects, trailer = read_pdf_objects(bytes(data))
+    return len(page_objects(objects, _trailer_ref(trailer, b"Root")))
+
+
+def page_objects(objects, root):
+    """Numéros des objets page d'un document, dans l'ordre des pages"""
+    pages_number = int(re.search(rb"/Pages\s+(\d+) 0 R", objects[root]).group(1))
+    return [int(n) for n in _REF_RE.findall(_KIDS_RE.search(objects[pages_number]).group(1))]
+
+
+def add_named_destinations(data, destinations):
+    """Ajoute des destinations nommées {nom ASCII: numéro de page (1 = première)} ; retourne les bytes"""
+    if not destinations:
+        return data
+    data = bytes(data)
+    _, objects, trailer = read_pdf_objects(data)
+    root = _trailer_ref(trailer, b"Root")
+    info = _trailer_ref(trailer, b"Info")
+    pages = page_objects(objects, root)
+    size = int(re.search(rb"/Size\s+(\d+)", trailer).group(1))
+    previous = int(_STARTXREF_RE.findall(data)[-1])
+    file_id = re.search(rb"/ID\s*(\[[^\]]*\])", trailer)
+
+    entries = b"\n".join(b"/%s [%d 0 R /XYZ null null null]" % (name.encode("ascii"), pages[page - 1])
+                         for name, page in sorted(destinations.items()))
+    catalog = objects[root]
+    catalog = catalog[:catalog.rindex(b">>")] + b"/Dests %d 0 R\n>>" % size
+
+    out = bytearray(data)
+    catalog_offset = len(out)
+    out += b"%d 0 obj\n" % root + catalog + b"\nendobj\n"
+    dests_offset = len(out)
+    out += b"%d 0 obj\n<<\n" % size + entries + b"\n>>\nendobj\n"
+    xref = len(out)
+    out += b"xref\n%d 1\n%010d 00000 n \n%d 1\n%010d 00000 n \n" % (root, catalog_offset, size, dests_offset)
+    out += b"trailer\n<<\n/Size %d\n/Root %d 0 R\n" % (size + 1, root)
+    if info is not None:
+        out += b"/Info %d 0 R\n" % info
+    if file_id:
+        out += b"/ID " + file_id.group(1) + b"\n"
+    out += b"/Prev %d\n>>\nstartxref\n%d\n%%%%EOF\n" % (previous, xref)
+    return bytes(out)
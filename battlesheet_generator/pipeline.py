@@ -0,0 +1,297 @@
+"""
+Étapes de génération instrumentées : découverte, chargement, rendu, écriture
+
+Chaque étape accepte un callback optionnel `on_event` recevant des
+`BuildEvent`. Sans callback, aucun événement n'est construit.
+"""
+
+import hashlib
+import json
+import time
+from pathlib import Path
+
+from .base_generator import load_creature, draw_placeholder_card, BODY_FONT_SIZE
+from .bulk import BulkInputError, CREATURE_PATTERNS, is_bulk_source, is_stdin, iter_records, parse_record, record_label
+from .events import BuildEvent, DISCOVERED, LOADED, FAILED, RENDERED, WRITTEN, OVERFLOW, SIZE
+from .guards import load_guarded_creature, LimitExceeded
+from .inheritance import InheritanceError, resolve_loaded_creature
+from .layout import fit_text_scale
+from .memo import LruCache
+from .pdfmerge import add_named_destinations
+from .portraits import locate_portrait
+
+
+def discover_creature_files(creatures_dir, system="", on_event=None, patterns=CREATURE_PATTERNS):
+    """Liste les fichiers de créatures d'un dossier, triés pour un ordre indépendant du système de fichiers
+
+    Un fichier ou '-' (entrée standard) est retourné tel quel : il peut
+    contenir plusieurs créatures (voir bulk.py). Dans un dossier, les
+    fichiers préfixés par '_' (bases communes, bibliothèque de capacités,
+    voir inheritance.py) sont ignorés.
+    """
+    start = time.perf_counter()
+    if is_stdin(creatures_dir) or Path(creatures_dir).is_file():
+        files = [creatures_dir if is_stdin(creatures_dir) else Path(creatures_dir)]
+    else:
+        files = sorted({path for pattern in patterns for path in Path(creatures_dir).glob(pattern)
+                        if not path.name.startswith("_")})
+    if on_event:
+        on_event(BuildEvent(DISCOVERED, system=system, source=str(creatures_dir),
+                            total=len(files), elapsed=time.perf_counter() - start))
+    return files
+
+
+def _load_entries(files, limits):
+    """(libellé, index, total, fonction de chargement) pour chaque fiche ou enregistrement"""
+    total = len(files)
+    for index, json_file in enumerate(files):
+        if not is_bulk_source(json_file):
+            if limits is None:
+                yield str(json_file), index, total, lambda: load_creature(json_file)
+            else:
+                yield str(json_file), index, total, lambda: load_guarded_creature(json_file, limits)
+            continue
+
+        # Fichier en masse : un événement par enregistrement, total inconnu à l'avance
+        records = iter_records(json_file)
+        number = 0
+        while True:
+            try:
+                number, text = next(records)
+            except StopIteration:
+                break
+            except BulkInputError as e:
+                error = e
+                yield record_label(json_file, number + 1), number, 0, lambda: _raise(error)
+                break
+            yield record_label(json_file, number), number - 1, 0, lambda: parse_record(text, limits)
+
+
+def _raise(error):
+    raise error
+
+
+def iter_creatures(files, system="", on_event=None, limits=None, failures=None):
+    """Charge une liste de fichiers JSON au fil de l'eau ; produit des couples (source, créature)
+
+    Un fichier peut contenir une seule créature, un tableau JSON de
+    créatures ou des JSON Lines (voir bulk.py) ; les enregistrements sont
+    alors signalés par leur numéro ('export.jsonl#12'). Chaque créature est
+    produite dès qu'elle est chargée : un export volumineux n'est jamais
+    entièrement en mémoire si l'appelant ne conserve pas les créatures.
+    Avec `limits` (guards.Limits), les fichiers hors limites sont refusés.
+    L'héritage (`extends`) et les références à la bibliothèque de capacités
+    sont résolus au chargement (voir inheritance.py), ainsi que le chemin du
+    portrait, relatif au dossier de la fiche (voir portraits.py).
+    Si `failures` est une liste, la source de chaque échec y est ajoutée.
+    """
+    for source, index, total, load in _load_entries(files, limits):
+        start = time.perf_counter()
+        try:
+            creature_data = locate_portrait(resolve_loaded_creature(source, load(), limits), source)
+        except LimitExceeded as e:
+            error = f"Limite dépassée: {e}"
+        except json.JSONDecodeError as e:
+            error = f"JSON invalide: {e}"
+        except BulkInputError as e:
+            error = f"Fichier en masse invalide: {e}"
+        except InheritanceError as e:
+            error = f"Héritage invalide: {e}"
+        except KeyError as e:
+            error = f"Clé manquante dans les données: {e}"
+        except Exception as e:
+            error = f"Erreur inattendue: {e}"
+        else:
+            if on_event:
+                on_event(BuildEvent(LOADED, system=system, source=source, index=index,
+                                    total=total, elapsed=time.perf_counter() - start))
+            yield source, creature_data
+            continue
+
+        if failures is not None:
+            failures.append(source)
+        if on_event:
+            on_event(BuildEvent(FAILED, system=system, source=source, index=index,
+                                total=total, elapsed=time.perf_counter() - start, error=error))
+
+
+def load_creatures(files, system="", on_event=None, sources=None, limits=None):
+    """Charge une liste de fichiers JSON ; retourne (créatures, nombre d'échecs)
+
+    Voir iter_creatures pour les formats acceptés et `limits`.
+    Si `sources` est une liste, le chemin de chaque créature chargée y est ajouté.
+    """
+    creatures = []
+    failures = []
+    for source, creature_data in iter_creatures(files, system, on_event, limits, failures):
+        creatures.append(creature_data)
+        if sources is not None:
+            sources.append(source)
+    return creatures, len(failures)
+
+
+# Échelles d'ajustement déjà calculées : fit_cache_key(...) -> (échelle, tient)
+FIT_CACHE_SIZE = 10_000
+_fit_cache = LruCache(FIT_CACHE_SIZE)
+
+
+def fit_cache_key(page_func, creature_data, fit, options=None):
+    """Clé du cache d'ajustement : fonction de page, réglages et empreinte du contenu de la fiche"""
+    content = json.dumps(creature_data, sort_keys=True, ensure_ascii=False, default=str)
+    return (
+        page_func.__module__, page_func.__name__, fit,
+        json.dumps(options or {}, sort_keys=True),
+        hashlib.sha256(content.encode("utf-8")).hexdigest(),
+    )
+
+
+def seed_fit_cache(entries):
+    """Ajoute au cache des échelles calculées ailleurs (autre processus)"""
+    _fit_cache.update(entries)
+
+
+def cached_fit_scale(page_func, creature_data, fit, options=None):
+    """Échelle d'ajustement d'une fiche, calculée une seule fois par contenu et réglages"""
+    key = fit_cache_key(page_func, creature_data, fit, options)
+    result = _fit_cache.get(key)
+    if result is None:
+        result = fit_text_scale(page_func, creature_data, fit, options=options)
+        _fit_cache[key] = result
+    return result
+
+
+def render_creature(pdf, creature_data, page_func, fit=None):
+    """Rend la page d'une créature ; en mode ajustement, réduit le texte pour tenir sur une carte
+
+    `fit` est la taille minimale du corps de texte (pt) ou None pour désactiver
+    l'ajustement. Retourne (échelle appliquée, tient sur une carte).
+    """
+    if fit is None:
+        page_func(pdf, creature_data)
+        return 1.0, True
+
+    scale, fits = cached_fit_scale(page_func, creature_data, fit, getattr(pdf, "card_options", None))
+    pdf.text_scale = scale
+    try:
+        page_func(pdf, creature_data)
+    finally:
+        pdf.text_scale = 1.0
+    return scale, fits
+
+
+def render_creatures(pdf, creatures, page_func, system="", on_event=None, name_field="name", fit=None):
+    """Rend une page par créature avec la fonction de page du système"""
+    profile = getattr(pdf, "size_profile", None)
+    guard = getattr(pdf, "render_guard", None)
+    navigation = getattr(pdf, "navigation", None)
+    if not on_event and fit is None and profile is None and guard is None and navigation is None:
+        for creature_data in creatures:
+            page_func(pdf, creature_data)
+        return
+
+    if navigation is not None and pdf.toc_placeholder is None:
+        navigation.reserve(pdf, len(creatures), system)
+
+    total = len(creatures)
+    for index, creature_data in enumerate(creatures):
+        start = time.perf_counter()
+        name = str(creature_data.get(name_field, ""))
+        first_page = pdf.page + 1
+        if profile:
+            profile.begin_creature(pdf, name)
+        if guard is None:
+            scale, fits = render_creature(pdf, creature_data, page_func, fit)
+        else:
+            try:
+                scale, fits = guard.render(pdf, creature_data, page_func, fit)
+            except Exception as e:
+                error = str(e) or type(e).__name__
+                if on_event:
+                    on_event(BuildEvent(FAILED, system=system, name=name, index=index, total=total,
+                                        elapsed=time.perf_counter() - start, error=error))
+                else:
+                    print(f"❌ Erreur avec '{name}': {error}")
+                draw_placeholder_card(pdf, name, error)
+                scale, fits = 1.0, True
+        if profile:
+            profile.end_creature(pdf)
+        if navigation is not None:
+            navigation.add(creature_data, first_page)
+        if not fits:
+            detail = f"corps de texte réduit à {scale * BODY_FONT_SIZE:.2f} pt"
+            if on_event:
+                on_event(BuildEvent(OVERFLOW, system=system, name=name, index=index, total=total, detail=detail))
+            else:
+                print(f"⚠️  '{name}' ne tient pas sur une carte ({detail})")
+        if on_event:
+            on_event(BuildEvent(RENDERED, system=system, name=name, index=index, total=total,
+                                elapsed=time.perf_counter() - start, page=first_page))
+    if guard is not None:
+        guard.close()
+    if navigation is not None:
+        navigation.finish(pdf)
+
+
+def is_output_path(output):
+    """Vrai si la destination est un chemin de fichier (ni flux, ni None)"""
+    return output is not None and not hasattr(output, "write")
+
+
+def output_label(output):
+    """Nom lisible d'une destination : chemin, nom du flux ou « mémoire »"""
+    if output is None:
+        return "<mémoire>"
+    if hasattr(output, "write"):
+        return str(getattr(output, "name", "<flux>"))
+    return str(output)
+
+
+def write_size_report(profile, output, system="", on_event=None):
+    """Écrit le profil de taille à côté du PDF (`.size.json`) et émet son résumé
+
+    Sans chemin de destination (flux ou mémoire), seul le résumé est émis.
+    """
+    report = None
+    if is_output_path(output):
+        report = Path(output).with_suffix(".size.json")
+        with open(report, "w", encoding="utf-8") as f:
+            json.dump(profile.to_dict(), f, ensure_ascii=False, indent=2)
+    if on_event:
+        on_event(BuildEvent(SIZE, system=system, output=str(report or ""), detail=profile.summary()))
+    else:
+        print(profile.summary())
+    return report
+
+
+def write_pdf(pdf, output, system="", on_event=None):
+    """Écrit le PDF et émet l'événement d'écriture
+
+    `output` est un chemin, un flux binaire (objet avec `write` : fichier
+    ouvert, `io.BytesIO`, réponse HTTP...) ou None. Retourne le chemin, le
+    flux, ou le document en `bytes` si `output` est None : rien n'est alors
+    écrit sur le disque.
+    """
+    start = time.perf_counter()
+    data = pdf.output()
+    navigation = getattr(pdf, "navigation", None)
+    if navigation is not None:
+        data = add_named_destinations(data, navigation.destinations())
+    if output is None:
+        result = bytes(data)
+    elif hasattr(output, "write"):
+        output.write(data)
+        result = output
+    else:
+        with open(output, "wb") as f:
+            f.write(data)
+        result = output
+
+    profile = getattr(pdf, "size_profile", None)
+    if profile is not None:
+        profile.analyze_output(data)
+    if on_event:
+        on_event(BuildEvent(WRITTEN, system=system, output=output_label(output), total=pdf.pages_count,
+                            elapsed=time.perf_counter() - start))
+    if profile is not None:
+        write_size_report(profile, output, system, on_event)
+    return result
@@ -0,0 +1,132 @@
+"""
+Gestion des portraits de créatures
+
+Les images sources sont décodées et réduites une seule fois à la résolution
+d'impression de la vignette, puis conservées dans un cache disque indexé par
+le hash du fichier source. Le chemin renvoyé ne dépend que du contenu de
+l'image : fpdf indexant ses images par nom, une même image partagée par
+plusieurs créatures n'est donc intégrée qu'une fois dans le PDF.
+
+Le champ `portrait` d'une fiche est relatif au dossier de la fiche (ou du
+fichier en masse) : `locate_portrait` le remplace au chargement par un
+chemin absolu, et retire un portrait qui sortirait de ce dossier.
+"""
+
+import hashlib
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+
+from .guards import contained_path
+
+PORTRAIT_CACHE_DIR = Path(os.environ.get("BATTLESHEET_CACHE_DIR", ".cache")) / "portraits"
+PORTRAIT_SIZE_MM = 18
+PORTRAIT_DPI = 300
+
+# Mémo en mémoire : chemin source -> (mtime, taille, chemin en cache)
+_resolved = {}
+# Portraits introuvables ou illisibles déjà signalés (un seul avertissement par fichier)
+_reported = set()
+
+
+def portrait_pixels(size_mm=PORTRAIT_SIZE_MM, dpi=PORTRAIT_DPI):
+    """Taille en pixels du plus grand côté de la vignette à la résolution d'impression"""
+    return max(1, round(size_mm / 25.4 * dpi))
+
+
+def file_hash(filepath):
+    """Calcule le hash SHA-256 du contenu d'un fichier"""
+    digest = hashlib.sha256()
+    with open(filepath, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _build_thumbnail(source, target, pixels):
+    """Décode l'image source et écrit la vignette réduite dans le cache"""
+    from PIL import Image
+
+    with Image.open(source) as img:
+        img = img.convert("RGBA") if img.mode in ("P", "LA", "RGBA") else img.convert("RGB")
+        img.thumbnail((pixels, pixels), Image.LANCZOS)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        # Fichier temporaire propre au processus : plusieurs workers peuvent réduire la même image
+        with tempfile.NamedTemporaryFile(dir=target.parent, prefix=target.stem, suffix=".tmp",
+                                         delete=False) as tmp:
+            try:
+                img.save(tmp, format="PNG", optimize=True)
+            except BaseException:
+                tmp.close()
+                os.unlink(tmp.name)
+                raise
+        os.replace(tmp.name, target)
+
+
+def locate_portrait(creature_data, source):
+    """Fiche dont le portrait est résolu dans le dossier de `source` (chemin absolu)
+
+    `source` est le chemin de la fiche ou le libellé d'un enregistrement
+    ('export.jsonl#12', 'stdin#3' pour le dossier courant). Un portrait hors
+    du dossier (chemin absolu extérieur, '..') est retiré avec un avertissement.
+    """
+    if not isinstance(creature_data, dict) or not creature_data.get("portrait"):
+        return creature_data
+    portrait = creature_data["portrait"]
+    directory = Path(str(source).split("#", 1)[0]).parent
+    path = contained_path(directory, portrait)
+    creature_data = dict(creature_data)
+    if path is None:
+        creature_data.pop("portrait")
+        if str(portrait) not in _reported:
+            _reported.add(str(portrait))
+            print(f"⚠️  Portrait hors du dossier de la fiche ignoré: {portrait}")
+    else:
+        creature_data["portrait"] = str(path)
+    return creature_data
+
+
+def get_portrait(portrait, size_mm=PORTRAIT_SIZE_MM, dpi=PORTRAIT_DPI):
+    """Retourne le chemin de la vignette en cache pour un portrait, ou None si indisponible"""
+    if not portrait:
+        return None
+
+    source = Path(portrait)
+    try:
+        stat = source.stat()
+    except OSError:
+        if str(source) not in _reported:
+            _reported.add(str(source))
+            print(f"⚠️  Portrait introuvable: {source}")
+        return None
+
+    pixels = portrait_pixels(size_mm, dpi)
+    memo_key = (str(source), pixels)
+    cached = _resolved.get(memo_key)
+    if cached and cached[0] == stat.st_mtime_ns and cached[1] == stat.st_size:
+        return cached[2]
+
+    target = PORTRAIT_CACHE_DIR / f"{file_hash(source)}_{pixels}.png"
+    if not target.exists():
+        try:
+            _build_thumbnail(source, target, pixels)
+        except Exception as e:
+            if str(source) not in _reported:
+                _reported.add(str(source))
+                print(f"⚠️  Portrait illisible {source}: {e}")
+            return None
+
+    _resolved[memo_key] = (stat.st_mtime_ns, stat.st_size, str(target))
+    return str(target)
+
+
+@lru_cache(maxsize=None)
+def portrait_dimensions(path, size_mm=PORTRAIT_SIZE_MM):
+    """Dimensions (largeur, hauteur) en mm de la vignette inscrite dans un carré de size_mm"""
+    from PIL import Image
+
+    with Image.open(path) as img:
+        width_px, height_px = img.size
+    scale = size_mm / max(width_px, height_px)
+    return width_px * scale, height_px * scale
@@ -0,0 +1,155 @@
+"""
+Aperçu HTML/SVG des fiches de créatures
+
+`SvgCanvas` étend la surface de mise en page `LayoutCanvas`, qui reproduit
+le sous-ensemble de l'API FPDF utilisé par les générateurs (curseur,
+polices, cellules, lignes, images, sauts de page). Les fonctions
+`generate_*_creature_page` s'exécutent donc telles quelles sur cette
+surface : l'aperçu suit les mêmes décisions de mise en page que le PDF,
+avec le même découpage des lignes.
+"""
+
+import html
+import time
+from pathlib import Path
+
+from .events import BuildEvent, RENDERED, WRITTEN
+from .layout import LayoutCanvas
+from .pipeline import render_creature
+
+# Fichiers de police servis au navigateur (famille, style) -> chemin
+PREVIEW_FONTS = {
+    ("DejaVu", ""): "fonts/DejaVuSans.ttf",
+    ("DejaVu", "B"): "fonts/DejaVuSans-Bold.ttf",
+    ("Caesar", ""): "fonts/CaesarDressing-Regular.ttf",
+    ("Orbitron", ""): "fonts/Orbitron-Regular.ttf",
+    ("Orbitron", "B"): "fonts/Orbitron-Bold.ttf",
+}
+
+
+def _fmt(value):
+    """Formate un nombre pour les attributs SVG"""
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+
+class SvgCanvas(LayoutCanvas):
+    """Surface de dessin compatible FPDF produisant une page SVG par carte"""
+
+    def _emit(self, element):
+        self.pages[-1].append(element)
+
+    def _text(self, x, y, height, text, anchor="start", length=None):
+        baseline = y + 0.5 * height + 0.3 * self.font_size
+        weight = ' font-weight="bold"' if "B" in self.font_style else ""
+        extra = ""
+        if length is not None:
+            extra = f' textLength="{_fmt(length)}" lengthAdjust="spacing"'
+        r, g, b = self._text_color
+        self._emit(
+            f'<text x="{_fmt(x)}" y="{_fmt(baseline)}" font-family="{self.font_family}"{weight}'
+            f' font-size="{_fmt(self.font_size)}" fill="rgb({r},{g},{b})"'
+            f' text-anchor="{anchor}"{extra} xml:space="preserve">{html.escape(text)}</text>'
+        )
+
+    def _rect(self, x, y, w, h):
+        r, g, b = self._draw_color
+        self._emit(
+            f'<rect x="{_fmt(x)}" y="{_fmt(y)}" width="{_fmt(w)}" height="{_fmt(h)}"'
+            f' fill="none" stroke="rgb({r},{g},{b})" stroke-width="{_fmt(self.line_width)}"/>'
+        )
+
+    def line(self, x1, y1, x2, y2):
+        r, g, b = self._draw_color
+        self._emit(
+            f'<line x1="{_fmt(x1)}" y1="{_fmt(y1)}" x2="{_fmt(x2)}" y2="{_fmt(y2)}"'
+            f' stroke="rgb({r},{g},{b})" stroke-width="{_fmt(self.line_width)}"/>'
+        )
+
+    def image(self, name, x=None, y=None, w=0, h=0):
+        x = self.x if x is None else x
+        y = self.y if y is None else y
+        href = html.escape(Path(name).resolve().as_uri())
+        self._emit(
+            f'<image href="{href}" x="{_fmt(x)}" y="{_fmt(y)}" width="{_fmt(w)}" height="{_fmt(h)}"/>'
+        )
+
+    def page_svg(self, index):
+        """Retourne le SVG autonome d'une page"""
+        return (
+            f'<svg xmlns="http://www.w3.org/2000/svg" viewBox="0 0 {_fmt(self.w)} {_fmt(self.h)}"'
+            f' width="{_fmt(self.w)}mm" height="{_fmt(self.h)}mm">'
+            f'<rect width="100%" height="100%" fill="white"/>'
+            + "".join(self.pages[index])
+            + "</svg>"
+        )
+
+
+def _font_faces():
+    """Déclarations @font-face pointant vers les polices du projet"""
+    faces = []
+    for (family, style), path in PREVIEW_FONTS.items():
+        weight = "bold" if "B" in style else "normal"
+        faces.append(
+            f"@font-face {{ font-family: '{family}'; font-weight: {weight};"
+            f" src: url('{Path(path).resolve().as_uri()}'); }}"
+        )
+    return "\n".join(faces)
+
+
+def render_preview_cards(creatures, page_func, on_event=None, fit=None, options=None):
+    """Rend chaque créature sur une surface SVG et retourne la liste des cartes (une liste de SVG par créature)"""
+    canvas = SvgCanvas(options=options)
+    cards = []
+    total = len(creatures)
+    for index, creature_data in enumerate(creatures):
+        start = time.perf_counter()
+        first_page = len(canvas.pages)
+        render_creature(canvas, creature_data, page_func, fit)
+        cards.append([canvas.page_svg(i) for i in range(first_page, len(canvas.pages))])
+        if on_event:
+            on_event(BuildEvent(RENDERED, system="preview", name=str(creature_data.get("name", creature_data.get("title", ""))),
+                                index=index, total=total, elapsed=time.perf_counter() - start))
+    return cards
+
+
+def generate_preview(creatures, output_path, page_func, title="Aperçu des créatures", on_event=None, fit=None,
+                     options=None):
+    """Génère un aperçu HTML des fiches en réutilisant la fonction de page du système"""
+    cards = render_preview_cards(creatures, page_func, on_event, fit, options)
+    start = time.perf_counter()
+
+    body = []
+    for pages in cards:
+        overflow = ' class="card overflow"' if len(pages) > 1 else ' class="card"'
+        body.append(f"<div{overflow}>" + "".join(pages) + "</div>")
+
+    document = f"""<!DOCTYPE html>
+<html lang="fr">
+<head>
+<meta charset="utf-8">
+<title>{html.escape(title)}</title>
+<style>
+{_font_faces()}
+body {{ background: #ddd; font-family: 'DejaVu', sans-serif; margin: 1em; }}
+h1 {{ font-size: 1.2em; }}
+.cards {{ display: flex; flex-wrap: wrap; gap: 1em; }}
+.card {{ display: flex; gap: 2px; }}
+.card svg {{ box-shadow: 0 1px 4px rgba(0, 0, 0, 0.4); }}
+.card.overflow svg {{ outline: 2px solid #c00; }}
+</style>
+</head>
+<body>
+<h1>{html.escape(title)} ({len(cards)} fiche(s))</h1>
+<div class="cards">
+{chr(10).join(body)}
+</div>
+</body>
+</html>
+"""
+    Path(output_path).write_text(document, encoding="utf-8")
+    if on_event:
+        on_event(BuildEvent(WRITTEN, system="preview", output=str(output_path), total=len(cards),
+                            elapsed=time.perf_counter() - start))
+    else:
+        print(f"✅ Aperçu généré : {output_path}")
+    return output_path
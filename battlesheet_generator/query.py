@@ -0,0 +1,261 @@
+"""
+Requêtes indexées sur un bestiaire chargé en mémoire
+
+`Bestiary` construit une fois la table d'analyse (`bestiary_table`) puis des
+index : un index trié par colonne numérique (niveau/FP, PV, défense...), un
+index des types (valeur -> lignes) et un index des étiquettes (champ `tags`
+des fiches et mots du type). Une requête ne relit ni ne réanalyse aucun
+fichier : chaque condition devient une recherche dichotomique ou une lecture
+d'index, combinées en masques booléens NumPy.
+
+Syntaxe :
+
+    niveau between 2 and 4 and type ~ "mort-vivant"
+    pv >= 30 and not tag = boss
+    (defense > 15 or dpr >= 10) and nom ~ stalker
+
+Opérateurs : = != < <= > >= ~ (contient, sans casse), between X and Y ;
+connecteurs and, or, not et parenthèses.
+"""
+
+import re
+
+from .analytics import bestiary_table, NUMERIC_COLUMNS
+from .dice import _numpy
+
+# Noms de champs acceptés -> colonne de la table
+FIELD_ALIASES = {
+    "niveau": "level", "level": "level", "cr": "level", "fp": "level",
+    "pv": "hit_points", "hp": "hit_points",
+    "defense": "defense", "défense": "defense", "ca": "defense", "ac": "defense",
+    "dpr": "damage_per_round", "degats": "average_damage", "dégâts": "average_damage",
+    "nom": "name", "name": "name", "type": "type",
+    "tag": "tag", "tags": "tag",
+}
+
+_TOKEN_RE = re.compile(r"""\s*(?:("[^"]*"|'[^']*')|(-?\d+(?:[.,]\d+)?(?:/\d+)?)(?![\w-])|(<=|>=|!=|=|<|>|~|\(|\))|([^\s()"'<>=!~]+))""")
+_WORD_RE = re.compile(r"[\w-]+")
+
+
+class QuerySyntaxError(ValueError):
+    """Requête invalide"""
+
+
+def _tokenize(text):
+    tokens = []
+    position = 0
+    text = text.rstrip()
+    while position < len(text):
+        match = _TOKEN_RE.match(text, position)
+        if not match:
+            raise QuerySyntaxError(f"Caractère inattendu à la position {position}: '{text[position:]}'")
+        string, number, operator, word = match.groups()
+        if string is not None:
+            tokens.append(("value", string[1:-1]))
+        elif number is not None:
+            numerator, _, denominator = number.replace(",", ".").partition("/")
+            tokens.append(("value", float(numerator) / float(denominator or 1)))
+        elif operator is not None:
+            tokens.append(("op", operator))
+        elif word.lower() in ("and", "or", "not", "between", "et", "ou"):
+            tokens.append(("keyword", {"et": "and", "ou": "or"}.get(word.lower(), word.lower())))
+        else:
+            tokens.append(("value", word))
+        position = match.end()
+    return tokens
+
+
+def _tags(creature_data):
+    """Étiquettes d'une créature : champ `tags` et mots du type, en minuscules"""
+    tags = {str(tag).lower() for tag in creature_data.get("tags", []) or []}
+    tags.update(word.lower() for word in _WORD_RE.findall(str(creature_data.get("type", ""))))
+    return tags
+
+
+class Bestiary:
+    """Bestiaire d'un système, indexé pour les requêtes"""
+
+    def __init__(self, creatures, system):
+        np = _numpy()
+        self.np = np
+        self.creatures = list(creatures)
+        self.system = system
+        self.table = bestiary_table(self.creatures, system)
+        self.size = len(self.creatures)
+
+        # Index triés : (ordre des lignes, valeurs triées), NaN en fin
+        self.sorted_index = {}
+        for column in NUMERIC_COLUMNS:
+            values = self.table[column]
+            order = np.argsort(values, kind="stable")
+            self.sorted_index[column] = (order, values[order])
+
+        self.value_index = {}
+        for column in ("name", "type"):
+            index = {}
+            for row, value in enumerate(self.table[column].tolist()):
+                index.setdefault(value.lower(), []).append(row)
+            self.value_index[column] = {key: np.array(rows) for key, rows in index.items()}
+
+        tag_index = {}
+        for row, creature_data in enumerate(self.creatures):
+            for tag in _tags(creature_data):
+                tag_index.setdefault(tag, []).append(row)
+        self.tag_index = {tag: np.array(rows) for tag, rows in tag_index.items()}
+
+    # --- Conditions élémentaires -------------------------------------------
+
+    def _mask(self, rows):
+        mask = self.np.zeros(self.size, dtype=bool)
+        if len(rows):
+            mask[rows] = True
+        return mask
+
+    def _range(self, column, low, high, include_low=True, include_high=True):
+        order, values = self.sorted_index[column]
+        start = self.np.searchsorted(values, low, side="left" if include_low else "right")
+        stop = self.np.searchsorted(values, high, side="right" if include_high else "left")
+        return self._mask(order[start:stop])
+
+    def _numeric(self, column, operator, value):
+        infinity = float("inf")
+        if operator == "=":
+            return self._range(column, value, value)
+        if operator == "!=":
+            return self._range(column, -infinity, infinity) & ~self._range(column, value, value)
+        if operator == "<":
+            return self._range(column, -infinity, value, include_high=False)
+        if operator == "<=":
+            return self._range(column, -infinity, value)
+        if operator == ">":
+            return self._range(column, value, infinity, include_low=False)
+        if operator == ">=":
+            return self._range(column, value, infinity)
+        raise QuerySyntaxError(f"Opérateur '{operator}' non supporté pour '{column}'")
+
+    def _text(self, column, operator, value):
+        value = str(value).lower()
+        index = self.value_index[column]
+        if operator in ("=", "!="):
+            mask = self._mask(index.get(value, []))
+            return ~mask if operator == "!=" else mask
+        if operator == "~":
+            # Parcourt les valeurs distinctes seulement, pas les lignes
+            mask = self.np.zeros(self.size, dtype=bool)
+            for key, rows in index.items():
+                if value in key:
+                    mask[rows] = True
+            return mask
+        raise QuerySyntaxError(f"Opérateur '{operator}' non supporté pour '{column}'")
+
+    def _tag(self, operator, value):
+        value = str(value).lower()
+        if operator == "~":
+            mask = self.np.zeros(self.size, dtype=bool)
+            for tag, rows in self.tag_index.items():
+                if value in tag:
+                    mask[rows] = True
+            return mask
+        mask = self._mask(self.tag_index.get(value, []))
+        if operator == "=":
+            return mask
+        if operator == "!=":
+            return ~mask
+        raise QuerySyntaxError(f"Opérateur '{operator}' non supporté pour 'tag'")
+
+    def condition(self, field, operator, value, high=None):
+        """Masque booléen d'une condition élémentaire"""
+        column = FIELD_ALIASES.get(field.lower(), field.lower())
+        if column == "tag":
+            return self._tag(operator, value)
+        if column in self.value_index:
+            return self._text(column, operator, value)
+        if column not in self.sorted_index:
+            raise QuerySyntaxError(f"Champ inconnu: '{field}'")
+        if not isinstance(value, float) or (high is not None and not isinstance(high, float)):
+            raise QuerySyntaxError(f"Valeur numérique attendue pour '{field}'")
+        if operator == "between":
+            return self._range(column, min(value, high), max(value, high))
+        return self._numeric(column, operator, value)
+
+    # --- Requêtes ------------------------------------------------------------
+
+    def mask(self, query):
+        """Masque booléen des créatures satisfaisant une requête"""
+        parser = _QueryParser(_tokenize(query), query, self)
+        return parser.parse()
+
+    def select(self, query):
+        """Créatures satisfaisant une requête, dans l'ordre du bestiaire"""
+        return [self.creatures[row] for row in self.np.flatnonzero(self.mask(query))]
+
+
+class _QueryParser:
+    """Analyseur descendant : or < and < not < condition"""
+
+    def __init__(self, tokens, text, bestiary):
+        self.tokens = tokens
+        self.text = text
+        self.bestiary = bestiary
+        self.index = 0
+
+    def peek(self):
+        return self.tokens[self.index] if self.index < len(self.tokens) else None
+
+    def take(self, expected_kind=None):
+        token = self.peek()
+        if token is None or (expected_kind and token[0] != expected_kind):
+            raise QuerySyntaxError(f"Requête incomplète ou invalide: '{self.text}'")
+        self.index += 1
+        return token
+
+    def parse(self):
+        if not self.tokens:
+            return self.bestiary.np.ones(self.bestiary.size, dtype=bool)
+        mask = self.disjunction()
+        if self.peek() is not None:
+            raise QuerySyntaxError(f"Élément inattendu '{self.peek()[1]}' dans '{self.text}'")
+        return mask
+
+    def disjunction(self):
+        mask = self.conjunction()
+        while self.peek() == ("keyword", "or"):
+            self.take()
+            mask = mask | self.conjunction()
+        return mask
+
+    def conjunction(self):
+        mask = self.negation()
+        while self.peek() == ("keyword", "and"):
+            self.take()
+            mask = mask & self.negation()
+        return mask
+
+    def negation(self):
+        if self.peek() == ("keyword", "not"):
+            self.take()
+            return ~self.negation()
+        if self.peek() == ("op", "("):
+            self.take()
+            mask = self.disjunction()
+            if self.take() != ("op", ")"):
+                raise QuerySyntaxError(f"Parenthèse non fermée: '{self.text}'")
+            return mask
+        return self.comparison()
+
+    def comparison(self):
+        field = self.take("value")[1]
+        if not isinstance(field, str):
+            raise QuerySyntaxError(f"Nom de champ attendu dans '{self.text}'")
+        if self.peek() == ("keyword", "between"):
+            self.take()
+            low = self.take("value")[1]
+            if self.take() != ("keyword", "and"):
+                raise QuerySyntaxError(f"'between X and Y' attendu dans '{self.text}'")
+            high = self.take("value")[1]
+            return self.bestiary.condition(field, "between", low, high)
+        operator = self.take("op")[1]
+        value = self.take("value")[1]
+        if isinstance(value, float) and FIELD_ALIASES.get(field.lower()) in ("name", "type", "tag"):
+            value = f"{value:g}"
+        return self.bestiary.condition(field, operator, value)
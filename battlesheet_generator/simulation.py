@@ -0,0 +1,277 @@
+"""
+Simulation Monte Carlo de rencontres
+
+Les combattants sont extraits des fiches (`combat_profile`) : défense, points
+de vie, bonus d'attaque, nombre d'attaques et dégâts compilés par le moteur
+de dés. Les escouades (`units` ou `unite`) sont éclatées en unités
+individuelles : les points de vie et les dégâts de la fiche sont répartis
+par unité, une escouade frappe donc moins fort à mesure qu'elle perd des
+membres.
+
+`simulate_encounter` joue toutes les rencontres en même temps sous forme de
+tableaux NumPy (essais × combattants). Chaque round est résolu simultanément :
+chaque combattant vivant attaque un ennemi vivant tiré au hasard, avec
+d20 + bonus contre la défense (20 touche toujours, 1 rate toujours).
+"""
+
+import re
+from dataclasses import dataclass
+
+from .base_generator import parse_swn_title
+from .dice import parse_dice, try_parse_dice, DiceExpression, DiceSyntaxError, _numpy
+
+_LEADING_INT_RE = re.compile(r"^\s*([-+]?\d+)")
+
+# Clés possibles du bonus d'attaque dans les stats SWN
+SWN_ATTACK_KEYS = ("Bonus d'attaque", "Attaque", "Jet d'attaque")
+
+# Caractéristique d'attaque COF selon le type d'attaque
+COF_ATTACK_STATS = {"contact": "puissance", "distance": "adresse", "magique": "esprit", "psychique": "esprit"}
+
+
+@dataclass
+class Combatant:
+    """Unité de combat : une créature, un membre d'escouade ou un personnage"""
+
+    name: str
+    hit_points: float
+    defense: int
+    attack_bonus: int = 0
+    damage: DiceExpression = None
+    attacks: int = 1
+
+
+def _leading_int(value, default=None):
+    """Premier entier d'une valeur (« 80 (4 * ...) » -> 80, « +3 » -> 3)"""
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return int(value)
+    match = _LEADING_INT_RE.match(str(value or ""))
+    return int(match.group(1)) if match else default
+
+
+def _per_unit(dice, units):
+    """Expression par unité d'une escouade (« 4 * (1d6 + 5) » -> « 1d6 + 5 »)"""
+    node = dice.node
+    if units > 1 and node[0] == "mul" and node[1] == units:
+        return DiceExpression(dice.text, node[2], dice.extra)
+    return dice
+
+
+def _hit_points(value, units):
+    """Points de vie par unité : valeur de tête si présente, sinon moyenne de l'expression"""
+    total = _leading_int(value)
+    if total is None:
+        dice = try_parse_dice(value)
+        if dice is None:
+            return None
+        return _per_unit(dice, units).average if units > 1 else dice.average
+    return total / units
+
+
+def _best_attack(candidates):
+    """Attaque retenue : (bonus, dégâts) de plus forte moyenne de dégâts"""
+    best = None
+    for bonus, damage, units in candidates:
+        dice = try_parse_dice(damage)
+        if dice is None or not dice.has_dice and dice.average <= 0:
+            continue
+        dice = _per_unit(dice, units)
+        if best is None or (dice.average, bonus) > (best[1].average, best[0]):
+            best = (bonus, dice)
+    return best
+
+
+def _expand(name, units, hit_points, defense, attack, attacks=1):
+    if hit_points is None or defense is None:
+        raise ValueError(f"'{name}' : points de vie ou défense manquants")
+    bonus, damage = attack if attack else (0, None)
+    if units == 1:
+        return [Combatant(name, hit_points, defense, bonus, damage, attacks)]
+    return [Combatant(f"{name} #{i + 1}", hit_points, defense, bonus, damage, attacks) for i in range(units)]
+
+
+def combat_profile(creature_data, system):
+    """Liste des combattants d'une fiche (plusieurs pour une escouade)
+
+    Lève ValueError si la fiche n'a pas de défense ou de points de vie
+    exploitables. Une créature sans attaque chiffrée reste dans la rencontre
+    mais n'inflige pas de dégâts.
+    """
+    units = max(1, _leading_int(creature_data.get("units", creature_data.get("unite", 1)), 1))
+
+    if system == "dnd":
+        name = creature_data.get("name", "Créature inconnue")
+        candidates = []
+        for action in creature_data.get("actions", []) or []:
+            bonus = _leading_int(action.get("attack_bonus"))
+            if bonus is not None and action.get("damage"):
+                candidates.append((bonus, action["damage"], units))
+        return _expand(name, units, _hit_points(creature_data.get("hit_points"), units),
+                       _leading_int(creature_data.get("armor_class")), _best_attack(candidates))
+
+    if system == "swn":
+        name = parse_swn_title(str(creature_data.get("title", "")))[0] or "Créature inconnue"
+        stats = creature_data.get("stats", {})
+        bonus = next((_leading_int(stats[key], 0) for key in SWN_ATTACK_KEYS if key in stats), 0)
+        candidates = [(bonus, weapon.get("damage"), units) for weapon in creature_data.get("weapons", []) or []]
+        return _expand(name, units, _hit_points(stats.get("PV"), units), _leading_int(stats.get("CA")),
+                       _best_attack(candidates), max(1, _leading_int(stats.get("Attaques"), 1)))
+
+    if system in ("cofmini", "timothee"):
+        name = creature_data.get("name", "Créature inconnue")
+        defenses = creature_data.get("defenses", {})
+        level = _leading_int(creature_data.get("niveau"), 0)
+        characteristics = creature_data.get("caracteristiques", {})
+        candidates = []
+        for attaque in creature_data.get("attaques", []) or []:
+            stat = COF_ATTACK_STATS.get(str(attaque.get("type", "")).lower(), "puissance")
+            bonus = level + _leading_int(characteristics.get(stat), 0)
+            candidates.append((bonus, attaque.get("degats"), units))
+        return _expand(name, units, _hit_points(defenses.get("points_de_vie"), units),
+                       _leading_int(defenses.get("defense")), _best_attack(candidates))
+
+    raise ValueError(f"Système non supporté par la simulation: {system}")
+
+
+def party_combatants(members):
+    """Combattants d'un groupe de personnages décrit en JSON
+
+    Chaque membre : {"name", "hit_points", "defense", "attack_bonus",
+    "damage", "attacks" (1 par défaut), "count" (1 par défaut)}.
+    """
+    combatants = []
+    for member in members:
+        name = member.get("name", "Personnage")
+        try:
+            damage = parse_dice(str(member.get("damage", "0")))
+        except DiceSyntaxError as e:
+            raise ValueError(f"'{name}' : {e}") from None
+        count = max(1, int(member.get("count", 1)))
+        for i in range(count):
+            combatants.append(Combatant(
+                name if count == 1 else f"{name} #{i + 1}",
+                float(member["hit_points"]),
+                int(member["defense"]),
+                int(member.get("attack_bonus", 0)),
+                damage,
+                int(member.get("attacks", 1)),
+            ))
+    return combatants
+
+
+def _side_arrays(np, combatants):
+    """Tableaux d'un camp : points de vie, défense, et une entrée par attaque"""
+    hit_points = np.array([c.hit_points for c in combatants], dtype=float)
+    defense = np.array([c.defense for c in combatants], dtype=float)
+    attacks = []
+    for index, combatant in enumerate(combatants):
+        if combatant.damage is None:
+            continue
+        values, probabilities = combatant.damage.distribution()
+        cumulative = np.cumsum(probabilities)
+        cumulative[-1] = 1.0
+        for _ in range(combatant.attacks):
+            attacks.append((index, combatant.attack_bonus, values, cumulative))
+    return hit_points, defense, attacks
+
+
+def _attack_side(np, rng, attackers, attacker_hp, target_hp, target_defense):
+    """Dégâts infligés par un camp pendant un round : tableau essais × cibles"""
+    trials, targets = target_hp.shape
+    damage = np.zeros(trials * targets)
+    alive_targets = target_hp > 0
+    cumulative_alive = np.cumsum(alive_targets, axis=1)
+    alive_count = cumulative_alive[:, -1]
+    rows = np.arange(trials) * targets
+
+    for index, bonus, values, cumulative in attackers:
+        active = (attacker_hp[:, index] > 0) & (alive_count > 0)
+        if not active.any():
+            continue
+        # Cible vivante tirée au hasard : k-ième cible vivante
+        k = (rng.random(trials) * alive_count).astype(int)
+        target = np.argmax(cumulative_alive > k[:, None], axis=1)
+        roll = rng.integers(1, 21, trials)
+        hit = active & (roll != 1) & ((roll == 20) | (roll + bonus >= target_defense[target]))
+        amount = values[np.searchsorted(cumulative, rng.random(trials), side="right")]
+        damage += np.bincount(rows + target, weights=np.where(hit, np.maximum(amount, 0), 0),
+                              minlength=trials * targets)
+    return damage.reshape(trials, targets)
+
+
+def simulate_encounter(party, monsters, trials=10000, max_rounds=50, seed=None):
+    """Simule `trials` rencontres entre deux listes de combattants
+
+    Retourne un dictionnaire : taux de victoire du groupe, des monstres et de
+    nul (double K.O. ou limite de rounds), nombre moyen de rounds par issue,
+    points de vie restants des vainqueurs et taux de survie par combattant.
+    """
+    np = _numpy()
+    rng = np.random.default_rng(seed)
+
+    party_hp, party_defense, party_attacks = _side_arrays(np, party)
+    monster_hp, monster_defense, monster_attacks = _side_arrays(np, monsters)
+    party_state = np.tile(party_hp, (trials, 1))
+    monster_state = np.tile(monster_hp, (trials, 1))
+    ended = np.zeros(trials, dtype=int)
+
+    for round_number in range(1, max_rounds + 1):
+        running = ended == 0
+        if not running.any():
+            break
+        to_monsters = _attack_side(np, rng, party_attacks, party_state, monster_state, monster_defense)
+        to_party = _attack_side(np, rng, monster_attacks, monster_state, party_state, party_defense)
+        monster_state -= to_monsters
+        party_state -= to_party
+        finished = running & (~(party_state > 0).any(axis=1) | ~(monster_state > 0).any(axis=1))
+        ended[finished] = round_number
+
+    party_alive = (party_state > 0).any(axis=1)
+    monsters_alive = (monster_state > 0).any(axis=1)
+    party_wins = party_alive & ~monsters_alive
+    monster_wins = monsters_alive & ~party_alive
+    draws = ~party_wins & ~monster_wins
+
+    def mean_rounds(mask):
+        return float(ended[mask].mean()) if mask.any() else None
+
+    def remaining(state, start, mask):
+        if not mask.any():
+            return None
+        return float(np.clip(state[mask], 0, None).sum(axis=1).mean() / start.sum())
+
+    return {
+        "trials": trials,
+        "party_win_rate": float(party_wins.mean()),
+        "monster_win_rate": float(monster_wins.mean()),
+        "draw_rate": float(draws.mean()),
+        "rounds_party_win": mean_rounds(party_wins),
+        "rounds_monster_win": mean_rounds(monster_wins),
+        "party_hp_remaining": remaining(party_state, party_hp, party_wins),
+        "monster_hp_remaining": remaining(monster_state, monster_hp, monster_wins),
+        "party_survival": {c.name: float(rate) for c, rate in zip(party, (party_state > 0).mean(axis=0))},
+        "monster_survival": {c.name: float(rate) for c, rate in zip(monsters, (monster_state > 0).mean(axis=0))},
+    }
+
+
+def format_simulation_report(result):
+    """Résumé lisible d'un résultat de simulation"""
+    def rounds(value):
+        return f"{value:.1f}" if value is not None else "-"
+
+    def percent(value):
+        return f"{value * 100:.0f} %" if value is not None else "-"
+
+    lines = [
+        f"🎲 {result['trials']} rencontre(s) simulée(s)",
+        f"   Victoire du groupe   : {percent(result['party_win_rate'])}"
+        f" (en {rounds(result['rounds_party_win'])} rounds, PV restants {percent(result['party_hp_remaining'])})",
+        f"   Victoire des monstres: {percent(result['monster_win_rate'])}"
+        f" (en {rounds(result['rounds_monster_win'])} rounds, PV restants {percent(result['monster_hp_remaining'])})",
+        f"   Nul                  : {percent(result['draw_rate'])}",
+        "   Survie du groupe :",
+    ]
+    lines += [f"     - {name}: {percent(rate)}" for name, rate in result["party_survival"].items()]
+    return "\n".join(lines)
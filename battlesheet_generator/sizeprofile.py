@@ -0,0 +1,178 @@
+"""
+Profil de taille des PDF
+
+Avec l'option de rendu `size_report`, le PDF porte un `SizeProfile` qui
+attribue les octets de flux de contenu :
+
+- à chaque section décorée par `profiled_section` ou ouverte par `profiled`
+  (octets propres, sans ceux des sous-sections, par exemple
+  `draw_section_title`) ;
+- à chaque créature (octets bruts de ses pages et estimation compressée).
+
+Après l'écriture, les objets du fichier sont relus pour mesurer chaque
+police embarquée (sous-ensemble, descripteur, table ToUnicode...).
+"""
+
+import functools
+import re
+import zlib
+from contextlib import contextmanager
+
+_OBJ_RE = re.compile(rb"(?:^|\n)(\d+) 0 obj\b")
+_REF_RE = re.compile(rb"(\d+) 0 R\b")
+_BASE_FONT_RE = re.compile(rb"/BaseFont\s*/([^\s/>]+)")
+
+
+def profiled_section(func):
+    """Décorateur de section : mesure les octets ajoutés si le PDF porte un SizeProfile"""
+    @functools.wraps(func)
+    def wrapper(pdf, *args, **kwargs):
+        profile = getattr(pdf, "size_profile", None)
+        if profile is None:
+            return func(pdf, *args, **kwargs)
+        profile.enter(pdf, func.__name__)
+        try:
+            return func(pdf, *args, **kwargs)
+        finally:
+            profile.leave(pdf)
+    return wrapper
+
+
+@contextmanager
+def profiled(pdf, name):
+    """Section mesurée sous forme de bloc `with` (sections des cartes compilées, voir cards.py)"""
+    profile = getattr(pdf, "size_profile", None)
+    if profile is None:
+        yield
+        return
+    profile.enter(pdf, name)
+    try:
+        yield
+    finally:
+        profile.leave(pdf)
+
+
+def _page_length(pdf, page):
+    return len(pdf.pages[page].contents) if page else 0
+
+
+def _mark(pdf):
+    return pdf.page, _page_length(pdf, pdf.page)
+
+
+def _bytes_since(pdf, mark):
+    page, length = mark
+    if pdf.page == page:
+        return _page_length(pdf, page) - length
+    total = _page_length(pdf, page) - length
+    for number in range(page + 1, pdf.page + 1):
+        total += _page_length(pdf, number)
+    return total
+
+
+def pdf_objects(data):
+    """Objets d'un fichier PDF : numéro -> (dictionnaire avant le flux, taille en octets)"""
+    matches = list(_OBJ_RE.finditer(data))
+    objects = {}
+    for index, match in enumerate(matches):
+        end = matches[index + 1].start() if index + 1 < len(matches) else data.rfind(b"xref")
+        body = data[match.start():end]
+        stream = body.find(b"stream")
+        objects[int(match.group(1))] = (body if stream < 0 else body[:stream], len(body))
+    return objects
+
+
+def font_sizes(data):
+    """Octets de chaque police embarquée (objets atteignables depuis la police Type0)"""
+    objects = pdf_objects(data)
+    sizes = {}
+    for number, (header, _) in objects.items():
+        if b"/Type /Font" not in header or b"/Subtype /Type0" not in header:
+            continue
+        match = _BASE_FONT_RE.search(header)
+        name = match.group(1).decode("latin-1").split("+", 1)[-1] if match else f"objet {number}"
+        seen = set()
+        pending = [number]
+        while pending:
+            current = pending.pop()
+            if current in seen or current not in objects:
+                continue
+            seen.add(current)
+            pending.extend(int(ref) for ref in _REF_RE.findall(objects[current][0]))
+        sizes[name] = sum(objects[current][1] for current in seen)
+    return sizes
+
+
+class SizeProfile:
+    """Octets de flux de contenu par section et par créature, octets par police"""
+
+    def __init__(self):
+        self.sections = {}
+        self.creatures = []
+        self.fonts = {}
+        self.file_size = 0
+        self._stack = []
+        self._creature = None
+
+    # --- Sections -----------------------------------------------------------
+
+    def enter(self, pdf, name):
+        self._stack.append([name, _mark(pdf), 0])
+
+    def leave(self, pdf):
+        name, mark, children = self._stack.pop()
+        total = _bytes_since(pdf, mark)
+        own = total - children
+        if self._stack:
+            self._stack[-1][2] += total
+        for sections in (self.sections, self._creature["sections"] if self._creature else None):
+            if sections is None:
+                continue
+            entry = sections.setdefault(name, {"calls": 0, "bytes": 0})
+            entry["calls"] += 1
+            entry["bytes"] += own
+
+    # --- Créatures ----------------------------------------------------------
+
+    def begin_creature(self, pdf, name):
+        self._creature = {"name": name, "sections": {}, "_mark": _mark(pdf), "_first_page": pdf.page + 1}
+
+    def end_creature(self, pdf):
+        creature = self._creature
+        self._creature = None
+        pages = range(creature.pop("_first_page"), pdf.page + 1)
+        creature["bytes"] = _bytes_since(pdf, creature.pop("_mark"))
+        creature["pages"] = len(pages)
+        creature["compressed_bytes"] = sum(len(zlib.compress(bytes(pdf.pages[page].contents))) for page in pages)
+        self.creatures.append(creature)
+
+    # --- Fichier ------------------------------------------------------------
+
+    def analyze_output(self, data):
+        """Mesure le fichier écrit : taille totale et coût de chaque police"""
+        self.file_size = len(data)
+        self.fonts = font_sizes(data)
+
+    def to_dict(self):
+        return {
+            "file_size": self.file_size,
+            "fonts": self.fonts,
+            "sections": self.sections,
+            "creatures": self.creatures,
+        }
+
+    def summary(self, top=5):
+        """Résumé lisible : polices, créatures et sections les plus lourdes"""
+        lines = [f"Taille du fichier : {self.file_size / 1024:.1f} Ko"]
+        if self.fonts:
+            lines.append("Polices :")
+            for name, size in sorted(self.fonts.items(), key=lambda item: -item[1]):
+                lines.append(f"  - {name}: {size / 1024:.1f} Ko")
+        lines.append("Créatures les plus lourdes (contenu compressé) :")
+        for creature in sorted(self.creatures, key=lambda c: -c["compressed_bytes"])[:top]:
+            lines.append(f"  - {creature['name']}: {creature['compressed_bytes'] / 1024:.1f} Ko"
+                         f" ({creature['bytes'] / 1024:.1f} Ko brut, {creature['pages']} page(s))")
+        lines.append("Sections les plus lourdes (contenu brut) :")
+        for name, entry in sorted(self.sections.items(), key=lambda item: -item[1]["bytes"])[:top]:
+            lines.append(f"  - {name}: {entry['bytes'] / 1024:.1f} Ko en {entry['calls']} appel(s)")
+        return "\n".join(lines)
@@ -0,0 +1,319 @@
+"""
+Bestiaire SQLite avec recherche plein texte
+
+Un fichier SQLite optionnel reflète les dossiers JSON de chaque système :
+
+- `creatures` : une ligne par fiche (système, source, JSON complet) et les
+  colonnes de la table d'analyse (niveau, PV, défense...), indexées ;
+- `abilities` : traits et capacités (nom, texte) ;
+- `attacks` : attaques et armes (nom, dégâts, bonus) ;
+- `tags` : étiquettes des requêtes (champ `tags` et mots du type) ;
+- `creature_text` : index plein texte FTS5 du nom, des traits et capacités
+  et des descriptions, sans accents ni casse (« regeneration » trouve
+  « Régénération »).
+
+`BestiaryStore.search` combine une recherche plein texte et une requête
+`--where` (même syntaxe que query.py, traduite en SQL) : la recherche ne lit
+que les lignes retenues par les index, sans ouvrir un seul fichier JSON.
+"""
+
+import json
+import math
+import re
+import sqlite3
+from pathlib import Path
+
+from .analytics import creature_metrics, NUMERIC_COLUMNS, TRAIT_FIELDS, ABILITY_FIELDS
+from .query import FIELD_ALIASES, QuerySyntaxError, _QueryParser, _tokenize, _tags
+
+# Champs de texte libre indexés comme description, par système
+DESCRIPTION_FIELDS = {
+    "dnd": ("description", "type", "languages"),
+    "swn": ("title", "role", "description"),
+    "cofmini": ("description", "type"),
+    "timothee": ("description", "type"),
+}
+
+# Créatures écrites par transaction lors d'un import
+IMPORT_BATCH_SIZE = 500
+
+_COLUMNS_SQL = ", ".join(f"{column} REAL" for column in NUMERIC_COLUMNS)
+
+_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS creatures (
+    id INTEGER PRIMARY KEY,
+    system TEXT NOT NULL,
+    source TEXT NOT NULL,
+    name TEXT NOT NULL,
+    type TEXT NOT NULL,
+    {_COLUMNS_SQL},
+    data TEXT NOT NULL,
+    UNIQUE (system, source)
+);
+CREATE TABLE IF NOT EXISTS abilities (
+    creature_id INTEGER NOT NULL REFERENCES creatures(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS attacks (
+    creature_id INTEGER NOT NULL REFERENCES creatures(id),
+    position INTEGER NOT NULL,
+    name TEXT NOT NULL,
+    damage TEXT,
+    bonus TEXT
+);
+CREATE TABLE IF NOT EXISTS tags (
+    creature_id INTEGER NOT NULL REFERENCES creatures(id),
+    tag TEXT NOT NULL
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS creature_text USING fts5(
+    name, abilities, description, tokenize = 'unicode61 remove_diacritics 2'
+);
+CREATE INDEX IF NOT EXISTS creatures_level ON creatures(system, level);
+CREATE INDEX IF NOT EXISTS creatures_hit_points ON creatures(system, hit_points);
+CREATE INDEX IF NOT EXISTS creatures_defense ON creatures(system, defense);
+CREATE INDEX IF NOT EXISTS abilities_creature ON abilities(creature_id);
+CREATE INDEX IF NOT EXISTS attacks_creature ON attacks(creature_id);
+CREATE INDEX IF NOT EXISTS tags_tag ON tags(tag, creature_id);
+CREATE INDEX IF NOT EXISTS tags_creature ON tags(creature_id);
+"""
+
+_FTS_WORD_RE = re.compile(r"[\w-]+\*?")
+_FILE_NAME_RE = re.compile(r"[^\w\- ]+")
+
+
+def _item_text(item):
+    """(nom, texte) d'un trait, d'une capacité ou d'une attaque : objet ou « Nom : texte »"""
+    if isinstance(item, dict):
+        name = str(item.get("name", item.get("nom", "")))
+        text = " ".join(str(item[key]) for key in ("description", "desc", "effet") if item.get(key))
+        return name, text
+    name, _, text = str(item).partition(":")
+    return (name.strip(), text.strip()) if text else ("", name.strip())
+
+
+def _attack_row(item):
+    """(nom, dégâts, bonus) d'une attaque ou d'une arme"""
+    if not isinstance(item, dict):
+        return str(item), None, None
+    damage = item.get("damage", item.get("degats"))
+    bonus = item.get("attack_bonus", item.get("bonus"))
+    return (str(item.get("name", item.get("nom", ""))),
+            None if damage is None else str(damage), None if bonus is None else str(bonus))
+
+
+def _sql_number(value):
+    return None if isinstance(value, float) and math.isnan(value) else value
+
+
+def fts_query(text):
+    """Requête FTS5 d'un texte libre : chaque mot est exigé, « regen* » cherche un préfixe"""
+    words = []
+    for word in _FTS_WORD_RE.findall(str(text)):
+        prefix = word.endswith("*")
+        word = word.rstrip("*")
+        if word:
+            words.append(f'"{word}"*' if prefix else f'"{word}"')
+    return " ".join(words)
+
+
+class _Clause:
+    """Condition SQL d'une requête : se combine avec & | ~ comme les masques de Bestiary"""
+
+    def __init__(self, sql, params=()):
+        self.sql = sql
+        self.params = tuple(params)
+
+    def __and__(self, other):
+        return _Clause(f"({self.sql} AND {other.sql})", self.params + other.params)
+
+    def __or__(self, other):
+        return _Clause(f"({self.sql} OR {other.sql})", self.params + other.params)
+
+    def __invert__(self):
+        return _Clause(f"(NOT {self.sql})", self.params)
+
+
+class _SqlConditions:
+    """Traduit les conditions élémentaires de query.py en SQL
+
+    Chaque condition vaut 0 ou 1, jamais NULL : une valeur absente ne satisfait
+    aucune comparaison et `not` l'inclut, comme les masques de Bestiary.
+    """
+
+    _OPERATORS = {"=": "=", "!=": "!=", "<": "<", "<=": "<=", ">": ">", ">=": ">="}
+
+    def condition(self, field, operator, value, high=None):
+        column = FIELD_ALIASES.get(field.lower(), field.lower())
+        if column == "tag":
+            value = str(value).lower()
+            if operator == "~":
+                return _Clause("(c.id IN (SELECT creature_id FROM tags WHERE instr(tag, ?) > 0))", [value])
+            if operator not in ("=", "!="):
+                raise QuerySyntaxError(f"Opérateur '{operator}' non supporté pour 'tag'")
+            clause = _Clause("(c.id IN (SELECT creature_id FROM tags WHERE tag = ?))", [value])
+            return ~clause if operator == "!=" else clause
+        if column in ("name", "type"):
+            value = str(value).lower()
+            if operator == "~":
+                return _Clause(f"(instr(lower(c.{column}), ?) > 0)", [value])
+            if operator not in ("=", "!="):
+                raise QuerySyntaxError(f"Opérateur '{operator}' non supporté pour '{column}'")
+            clause = _Clause(f"(lower(c.{column}) = ?)", [value])
+            return ~clause if operator == "!=" else clause
+        if column not in NUMERIC_COLUMNS:
+            raise QuerySyntaxError(f"Champ inconnu: '{field}'")
+        if not isinstance(value, float) or (high is not None and not isinstance(high, float)):
+            raise QuerySyntaxError(f"Valeur numérique attendue pour '{field}'")
+        if operator == "between":
+            return _Clause(f"(c.{column} BETWEEN ? AND ? AND c.{column} IS NOT NULL)", [min(value, high), max(value, high)])
+        if operator not in self._OPERATORS:
+            raise QuerySyntaxError(f"Opérateur '{operator}' non supporté pour '{column}'")
+        # Comparaison directe (index utilisable), fausse plutôt que NULL pour une valeur absente
+        return _Clause(f"(c.{column} {self._OPERATORS[operator]} ? AND c.{column} IS NOT NULL)", [value])
+
+
+def where_clause(query):
+    """Clause SQL (texte, paramètres) d'une requête query.py ; None pour une requête vide"""
+    tokens = _tokenize(query or "")
+    if not tokens:
+        return None
+    return _QueryParser(tokens, query, _SqlConditions()).parse()
+
+
+class BestiaryStore:
+    """Bestiaire de tous les systèmes stocké dans une base SQLite"""
+
+    def __init__(self, path):
+        self.path = str(path)
+        self.connection = sqlite3.connect(self.path, isolation_level=None)
+        self.connection.executescript(_SCHEMA)
+
+    def close(self):
+        self.connection.close()
+
+    def _delete(self, ids):
+        for table, column in (("abilities", "creature_id"), ("attacks", "creature_id"),
+                              ("tags", "creature_id"), ("creature_text", "rowid"), ("creatures", "id")):
+            self.connection.executemany(f"DELETE FROM {table} WHERE {column} = ?", [(i,) for i in ids])
+
+    def import_creatures(self, system, entries, batch_size=IMPORT_BATCH_SIZE):
+        """Ajoute ou remplace (même système et même source) des créatures ; retourne leur nombre
+
+        `entries` est un itérable de couples (créature, source), par exemple
+        produit au fil de la lecture d'un export : les créatures sont écrites
+        par transactions de `batch_size` et ne sont jamais toutes en mémoire.
+        Un échec n'annule que le lot en cours.
+        """
+        count = 0
+        batch = []
+        for entry in entries:
+            batch.append(entry)
+            if len(batch) >= batch_size:
+                count += self._import_batch(system, batch)
+                batch = []
+        if batch:
+            count += self._import_batch(system, batch)
+        # Statistiques des index à jour pour le planificateur de requêtes
+        self.connection.execute("PRAGMA optimize")
+        return count
+
+    def _import_batch(self, system, batch):
+        columns = ", ".join(NUMERIC_COLUMNS)
+        placeholders = ", ".join("?" for _ in NUMERIC_COLUMNS)
+        self.connection.execute("BEGIN IMMEDIATE")
+        try:
+            for creature_data, source in batch:
+                existing = self.connection.execute("SELECT id FROM creatures WHERE system = ? AND source = ?",
+                                                   (system, str(source))).fetchone()
+                if existing is not None:
+                    self._delete([existing[0]])
+                metrics = creature_metrics(creature_data, system)
+                cursor = self.connection.execute(
+                    f"INSERT INTO creatures (system, source, name, type, {columns}, data)"
+                    f" VALUES (?, ?, ?, ?, {placeholders}, ?)",
+                    [system, str(source), metrics["name"], metrics["type"],
+                     *(_sql_number(metrics[column]) for column in NUMERIC_COLUMNS),
+                     json.dumps(creature_data, ensure_ascii=False)])
+                creature_id = cursor.lastrowid
+
+                abilities = [_item_text(item) for field in TRAIT_FIELDS.get(system, ())
+                             for item in creature_data.get(field) or []]
+                attacks = [_attack_row(item) for field in ABILITY_FIELDS.get(system, ())
+                           for item in creature_data.get(field) or []]
+                self.connection.executemany(
+                    "INSERT INTO abilities (creature_id, position, name, text) VALUES (?, ?, ?, ?)",
+                    [(creature_id, position, name, text) for position, (name, text) in enumerate(abilities)])
+                self.connection.executemany(
+                    "INSERT INTO attacks (creature_id, position, name, damage, bonus) VALUES (?, ?, ?, ?, ?)",
+                    [(creature_id, position, *attack) for position, attack in enumerate(attacks)])
+                self.connection.executemany(
+                    "INSERT INTO tags (creature_id, tag) VALUES (?, ?)",
+                    [(creature_id, tag) for tag in sorted(_tags(creature_data))])
+
+                # Les descriptions d'attaques sont cherchées avec les traits et capacités
+                attack_texts = [" ".join(_item_text(item)) for field in ABILITY_FIELDS.get(system, ())
+                                for item in creature_data.get(field) or []]
+                self.connection.execute(
+                    "INSERT INTO creature_text (rowid, name, abilities, description) VALUES (?, ?, ?, ?)",
+                    (creature_id, metrics["name"],
+                     "\n".join([f"{name} {text}" for name, text in abilities] + attack_texts),
+                     "\n".join(str(creature_data[field]) for field in DESCRIPTION_FIELDS.get(system, ())
+                               if creature_data.get(field))))
+        except BaseException:
+            self.connection.execute("ROLLBACK")
+            raise
+        self.connection.execute("COMMIT")
+        return len(batch)
+
+    def search(self, system, text="", where=""):
+        """(source, créature) des fiches d'un système contenant `text` et satisfaisant `where`
+
+        Lève ValueError (QuerySyntaxError) pour une requête invalide.
+        """
+        sql = "SELECT c.source, c.data FROM creatures c WHERE c.system = ?"
+        params = [system]
+        match = fts_query(text)
+        if str(text).strip() and not match:
+            raise QuerySyntaxError(f"Aucun mot à chercher dans '{text}'")
+        if match:
+            sql += " AND c.id IN (SELECT rowid FROM creature_text WHERE creature_text MATCH ?)"
+            params.append(match)
+        clause = where_clause(where)
+        if clause is not None:
+            sql += f" AND {clause.sql}"
+            params += clause.params
+        rows = self.connection.execute(sql + " ORDER BY c.id", params).fetchall()
+        return [(source, json.loads(data)) for source, data in rows]
+
+    def count(self, system):
+        return self.connection.execute("SELECT count(*) FROM creatures WHERE system = ?", (system,)).fetchone()[0]
+
+    def export(self, system, directory):
+        """Écrit une fiche JSON par créature d'un système ; retourne les chemins écrits
+
+        Le nom de fichier reprend celui de la source importée, ou le nom de la
+        créature pour un enregistrement de fichier en masse.
+        """
+        directory = Path(directory)
+        directory.mkdir(parents=True, exist_ok=True)
+        paths = []
+        used = set()
+        for source, creature_data in self.search(system):
+            if "#" in source or Path(source).suffix.lower() != ".json":
+                stem = _FILE_NAME_RE.sub("_", str(creature_data.get("name", creature_data.get("title", "")))).strip()
+                stem = stem or "creature"
+            else:
+                stem = Path(source).stem
+            name, number = f"{stem}.json", 1
+            while name.lower() in used:
+                number += 1
+                name = f"{stem}_{number}.json"
+            used.add(name.lower())
+            path = directory / name
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(creature_data, f, ensure_ascii=False, indent=4)
+                f.write("\n")
+            paths.append(path)
+        return paths
@@ -0,0 +1,64 @@
+"""
+Registre des systèmes de jeu supportés
+
+Chaque entrée décrit le dossier de créatures par défaut, le nom du PDF
+produit, le champ servant de nom à la créature et les fonctions de rendu
+(document complet, page unique et compilation en carte, voir cards.py).
+"""
+
+from .creature_dnd import generate_dnd_pdf, generate_dnd_creature_page, compile_dnd_card
+from .creature_swn import generate_swn_pdf, generate_swn_creature_page, compile_swn_card
+from .creature_cofmini import generate_cofmini_pdf, generate_cofmini_creature_page, compile_cofmini_card
+from .creature_timothee import generate_timothee_pdf, generate_timothee_creature_page, compile_timothee_card
+
+SYSTEMS = {
+    "dnd": {
+        "name": "D&D",
+        "directory": "dnd_creatures",
+        "output": "DnD_Creatures.pdf",
+        "name_field": "name",
+        "generate_pdf": generate_dnd_pdf,
+        "generate_page": generate_dnd_creature_page,
+        "compile_card": compile_dnd_card,
+    },
+    "swn": {
+        "name": "SWN",
+        "directory": "swn_creatures",
+        "output": "SWN_Creatures.pdf",
+        "name_field": "title",
+        "generate_pdf": generate_swn_pdf,
+        "generate_page": generate_swn_creature_page,
+        "compile_card": compile_swn_card,
+    },
+    "cofmini": {
+        "name": "COF Mini",
+        "directory": "cofmini_creatures",
+        "output": "COFMini_Creatures.pdf",
+        "name_field": "name",
+        "generate_pdf": generate_cofmini_pdf,
+        "generate_page": generate_cofmini_creature_page,
+        "compile_card": compile_cofmini_card,
+    },
+    "timothee": {
+        "name": "JDR Timothée",
+        "directory": "timothee_creatures",
+        "output": "Timothee_Creatures.pdf",
+        "name_field": "name",
+        "generate_pdf": generate_timothee_pdf,
+        "generate_page": generate_timothee_creature_page,
+        "compile_card": compile_timothee_card,
+    },
+}
+
+
+def get_system(system):
+    """Retourne la description d'un système ou lève ValueError s'il est inconnu"""
+    try:
+        return SYSTEMS[system]
+    except KeyError:
+        raise ValueError(f"Système inconnu: {system} (disponibles: {', '.join(SYSTEMS)})") from None
+
+
+def creature_name(creature_data, system):
+    """Nom affichable d'une créature selon le champ de nom de son système"""
+    return str(creature_data.get(get_system(system)["name_field"], "Créature inconnue"))
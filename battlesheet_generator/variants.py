@@ -0,0 +1,250 @@
+"""
+Variantes de créatures : changement de niveau et escouades
+
+Plutôt que de recopier une fiche à la main pour un Troll de niveau 5 ou une
+escouade de 4 squelettes, le moteur de variantes calcule les fiches
+dérivées d'un bestiaire entier :
+
+- `level_variants` (COF Mini, JDR Timothée) : pour chaque niveau visé, les
+  points de vie, la défense et le bonus des dés de dégâts suivent des
+  `ScalingRules` (par niveau d'écart avec la fiche de base) ;
+- `squad_variants` (D&D) : pour chaque taille d'escouade, les points de vie
+  et les dégâts par unité de la fiche sont multipliés par le nombre
+  d'unités (« 80 (4 * (2d8 + 10)) » -> « 120 (6 * (2d8 + 10)) »).
+
+Les valeurs numériques sont calculées en une passe NumPy sur la grille
+créatures × niveaux (ou tailles) ; les expressions de dés distinctes ne
+sont compilées et reformatées qu'une fois. Une variante ne recopie que les
+champs modifiés : descriptions, capacités et autres textes restent les
+objets de la fiche de base, partagés par toutes ses variantes.
+"""
+
+import json
+import math
+import re
+from dataclasses import dataclass, asdict, fields
+
+from .dice import try_parse_dice, _format, _numpy, _PRECOMPUTED_RE
+
+# Systèmes acceptant chaque type de variante
+LEVEL_SYSTEMS = ("cofmini", "timothee")
+SQUAD_SYSTEMS = ("dnd",)
+
+# « 80 (4 * (2d8 + 4 + 6)) » : total, nombre d'unités, expression par unité
+_SQUAD_RE = re.compile(r"^\s*(\d+)\s*\(\s*(\d+)\s*\*\s*\((.*)\)\s*\)\s*$")
+_RANGE_RE = re.compile(r"^\s*(\d+)\s*-\s*(\d+)\s*$")
+
+
+@dataclass
+class ScalingRules:
+    """Évolution d'une fiche par niveau d'écart avec sa fiche de base"""
+
+    hit_points_per_level: float = 0.2  # fraction des PV de base
+    defense_per_level: float = 0.5
+    damage_per_level: float = 1.0  # bonus ajouté aux dés de dégâts
+    min_level: int = 1
+
+    @classmethod
+    def from_dict(cls, data):
+        """Règles par défaut surchargées par un dictionnaire (clés inconnues refusées)"""
+        known = {f.name: f.type for f in fields(cls)}
+        unknown = set(data) - set(known)
+        if unknown:
+            raise ValueError(f"Règle(s) inconnue(s): {', '.join(sorted(unknown))} (disponibles: {', '.join(sorted(known))})")
+        return cls(**{key: (int if known[key] in (int, "int") else float)(value) for key, value in data.items()})
+
+    def to_dict(self):
+        return asdict(self)
+
+
+def load_rules(path):
+    """Lit un fichier JSON de règles, par exemple {"hit_points_per_level": 0.25}"""
+    with open(path, "r", encoding="utf-8") as f:
+        return ScalingRules.from_dict(json.load(f))
+
+
+def parse_range(text):
+    """« 1-10 » ou « 2,4,6 » -> liste d'entiers positifs triés"""
+    values = set()
+    for part in str(text).split(","):
+        if not part.strip():
+            continue
+        match = _RANGE_RE.match(part)
+        if match:
+            low, high = int(match.group(1)), int(match.group(2))
+            values.update(range(min(low, high), max(low, high) + 1))
+        elif part.strip().isdigit():
+            values.add(int(part))
+        else:
+            raise ValueError(f"Intervalle invalide: '{part.strip()}' (attendu « 1-10 » ou « 2,4,6 »)")
+    if not values or min(values) < 1:
+        raise ValueError(f"Intervalle invalide: '{text}' (entiers positifs attendus)")
+    return sorted(values)
+
+
+def _number(value, default=math.nan):
+    if isinstance(value, bool):
+        return default
+    if isinstance(value, (int, float)):
+        return float(value)
+    match = re.match(r"^\s*([-+]?\d+)", str(value or ""))
+    return float(match.group(1)) if match else default
+
+
+def _add_constant(node, bonus):
+    """Ajoute `bonus` à la constante finale d'une expression (« 1d6+4 » + 2 -> « 1d6+6 »)"""
+    if not bonus:
+        return node
+    kind = node[0]
+    if kind == "const":
+        return ("const", node[1] + bonus)
+    if kind in ("add", "sub") and node[2][0] == "const":
+        constant = (node[2][1] if kind == "add" else -node[2][1]) + bonus
+        if constant == 0:
+            return node[1]
+        return ("add", node[1], ("const", constant)) if constant > 0 else ("sub", node[1], ("const", -constant))
+    return ("add", node, ("const", bonus)) if bonus > 0 else ("sub", node, ("const", -bonus))
+
+
+class _DamageFormatter:
+    """Textes de dégâts décalés d'un bonus, mémorisés par (texte, bonus)"""
+
+    def __init__(self):
+        self._texts = {}
+
+    def shifted(self, text, bonus):
+        key = (text, bonus)
+        result = self._texts.get(key)
+        if result is None:
+            dice = try_parse_dice(text) if bonus else None
+            if dice is None:
+                result = text
+            else:
+                result = _format(_add_constant(dice.node, bonus))
+                if dice.extra:
+                    result = f"{result} {dice.extra}"
+            self._texts[key] = result
+        return result
+
+
+def level_variants(creatures, system, levels, rules=None):
+    """Variantes de chaque créature aux niveaux `levels` ; retourne la liste créature par créature
+
+    Les créatures sans niveau ni points de vie exploitables sont ignorées.
+    """
+    if system not in LEVEL_SYSTEMS:
+        raise ValueError(f"Variantes de niveau non supportées pour {system} (systèmes: {', '.join(LEVEL_SYSTEMS)})")
+    rules = rules or ScalingRules()
+    np = _numpy()
+
+    bases = [creature for creature in creatures
+             if not math.isnan(_number(creature.get("niveau")))
+             and not math.isnan(_number((creature.get("defenses") or {}).get("points_de_vie")))]
+    if not bases:
+        return []
+    targets = np.array([level for level in levels if level >= rules.min_level], dtype=float)
+    base_level = np.array([_number(creature["niveau"]) for creature in bases])
+    hit_points = np.array([_number(creature["defenses"]["points_de_vie"]) for creature in bases])
+    defense = np.array([_number(creature["defenses"].get("defense"), 0.0) for creature in bases])
+
+    # Grille créatures × niveaux
+    delta = targets[None, :] - base_level[:, None]
+    scaled_hit_points = np.maximum(1, np.rint(hit_points[:, None] * (1 + rules.hit_points_per_level * delta)))
+    scaled_defense = defense[:, None] + np.rint(rules.defense_per_level * delta)
+    damage_bonus = np.rint(rules.damage_per_level * delta)
+
+    formatter = _DamageFormatter()
+    variants = []
+    for row, creature in enumerate(bases):
+        for column, level in enumerate(targets):
+            defenses = dict(creature["defenses"],
+                            points_de_vie=int(scaled_hit_points[row, column]))
+            if "defense" in creature["defenses"]:
+                defenses["defense"] = int(scaled_defense[row, column])
+            bonus = int(damage_bonus[row, column])
+            attaques = [dict(attaque, degats=formatter.shifted(attaque["degats"], bonus)) if "degats" in attaque
+                        else attaque for attaque in creature.get("attaques") or []]
+            variants.append(dict(creature, niveau=int(level), defenses=defenses, attaques=attaques))
+    return variants
+
+
+def _squad_parts(text, units):
+    """(valeur par unité, expression par unité ou None) d'un texte de PV ou de dégâts
+
+    « 80 (4 * (2d8 + 10)) » pour 4 unités -> (20, « 2d8 + 10 ») ; une fiche
+    individuelle « 1d6 + 3 » -> (6.5, « 1d6 + 3 »).
+    """
+    text = str(text).strip()
+    match = _SQUAD_RE.match(text)
+    if match and int(match.group(2)) == units:
+        return int(match.group(1)) / units, match.group(3).strip()
+    if units == 1:
+        match = _PRECOMPUTED_RE.match(text)
+        if match and try_parse_dice(match.group(2)) is not None:
+            return int(match.group(1)), match.group(2).strip()
+        dice = try_parse_dice(text)
+        if dice is not None and dice.has_dice:
+            return dice.average, text
+    return _number(text) / units, None
+
+
+def _squad_damage(text, units):
+    """Comme _squad_parts, la valeur de tête étant la moyenne de l'expression par unité"""
+    per_unit, inner = _squad_parts(text, units)
+    dice = try_parse_dice(inner) if inner is not None else None
+    return (dice.average if dice is not None else per_unit), inner
+
+
+def _squad_text(total, units, inner):
+    if inner is None:
+        return str(total)
+    if units == 1:
+        return f"{total} ({inner})"
+    return f"{total} ({units} * ({inner}))"
+
+
+def squad_variants(creatures, system, sizes):
+    """Variantes en escouades de `sizes` unités ; retourne la liste créature par créature"""
+    if system not in SQUAD_SYSTEMS:
+        raise ValueError(f"Escouades non supportées pour {system} (systèmes: {', '.join(SQUAD_SYSTEMS)})")
+    np = _numpy()
+    sizes = np.array(sizes, dtype=float)
+
+    bases = []
+    for creature in creatures:
+        units = max(1, int(_number(creature.get("units", creature.get("unite", 1)), 1)))
+        per_unit, inner = _squad_parts(creature.get("hit_points", ""), units)
+        if not math.isnan(per_unit):
+            bases.append((creature, units, per_unit, inner))
+    if not bases:
+        return []
+
+    # Grille créatures × tailles : PV totaux
+    per_unit = np.array([base[2] for base in bases])
+    totals = np.maximum(1, np.rint(per_unit[:, None] * sizes[None, :]))
+
+    damage_texts = {}
+    variants = []
+    for row, (creature, units, _, inner) in enumerate(bases):
+        actions = creature.get("actions") or []
+        damages = [_squad_damage(action["damage"], units) if action.get("damage") else None
+                   for action in actions]
+        for column, size in enumerate(sizes):
+            size = int(size)
+            scaled_actions = []
+            for action, damage in zip(actions, damages):
+                if damage is None or damage[1] is None:
+                    scaled_actions.append(action)
+                    continue
+                key = (damage, size)
+                text = damage_texts.get(key)
+                if text is None:
+                    text = _squad_text(int(math.floor(damage[0] * size)), size, damage[1])
+                    damage_texts[key] = text
+                scaled_actions.append(dict(action, damage=text))
+            variant = dict(creature, hit_points=_squad_text(int(totals[row, column]), size, inner),
+                           actions=scaled_actions)
+            variant.pop("unite", None)
+            variant["units"] = size
+            variants.append(variant)
+    return variants
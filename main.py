@@ -5,101 +5,624 @@ Main script pour générer des fiches de créatures pour différents systèmes d
 
 import sys
 import os
+import contextlib
 import json
+import subprocess
+import time
+from dataclasses import replace
 from pathlib import Path
 from battlesheet_generator import load_creature, generate_dnd_pdf, generate_swn_pdf, generate_cofmini_pdf, generate_timothee_pdf
+from battlesheet_generator.systems import SYSTEMS, get_system
+from battlesheet_generator.preview import generate_preview
+from battlesheet_generator.pipeline import discover_creature_files, iter_creatures, load_creatures
+from battlesheet_generator.bulk import STDIN
+from battlesheet_generator.events import ConsoleReporter, ProgressReporter, JsonLinesReporter, MultiReporter
+from battlesheet_generator.analytics import bestiary_table, write_csv, write_columnar
+from battlesheet_generator.query import Bestiary
+from battlesheet_generator.encounter import build_encounter, DIFFICULTIES
+from battlesheet_generator.manifest import load_manifest, build_manifest
+from battlesheet_generator.guards import creature_limits, load_guarded_creature, load_limits, DEFAULT_TIME_BUDGET
+from battlesheet_generator.distributed import JobQueue, run_worker, coordinate, DistributedBuildError, DEFAULT_SHARD_SIZE
+from battlesheet_generator.simulation import combat_profile, party_combatants, simulate_encounter, format_simulation_report
+from battlesheet_generator.store import BestiaryStore
+from battlesheet_generator.variants import level_variants, squad_variants, load_rules, parse_range
+from battlesheet_generator.costmodel import calibrate, save_cost_model
+from battlesheet_generator.inheritance import resolve_loaded_creature
+from battlesheet_generator.combined import generate_combined_pdf, COMBINED_OUTPUT
 
-def generate_dnd_creatures(creatures_dir="dnd_creatures", output_dir="output"):
+DEFAULT_FIT_MIN_SIZE = 5.0  # Taille minimale du corps de texte en mode ajustement (pt)
+DEFAULT_TRIALS = 10000      # Nombre de rencontres simulées
+DEFAULT_MAX_ROUNDS = 50     # Limite de rounds d'une rencontre simulée
+DEFAULT_MAX_CREATURES = 6   # Nombre maximal de créatures d'une rencontre composée
+STDOUT = "-"                # Répertoire de sortie désignant la sortie standard
+DEFAULT_WORKER_IDLE = 10.0  # Secondes sans tâche avant l'arrêt d'un worker
+
+def output_target(output_dir, output_filename):
+    """Destination d'un PDF : sortie standard binaire pour '-', sinon chemin (dossier créé)"""
+    if str(output_dir) == STDOUT:
+        # Sortie standard réelle, même quand les messages sont redirigés vers stderr
+        return sys.__stdout__.buffer
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    return str(output_dir / output_filename)
+
+def generate_dnd_creatures(creatures_dir="dnd_creatures", output_dir="output", reporter=None, fit=None, options=None):
     """Génère les fiches pour les créatures D&D"""
-    return generate_creatures(creatures_dir, output_dir, generate_dnd_pdf, "DnD_Creatures.pdf", "D&D")
+    return generate_creatures(creatures_dir, output_dir, generate_dnd_pdf, "DnD_Creatures.pdf", "D&D", reporter, fit, options)
 
-def generate_swn_creatures(creatures_dir="swn_creatures", output_dir="output"):
+def generate_swn_creatures(creatures_dir="swn_creatures", output_dir="output", reporter=None, fit=None, options=None):
     """Génère les fiches pour les créatures SWN"""
-    return generate_creatures(creatures_dir, output_dir, generate_swn_pdf, "SWN_Creatures.pdf", "SWN")
+    return generate_creatures(creatures_dir, output_dir, generate_swn_pdf, "SWN_Creatures.pdf", "SWN", reporter, fit, options)
 
-def generate_cofmini_creatures(creatures_dir="cofmini_creatures", output_dir="output"):
+def generate_cofmini_creatures(creatures_dir="cofmini_creatures", output_dir="output", reporter=None, fit=None, options=None):
     """Génère les fiches pour les créatures COF Mini"""
-    return generate_creatures(creatures_dir, output_dir, generate_cofmini_pdf, "COFMini_Creatures.pdf", "COF Mini")
+    return generate_creatures(creatures_dir, output_dir, generate_cofmini_pdf, "COFMini_Creatures.pdf", "COF Mini", reporter, fit, options)
 
 
-def generate_timothee_creatures(creatures_dir="timothee_creatures", output_dir="output"):
+def generate_timothee_creatures(creatures_dir="timothee_creatures", output_dir="output", reporter=None, fit=None, options=None):
     """Génère les fiches pour le système JDR Timothée"""
-    return generate_creatures(creatures_dir, output_dir, generate_timothee_pdf, "Timothee_Creatures.pdf", "JDR Timothée")
+    return generate_creatures(creatures_dir, output_dir, generate_timothee_pdf, "Timothee_Creatures.pdf", "JDR Timothée", reporter, fit, options)
 
-def generate_creatures(creatures_dir, output_dir, generator_func, output_filename, system_name):
-    """Fonction générique pour générer les fiches de créatures"""
-    creatures_dir = Path(creatures_dir)
-    output_dir = Path(output_dir)
-    
-    # Vérifier que le répertoire de créatures existe
-    if not creatures_dir.exists():
-        print(f"❌ Erreur: Le répertoire '{creatures_dir}' n'existe pas.")
+def generate_preview_creatures(system, output_dir="output", reporter=None, fit=None, options=None):
+    """Génère un aperçu HTML des fiches d'un système, sans passer par le PDF"""
+    info = get_system(system)
+    page_func = info["generate_page"]
+    title = f"Aperçu {info['name']}"
+    output_filename = info["output"].replace("_Creatures.pdf", "_Preview.html")
+
+    def generator_func(creatures, output, on_event=None, fit=None, options=None):
+        return generate_preview(creatures, output, page_func, title, on_event, fit, options)
+
+    return generate_creatures(info["directory"], output_dir, generator_func, output_filename, info["name"], reporter, fit, options)
+
+def generate_combined_creatures(output_dir="output", reporter=None, fit=None, options=None):
+    """Génère un seul PDF pour tous les systèmes (polices intégrées une fois, un signet par système)"""
+    reporter = reporter or ConsoleReporter()
+    books = []
+    for system, info in SYSTEMS.items():
+        creatures_dir = Path(info["directory"])
+        if not creatures_dir.is_dir():
+            continue
+        json_files = discover_creature_files(creatures_dir, info["name"], reporter)
+        creatures, failed_count = load_creatures(json_files, info["name"], reporter,
+                                                 limits=creature_limits(options))
+        reporter.message(f"🔍 {info['name']}: {len(creatures)} créature(s) chargée(s), {failed_count} échec(s)")
+        books.append((system, creatures))
+
+    total = sum(len(creatures) for _, creatures in books)
+    if not total:
+        reporter.message("❌ Aucune créature n'a pu être chargée.")
         return False
-    
-    if not creatures_dir.is_dir():
-        print(f"❌ Erreur: '{creatures_dir}' n'est pas un répertoire.")
+
+    reporter.message(f"📄 Génération du PDF combiné avec {total} créature(s)...")
+    try:
+        generate_combined_pdf(books, output_target(output_dir, COMBINED_OUTPUT), on_event=reporter, fit=fit,
+                              options=options)
+    except Exception as e:
+        reporter.message(f"❌ Erreur lors de la génération du PDF combiné: {e}")
         return False
+    reporter.message(f"🎉 PDF combiné généré dans: {output_dir}")
+    return True
+
+def generate_creatures(creatures_dir, output_dir, generator_func, output_filename, system_name, reporter=None, fit=None,
+                       options=None):
+    """Fonction générique pour générer les fiches de créatures
+
+    Les étapes émettent leurs événements vers `reporter` (console par défaut).
+    `fit` active l'ajustement du texte à une carte avec cette taille minimale (pt)
+    et `options` contient les options de rendu des cartes (voir create_pdf_base).
+    Avec `output_dir` égal à '-', le document est écrit sur la sortie standard.
+    `creatures_dir` peut aussi être un fichier (tableau JSON, JSON Lines) ou
+    '-' pour lire les créatures sur l'entrée standard.
+    """
+    reporter = reporter or ConsoleReporter()
+    creatures_dir = creatures_dir if creatures_dir == STDIN else Path(creatures_dir)
+    output_dir = Path(output_dir)
     
-    # Créer le répertoire de sortie s'il n'existe pas
-    output_dir.mkdir(parents=True, exist_ok=True)
+    # Vérifier que le répertoire (ou le fichier) de créatures existe
+    if creatures_dir != STDIN and not creatures_dir.exists():
+        reporter.message(f"❌ Erreur: Le répertoire '{creatures_dir}' n'existe pas.")
+        return False
     
-    # Trouver tous les fichiers JSON dans le répertoire
-    json_files = list(creatures_dir.glob("*.json"))
+    # Trouver tous les fichiers JSON dans le répertoire (un fichier ou '-' est pris tel quel)
+    json_files = discover_creature_files(creatures_dir, system_name, reporter)
     
     if not json_files:
-        print(f"❌ Aucun fichier JSON trouvé dans '{creatures_dir}'.")
+        reporter.message(f"❌ Aucun fichier JSON trouvé dans '{creatures_dir}'.")
         return False
     
-    print(f"🔍 Trouvé {len(json_files)} fichier(s) JSON {system_name} à traiter...")
+    reporter.message(f"🔍 Trouvé {len(json_files)} fichier(s) JSON {system_name} à traiter...")
     
-    successful_count = 0
-    failed_count = 0
-    creatures_data = []  # Liste pour stocker toutes les créatures
-    
-    # Charger toutes les créatures
-    for json_file in json_files:
-        try:
-            print(f"📖 Chargement de {json_file.name}...")
-            
-            # Charger les données de la créature
-            creature_data = load_creature(json_file)
-            creatures_data.append(creature_data)
-            successful_count += 1
-            
-        except json.JSONDecodeError as e:
-            print(f"❌ Erreur JSON dans '{json_file.name}': Le fichier n'est pas un JSON valide")
-            print(f"   Détail: {e}")
-            failed_count += 1
-        except KeyError as e:
-            print(f"❌ Erreur dans '{json_file.name}': Clé manquante dans les données: {e}")
-            failed_count += 1
-        except Exception as e:
-            print(f"❌ Erreur inattendue avec '{json_file.name}': {e}")
-            failed_count += 1
+    # Charger toutes les créatures (avec limites pour les fiches non fiables)
+    creatures_data, failed_count = load_creatures(json_files, system_name, reporter,
+                                                  limits=creature_limits(options))
+    successful_count = len(creatures_data)
     
     # Générer le PDF consolidé si on a des créatures
     if creatures_data:
-        print(f"📄 Génération du PDF {system_name} avec {len(creatures_data)} créature(s)...")
+        reporter.message(f"📄 Génération du PDF {system_name} avec {len(creatures_data)} créature(s)...")
         try:
-            output_file = output_dir / output_filename
-            generator_func(creatures_data, str(output_file))
-            print(f"🎉 Traitement {system_name} terminé!")
-            print(f"   ✅ Créatures chargées: {successful_count}")
-            print(f"   ❌ Échecs: {failed_count} fichier(s)")
-            print(f"   📁 PDF généré dans: {output_dir}")
+            output_file = output_target(output_dir, output_filename)
+            generator_func(creatures_data, output_file, on_event=reporter, fit=fit, options=options)
+            reporter.message(f"🎉 Traitement {system_name} terminé!")
+            reporter.message(f"   ✅ Créatures chargées: {successful_count}")
+            reporter.message(f"   ❌ Échecs: {failed_count} fichier(s)")
+            reporter.message(f"   📁 Fichier généré dans: {output_dir}")
             return True
         except Exception as e:
-            print(f"❌ Erreur lors de la génération du PDF {system_name}: {e}")
+            reporter.message(f"❌ Erreur lors de la génération du PDF {system_name}: {e}")
             return False
     else:
-        print(f"❌ Aucune créature {system_name} n'a pu être chargée.")
+        reporter.message(f"❌ Aucune créature {system_name} n'a pu être chargée.")
         return False
 
+def simulate_creatures(system, party_file, selections, trials=DEFAULT_TRIALS, seed=None,
+                       max_rounds=DEFAULT_MAX_ROUNDS, reporter=None, options=None, source=None):
+    """Simule des rencontres entre un groupe (fichier JSON) et des créatures d'un système
+
+    `selections` contient des noms de fichiers sans extension, éventuellement
+    suivis du nombre d'exemplaires (« Kobold:3 ») ; vide, toutes les créatures
+    du système participent. Les limites des fiches non fiables (`options`)
+    s'appliquent au chargement. `source` (--input) remplace le dossier du
+    système ; un fichier en masse ou '-' fournit toutes ses créatures.
+    """
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    try:
+        with open(party_file, 'r', encoding='utf-8') as f:
+            party = party_combatants(json.load(f))
+    except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+        reporter.message(f"❌ Groupe invalide '{party_file}': {e}")
+        return None
+
+    source = source or info["directory"]
+    limits = creature_limits(options)
+    loaded = []  # (fichier, fiche, nombre d'exemplaires)
+    if source == STDIN or Path(source).is_file():
+        if selections:
+            reporter.message("❌ Les sélections de créatures désignent des fichiers d'un dossier, pas d'un fichier en masse.")
+            return None
+        json_files = discover_creature_files(source, info["name"])
+        sources = []
+        creatures, _ = load_creatures(json_files, info["name"], reporter, sources, limits)
+        loaded = [(path, creature_data, 1) for path, creature_data in zip(sources, creatures)]
+    else:
+        creatures_dir = Path(source)
+        if selections:
+            wanted = []
+            for selection in selections:
+                stem, _, count = selection.partition(":")
+                wanted.append((creatures_dir / f"{stem}.json", int(count or 1)))
+        else:
+            wanted = [(path, 1) for path in discover_creature_files(creatures_dir, info["name"])]
+        for path, count in wanted:
+            try:
+                creature_data = load_creature(path) if limits is None else load_guarded_creature(path, limits)
+                loaded.append((path, resolve_loaded_creature(path, creature_data, limits), count))
+            except (OSError, json.JSONDecodeError, ValueError) as e:
+                reporter.message(f"❌ Créature ignorée '{path}': {e}")
+
+    monsters = []
+    for path, creature_data, count in loaded:
+        try:
+            profile = combat_profile(creature_data, system)
+        except ValueError as e:
+            reporter.message(f"❌ Créature ignorée '{path}': {e}")
+            continue
+        for copy in range(count):
+            for combatant in profile:
+                suffix = f" ({copy + 1})" if count > 1 else ""
+                monsters.append(replace(combatant, name=combatant.name + suffix))
+
+    if not party or not monsters:
+        reporter.message("❌ Il faut au moins un personnage et une créature pour simuler une rencontre.")
+        return None
+
+    reporter.message(f"⚔️  {len(party)} personnage(s) contre {len(monsters)} créature(s) {info['name']}")
+    result = simulate_encounter(party, monsters, trials, max_rounds, seed)
+    reporter.message(format_simulation_report(result))
+    return result
+
+def analyze_creatures(system, output_dir="output", creatures_dir=None, reporter=None, options=None):
+    """Écrit la table d'analyse d'un dossier de créatures en CSV et en binaire colonnaire (.npz)"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    creatures_dir = creatures_dir or info["directory"]
+    if creatures_dir != STDIN and not Path(creatures_dir).exists():
+        reporter.message(f"❌ Erreur: Le répertoire '{creatures_dir}' n'existe pas.")
+        return None
+
+    json_files = discover_creature_files(creatures_dir, info["name"], reporter)
+    creatures, failed_count = load_creatures(json_files, info["name"], reporter, limits=creature_limits(options))
+    if not creatures:
+        reporter.message(f"❌ Aucune créature {info['name']} n'a pu être chargée.")
+        return None
+
+    table = bestiary_table(creatures, system)
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    stem = info["output"].replace("_Creatures.pdf", "_Analyse")
+    csv_path = write_csv(table, output_dir / f"{stem}.csv")
+    npz_path = write_columnar(table, output_dir / f"{stem}.npz")
+    reporter.message(f"📊 {len(creatures)} créature(s) {info['name']} analysée(s), {failed_count} échec(s)")
+    reporter.message(f"   📁 {csv_path}")
+    reporter.message(f"   📁 {npz_path}")
+    return table
+
+def query_creatures(system, query, output_dir="output", reporter=None, fit=None, options=None):
+    """Génère le PDF des créatures d'un système qui satisfont une requête"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    json_files = discover_creature_files(info["directory"], info["name"], reporter)
+    creatures, _ = load_creatures(json_files, info["name"], reporter, limits=creature_limits(options))
+    try:
+        selection = Bestiary(creatures, system).select(query)
+    except ValueError as e:
+        reporter.message(f"❌ Requête invalide: {e}")
+        return None
+
+    reporter.message(f"🔎 {len(selection)} créature(s) {info['name']} pour « {query} »")
+    for creature_data in selection:
+        reporter.message(f"   - {creature_data.get(info['name_field'], 'Créature inconnue')}")
+    if not selection:
+        return selection
+
+    output_file = output_target(output_dir, info["output"].replace("_Creatures.pdf", "_Selection.pdf"))
+    info["generate_pdf"](selection, output_file, on_event=reporter, fit=fit, options=options)
+    return selection
+
+def import_creatures(system, store_path, creatures_dir=None, reporter=None, options=None):
+    """Importe (ou met à jour) les créatures d'un système dans un bestiaire SQLite"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    creatures_dir = creatures_dir or info["directory"]
+    if creatures_dir != STDIN and not Path(creatures_dir).exists():
+        reporter.message(f"❌ Erreur: Le répertoire '{creatures_dir}' n'existe pas.")
+        return None
+
+    json_files = discover_creature_files(creatures_dir, info["name"], reporter)
+    failures = []
+    # Lecture au fil de l'eau : un export volumineux n'est jamais entièrement en mémoire
+    loaded = iter_creatures(json_files, info["name"], reporter, creature_limits(options), failures)
+    store = BestiaryStore(store_path)
+    try:
+        imported = store.import_creatures(system, ((creature_data, source) for source, creature_data in loaded))
+        total = store.count(system)
+    finally:
+        store.close()
+    reporter.message(f"🗄️  {imported} créature(s) {info['name']} importée(s), {len(failures)} échec(s)"
+                     f" ({total} dans {store_path})")
+    return imported
+
+def export_creatures(system, store_path, output_dir="output", reporter=None):
+    """Écrit une fiche JSON par créature d'un système du bestiaire SQLite"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    if not Path(store_path).exists():
+        reporter.message(f"❌ Erreur: Le bestiaire '{store_path}' n'existe pas.")
+        return None
+    store = BestiaryStore(store_path)
+    try:
+        paths = store.export(system, output_dir)
+    finally:
+        store.close()
+    reporter.message(f"📤 {len(paths)} créature(s) {info['name']} exportée(s) dans {output_dir}")
+    return paths
+
+def search_creatures(system, store_path, text, output_dir="output", where="", reporter=None, fit=None, options=None):
+    """Génère le PDF des créatures du bestiaire SQLite trouvées par texte et requête"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    if not Path(store_path).exists():
+        reporter.message(f"❌ Erreur: Le bestiaire '{store_path}' n'existe pas.")
+        return None
+    store = BestiaryStore(store_path)
+    try:
+        start = time.perf_counter()
+        results = store.search(system, text, where)
+        elapsed = time.perf_counter() - start
+    except ValueError as e:
+        reporter.message(f"❌ Recherche invalide: {e}")
+        return None
+    finally:
+        store.close()
+
+    label = " et ".join(part for part in (f"« {text} »" if text else "", f"« {where} »" if where else "") if part)
+    reporter.message(f"🔎 {len(results)} créature(s) {info['name']} pour {label or 'tout le bestiaire'}"
+                     f" ({elapsed * 1000:.1f} ms)")
+    selection = []
+    for source, creature_data in results:
+        reporter.message(f"   - {creature_data.get(info['name_field'], 'Créature inconnue')} ({source})")
+        selection.append(creature_data)
+    if not selection:
+        return selection
+
+    output_file = output_target(output_dir, info["output"].replace("_Creatures.pdf", "_Recherche.pdf"))
+    info["generate_pdf"](selection, output_file, on_event=reporter, fit=fit, options=options)
+    return selection
+
+def variant_creatures(system, output_dir="output", levels=None, units=None, rules_file=None, where="",
+                      reporter=None, fit=None, options=None, source=None):
+    """Génère le PDF des variantes de niveau (COF Mini, Timothée) ou d'escouade (D&D) d'un bestiaire"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    try:
+        rules = load_rules(rules_file) if rules_file else None
+        levels = parse_range(levels) if levels else None
+        units = parse_range(units) if units else None
+    except (OSError, json.JSONDecodeError, ValueError) as e:
+        reporter.message(f"❌ Variantes invalides: {e}")
+        return None
+    if (levels is None) == (units is None):
+        reporter.message("❌ Indiquez soit --levels (COF Mini, Timothée), soit --units (D&D).")
+        return None
+
+    json_files = discover_creature_files(source or info["directory"], info["name"], reporter)
+    creatures, _ = load_creatures(json_files, info["name"], reporter, limits=creature_limits(options))
+    try:
+        if where:
+            creatures = Bestiary(creatures, system).select(where)
+        if levels is not None:
+            variants = level_variants(creatures, system, levels, rules)
+        else:
+            variants = squad_variants(creatures, system, units)
+    except ValueError as e:
+        reporter.message(f"❌ {e}")
+        return None
+
+    reporter.message(f"🧬 {len(variants)} variante(s) de {len(creatures)} créature(s) {info['name']}")
+    if not variants:
+        return variants
+
+    output_file = output_target(output_dir, info["output"].replace("_Creatures.pdf", "_Variantes.pdf"))
+    info["generate_pdf"](variants, output_file, on_event=reporter, fit=fit, options=options)
+    return variants
+
+def encounter_creatures(system, party_file, difficulty="moyenne", output_dir="output", where="",
+                        max_creatures=DEFAULT_MAX_CREATURES, seed=None, trials=DEFAULT_TRIALS,
+                        reporter=None, fit=None, options=None):
+    """Compose une rencontre équilibrée pour un groupe et génère le livret de ses créatures"""
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    try:
+        with open(party_file, 'r', encoding='utf-8') as f:
+            party = party_combatants(json.load(f))
+    except (OSError, json.JSONDecodeError, KeyError, ValueError) as e:
+        reporter.message(f"❌ Groupe invalide '{party_file}': {e}")
+        return None
+
+    json_files = discover_creature_files(info["directory"], info["name"], reporter)
+    creatures, _ = load_creatures(json_files, info["name"], reporter, limits=creature_limits(options))
+    try:
+        encounter = build_encounter(Bestiary(creatures, system), party, difficulty, where, max_creatures, seed=seed)
+    except ValueError as e:
+        reporter.message(f"❌ {e}")
+        return None
+
+    if not encounter["creatures"]:
+        reporter.message(f"❌ Aucune combinaison de créatures {info['name']} ne correspond au budget.")
+        return encounter
+
+    reporter.message(f"⚖️  Rencontre {difficulty} : force {encounter['strength']:.1f}"
+                     f" pour un budget de {encounter['budget']:.1f} (groupe {encounter['party_strength']:.1f})")
+    monsters = []
+    for creature_data, count in encounter["creatures"]:
+        reporter.message(f"   - {creature_data.get(info['name_field'], 'Créature inconnue')} × {count}")
+        monsters += combat_profile(creature_data, system) * count
+    if trials:
+        result = simulate_encounter(party, monsters, trials, DEFAULT_MAX_ROUNDS, seed)
+        reporter.message(f"   🎲 Victoire du groupe simulée : {result['party_win_rate'] * 100:.0f} %")
+
+    output_file = output_target(output_dir, info["output"].replace("_Creatures.pdf", "_Rencontre.pdf"))
+    info["generate_pdf"]([creature_data for creature_data, _ in encounter["creatures"]], output_file,
+                         on_event=reporter, fit=fit, options=options)
+    return encounter
+
+def build_from_manifest(manifest_path, jobs=None, reporter=None):
+    """Construit tous les livrets d'un manifeste en une seule invocation"""
+    reporter = reporter or ConsoleReporter()
+    try:
+        manifest = load_manifest(manifest_path)
+    except ValueError as e:
+        reporter.message(f"❌ {e}")
+        return None
+
+    start = time.perf_counter()
+    reporter.message(f"📚 {len(manifest['booklets'])} livret(s) à construire depuis '{manifest_path}'...")
+    try:
+        outputs = build_manifest(manifest, jobs, reporter)
+    except ValueError as e:
+        reporter.message(f"❌ {e}")
+        return None
+    reporter.message(f"🎉 {len(outputs)}/{len(manifest['booklets'])} livret(s) générés en {time.perf_counter() - start:.2f}s")
+    return outputs
+
+def calibrate_cost_model(systems, creatures_dir=None, reporter=None):
+    """Mesure le rendu des créatures des systèmes et enregistre le modèle de coût calibré"""
+    reporter = reporter or ConsoleReporter()
+    samples = {}
+    for system in systems:
+        info = get_system(system)
+        json_files = discover_creature_files(creatures_dir or info["directory"], info["name"], reporter)
+        samples[system], _ = load_creatures(json_files, info["name"], reporter)
+    if not any(samples.values()):
+        reporter.message("❌ Aucune créature à mesurer.")
+        return None
+
+    reporter.message(f"⏱️  Mesure du rendu de {sum(len(creatures) for creatures in samples.values())} créature(s)...")
+    model, errors = calibrate(samples)
+    path = save_cost_model(model)
+    for system, error in errors.items():
+        weights = ", ".join(f"{name} {value:.4g}" for name, value in model.weights[system].items())
+        reporter.message(f"   {get_system(system)['name']} : {weights} ms (erreur moyenne {error:.0%})")
+    reporter.message(f"💾 Modèle de coût enregistré dans {path}")
+    return model
+
+def distribute_creatures(system, queue_path, output_dir="output", shard_size=DEFAULT_SHARD_SIZE, workers=0,
+                         reporter=None, fit=None, options=None):
+    """Soumet le livret d'un système à une file de tâches puis assemble les tranches rendues
+
+    Les tranches sont rendues par des commandes `worker` lancées sur une ou
+    plusieurs machines partageant `queue_path` ; `workers` en démarre autant
+    localement.
+    """
+    reporter = reporter or ConsoleReporter()
+    info = get_system(system)
+    json_files = discover_creature_files(info["directory"], info["name"], reporter)
+    creatures, _ = load_creatures(json_files, info["name"], reporter, limits=creature_limits(options))
+    if not creatures:
+        reporter.message(f"❌ Aucune créature {info['name']} n'a pu être chargée.")
+        return None
+
+    output_file = output_target(output_dir, info["output"])
+    queue = JobQueue(queue_path)
+    try:
+        build_id = queue.submit(system, output_file if isinstance(output_file, str) else STDOUT,
+                                creatures, shard_size, fit, options)
+        shards = queue.build(build_id)["shards"]
+    finally:
+        queue.close()
+    reporter.message(f"🧩 Construction {build_id} : {len(creatures)} créature(s) {info['name']}"
+                     f" en {shards} tâche(s) dans '{queue_path}'")
+
+    processes = [subprocess.Popen([sys.executable, os.path.abspath(__file__), "worker", str(queue_path),
+                                   "--idle", "2", "--quiet"]) for _ in range(workers)]
+    try:
+        return coordinate(queue_path, build_id, output_file, on_event=reporter)
+    except DistributedBuildError as e:
+        reporter.message(f"❌ {e}")
+        return None
+    finally:
+        for process in processes:
+            process.wait()
+
+def work_queue(queue_path, idle=DEFAULT_WORKER_IDLE, reporter=None):
+    """Rend les tâches d'une file jusqu'à `idle` secondes sans tâche (0 : attend indéfiniment)"""
+    reporter = reporter or ConsoleReporter()
+    reporter.message(f"🛠️  Worker en attente de tâches dans '{queue_path}'...")
+    rendered = run_worker(queue_path, idle_timeout=idle or None, on_event=reporter)
+    reporter.message(f"🏁 {rendered} tâche(s) rendue(s)")
+    return rendered
+
+def parse_cli_options(args):
+    """Sépare les options (--quiet, --progress, --report FICHIER, --deterministic, --fit) des autres arguments"""
+    options = {"quiet": False, "progress": False, "report": None, "deterministic": False, "fit": None,
+               "card_options": {}, "input": None, "combined": False, "where": "", "jobs": None,
+               "levels": None, "units": None, "rules": None,
+               "shard_size": DEFAULT_SHARD_SIZE, "workers": 0, "idle": DEFAULT_WORKER_IDLE,
+               "max_creatures": DEFAULT_MAX_CREATURES, "trials": DEFAULT_TRIALS, "seed": None, "max_rounds": DEFAULT_MAX_ROUNDS}
+    positional = []
+    i = 0
+    while i < len(args):
+        arg = args[i]
+        if arg in ("--quiet", "-q"):
+            options["quiet"] = True
+        elif arg == "--progress":
+            options["progress"] = True
+        elif arg == "--deterministic":
+            options["deterministic"] = True
+        elif arg == "--dice-average":
+            options["card_options"]["dice_average"] = True
+        elif arg == "--hyphenate":
+            options["card_options"]["hyphenate"] = True
+        elif arg == "--size-report":
+            options["card_options"]["size_report"] = True
+        elif arg == "--toc":
+            options["card_options"]["toc"] = True
+        elif arg == "--draft":
+            options["card_options"]["draft"] = True
+        elif arg == "--combined":
+            options["combined"] = True
+        elif arg == "--untrusted":
+            options["card_options"].setdefault("limits", {})
+        elif arg == "--isolate":
+            options["card_options"]["isolate"] = True
+            options["card_options"].setdefault("limits", {})
+        elif arg == "--limits" and i + 1 < len(args):
+            options["card_options"]["limits"] = load_limits(args[i + 1]).to_dict()
+            i += 1
+        elif arg == "--time-budget" and i + 1 < len(args):
+            options["card_options"]["time_budget"] = float(args[i + 1])
+            options["card_options"].setdefault("limits", {})
+            i += 1
+        elif arg == "--fit":
+            options["fit"] = options["fit"] or DEFAULT_FIT_MIN_SIZE
+        elif arg == "--fit-min" and i + 1 < len(args):
+            options["fit"] = float(args[i + 1])
+            i += 1
+        elif arg == "--input" and i + 1 < len(args):
+            options["input"] = args[i + 1]
+            i += 1
+        elif arg == "--shard-size" and i + 1 < len(args):
+            options["shard_size"] = int(args[i + 1])
+            i += 1
+        elif arg == "--workers" and i + 1 < len(args):
+            options["workers"] = int(args[i + 1])
+            i += 1
+        elif arg == "--idle" and i + 1 < len(args):
+            options["idle"] = float(args[i + 1])
+            i += 1
+        elif arg == "--jobs" and i + 1 < len(args):
+            options["jobs"] = int(args[i + 1])
+            i += 1
+        elif arg == "--where" and i + 1 < len(args):
+            options["where"] = args[i + 1]
+            i += 1
+        elif arg == "--levels" and i + 1 < len(args):
+            options["levels"] = args[i + 1]
+            i += 1
+        elif arg == "--units" and i + 1 < len(args):
+            options["units"] = args[i + 1]
+            i += 1
+        elif arg == "--rules" and i + 1 < len(args):
+            options["rules"] = args[i + 1]
+            i += 1
+        elif arg == "--max-creatures" and i + 1 < len(args):
+            options["max_creatures"] = int(args[i + 1])
+            i += 1
+        elif arg == "--trials" and i + 1 < len(args):
+            options["trials"] = int(args[i + 1])
+            i += 1
+        elif arg == "--seed" and i + 1 < len(args):
+            options["seed"] = int(args[i + 1])
+            i += 1
+        elif arg == "--rounds" and i + 1 < len(args):
+            options["max_rounds"] = int(args[i + 1])
+            i += 1
+        elif arg == "--report" and i + 1 < len(args):
+            options["report"] = args[i + 1]
+            i += 1
+        elif arg.startswith("--report="):
+            options["report"] = arg.split("=", 1)[1]
+        else:
+            positional.append(arg)
+        i += 1
+    return positional, options
+
+def build_reporter(options, stream=None):
+    """Construit le rapporteur correspondant aux options de la ligne de commande
+
+    `stream` remplace la sortie standard des messages (stderr quand le PDF
+    ou le rapport JSON lines sont écrits sur la sortie standard).
+    """
+    reporters = []
+    if options["progress"]:
+        reporters.append(ProgressReporter())
+    elif not options["quiet"]:
+        reporters.append(ConsoleReporter(stream))
+    if options["report"]:
+        reporters.append(JsonLinesReporter(options["report"]))
+    if len(reporters) == 1:
+        return reporters[0]
+    return MultiReporter(reporters)
+
 def main():
     """Fonction principale pour gérer les différents systèmes de jeu"""
     
+    args, options = parse_cli_options(sys.argv[1:])
+
     # Vérifier les arguments
-    if len(sys.argv) < 2:
+    if not args:
         print("Usage: python main.py <commande> [options]")
         print("Commandes disponibles:")
         print("  dnd [repertoire_sortie]      - Génère les fiches D&D (dossier: dnd_creatures)")
@@ -107,47 +630,224 @@ def main():
         print("  cofmini [repertoire_sortie]  - Génère les fiches COF Mini (dossier: cofmini_creatures)")
         print("  timothee [repertoire_sortie] - Génère les fiches JDR Timothée (dossier: timothee_creatures)")
         print("  all [repertoire_sortie]      - Génère tous les systèmes")
+        print("  preview <système> [sortie]   - Aperçu HTML/SVG rapide des fiches d'un système")
+        print("  build <manifeste.json>       - Construit tous les livrets d'un manifeste en une seule fois")
+        print("  analyze <système> [sortie]   - Table d'analyse du bestiaire (CSV et .npz colonnaire)")
+        print("  distribute <système> <file.db> [sortie]")
+        print("                               - Répartit le rendu en tâches d'une file SQLite puis assemble le PDF")
+        print("  calibrate [système]          - Mesure le coût de rendu des fiches (répartition de build et distribute)")
+        print("  worker <file.db>             - Rend les tâches d'une file (plusieurs workers possibles, sur plusieurs machines)")
+        print("  query <système> <requête> [sortie]")
+        print("                               - PDF des créatures satisfaisant une requête (niveau between 2 and 4 ...)")
+        print("  encounter <système> <groupe.json> [difficulté] [sortie]")
+        print(f"                               - Compose une rencontre équilibrée ({'/'.join(DIFFICULTIES)})")
+        print("  import <système> <base.db>   - Importe le dossier (ou --input) d'un système dans un bestiaire SQLite")
+        print("  export <système> <base.db> [sortie]")
+        print("                               - Réécrit une fiche JSON par créature du bestiaire SQLite")
+        print("  search <système> <base.db> <texte> [sortie]")
+        print("                               - PDF des créatures trouvées par texte intégral (et --where)")
+        print("  variants <système> [sortie] --levels 1-10 | --units 2-6")
+        print("                               - Variantes de niveau (COF Mini, Timothée) ou d'escouade (D&D)")
+        print("  simulate <système> <groupe.json> [créature[:nombre] ...]")
+        print("                               - Simule des rencontres (Monte Carlo) contre un groupe")
         print("  --list                       - Liste les créatures disponibles")
         print("")
+        print("Options:")
+        print("  --quiet, -q                  - N'affiche rien pendant la génération")
+        print("  --progress                   - Barre de progression sur une seule ligne")
+        print("  --report <fichier.jsonl>     - Écrit les événements en JSON lines ('-' pour stdout, messages sur stderr)")
+        print("  --deterministic              - PDF reproductibles à l'octet près (date fixe ou SOURCE_DATE_EPOCH)")
+        print(f"  --fit                        - Réduit le texte des fiches trop longues pour tenir sur une carte (min {DEFAULT_FIT_MIN_SIZE} pt)")
+        print("  --fit-min <pt>               - Ajustement avec une taille minimale du corps de texte personnalisée")
+        print("  --dice-average               - Affiche la moyenne après les dés de dégâts : 1d8+4 (8)")
+        print("  --hyphenate                  - Césure française des descriptions (moins de fiches sur deux cartes)")
+        print("  --size-report                - Profil de taille du PDF (sections, créatures, polices) en .size.json")
+        print("  --toc                        - Index par nom et par niveau, signets et destinations nommées")
+        print("  --draft                      - Brouillon rapide (polices standard, sans compression ni décor)")
+        print(f"  --combined                   - all : un seul PDF pour tous les systèmes ({COMBINED_OUTPUT})")
+        print(f"  --untrusted                  - Fiches non fiables : limites de taille et budget de {DEFAULT_TIME_BUDGET:g}s par fiche")
+        print("  --limits <fichier.json>      - Limites personnalisées (max_file_size, max_string_length, ...)")
+        print("  --time-budget <s>            - Budget de temps de rendu par fiche")
+        print("  --isolate                    - Mode service : chaque fiche est d'abord rendue dans un processus isolé")
+        print("  --jobs <n>                   - Nombre de processus pour build (défaut : manifeste ou nombre de CPU)")
+        print(f"  --shard-size <n>             - Créatures par tâche pour distribute (défaut {DEFAULT_SHARD_SIZE})")
+        print("  --workers <n>                - Workers lancés localement par distribute (défaut 0)")
+        print(f"  --idle <s>                   - Arrêt d'un worker après s secondes sans tâche (défaut {DEFAULT_WORKER_IDLE:g}, 0 : jamais)")
+        print("  --input <source>             - Dossier, fichier en masse (.json, .jsonl) ou '-' (entrée standard)")
+        print("  --where <requête>            - Restreint les créatures candidates (encounter, variants, search)")
+        print("  --levels <intervalle>        - Niveaux des variantes : 1-10 ou 2,4,6 (variants)")
+        print("  --units <intervalle>         - Tailles d'escouade des variantes : 2-6 (variants)")
+        print("  --rules <fichier.json>       - Règles d'évolution par niveau (hit_points_per_level, ...)")
+        print(f"  --max-creatures <n>          - Nombre maximal de créatures d'une rencontre (défaut {DEFAULT_MAX_CREATURES})")
+        print(f"  --trials <n>                 - Nombre de rencontres simulées (défaut {DEFAULT_TRIALS})")
+        print("  --seed <n>                   - Graine aléatoire de la simulation")
+        print(f"  --rounds <n>                 - Limite de rounds par rencontre (défaut {DEFAULT_MAX_ROUNDS})")
+        print("")
         print("Exemples:")
         print("  python main.py dnd")
         print("  python main.py swn output/")
+        print("  python main.py dnd - > DnD.pdf      (PDF sur la sortie standard)")
+        print("  python main.py dnd --input export.jsonl")
         print("  python main.py cofmini")
         print("  python main.py all")
+        print("  python main.py preview dnd")
+        print("  python main.py all --progress --report build.jsonl")
+        print("  python main.py all --combined --toc")
+        print("  python main.py calibrate")
+        print("  python main.py query cofmini 'niveau between 2 and 4 and pv >= 20'")
+        print("  python main.py encounter cofmini parties/groupe_exemple.json difficile --where 'niveau <= 4'")
+        print("  python main.py simulate dnd parties/groupe_exemple.json Gravejaw Sacapoint:2")
+        print("  python main.py variants cofmini --levels 1-10 --where 'niveau <= 3'")
+        print("  python main.py search cofmini bestiaire.db régénération --where 'niveau < 4'")
         print("  python main.py --list")
         return
     
-    command = sys.argv[1].lower()
+    command = args[0].lower()
     
     # Répertoire de sortie personnalisé ou par défaut
-    if len(sys.argv) >= 3 and not sys.argv[2].startswith('--'):
-        output_dir = sys.argv[2]
+    if len(args) >= 2 and not args[1].startswith('--'):
+        output_dir = args[1]
     else:
         output_dir = "output"
     
+    if options["deterministic"]:
+        # Date de création fixe : même entrée, même PDF à l'octet près
+        os.environ.setdefault("SOURCE_DATE_EPOCH", "0")
+    
+    if STDOUT in args[1:] and command == "all" and not options["combined"]:
+        print("❌ 'all' produit plusieurs PDF : la sortie standard ('-') n'accepte qu'un seul système.", file=sys.stderr)
+        return
+    if STDOUT in args[1:] and options["report"] == STDOUT:
+        print("❌ Le PDF est écrit sur la sortie standard ('-') : écrivez le rapport --report dans un fichier.",
+              file=sys.stderr)
+        return
+
+    # PDF ou rapport JSON lines sur la sortie standard : messages et avertissements
+    # affichés par print() passent sur stderr (le rapport garde la vraie sortie standard)
+    stdout_taken = STDOUT in args[1:] or options["report"] == STDOUT
+    reporter = build_reporter(options, sys.stderr if stdout_taken else None)
+    redirect = contextlib.redirect_stdout(sys.stderr) if stdout_taken else contextlib.nullcontext()
+    try:
+        with redirect:
+            if command == "simulate":
+                if len(args) < 3 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py simulate <{'|'.join(SYSTEMS)}> <groupe.json> [créature[:nombre] ...]")
+                    return
+                simulate_creatures(args[1], args[2], args[3:], options["trials"], options["seed"],
+                                   options["max_rounds"], reporter, options["card_options"], options["input"])
+            elif command == "query":
+                if len(args) < 3 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py query <{'|'.join(SYSTEMS)}> <requête> [repertoire_sortie]")
+                    return
+                query_creatures(args[1], args[2], args[3] if len(args) >= 4 else "output", reporter,
+                                options["fit"], options["card_options"])
+            elif command == "encounter":
+                if len(args) < 3 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py encounter <{'|'.join(SYSTEMS)}> <groupe.json> [difficulté] [repertoire_sortie]")
+                    return
+                encounter_creatures(args[1], args[2], args[3] if len(args) >= 4 else "moyenne",
+                                    args[4] if len(args) >= 5 else "output", options["where"],
+                                    options["max_creatures"], options["seed"], options["trials"],
+                                    reporter, options["fit"], options["card_options"])
+            elif command in ("import", "export"):
+                if len(args) < 3 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py {command} <{'|'.join(SYSTEMS)}> <base.db>"
+                          + (" [--input source]" if command == "import" else " [repertoire_sortie]"))
+                    return
+                if command == "import":
+                    import_creatures(args[1], args[2], options["input"], reporter, options["card_options"])
+                else:
+                    export_creatures(args[1], args[2], args[3] if len(args) >= 4 else "output", reporter)
+            elif command == "search":
+                if len(args) < 4 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py search <{'|'.join(SYSTEMS)}> <base.db> <texte> [repertoire_sortie] [--where requête]")
+                    return
+                search_creatures(args[1], args[2], args[3], args[4] if len(args) >= 5 else "output", options["where"],
+                                 reporter, options["fit"], options["card_options"])
+            elif command == "variants":
+                if len(args) < 2 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py variants <{'|'.join(SYSTEMS)}> [repertoire_sortie] --levels 1-10 | --units 2-6")
+                    return
+                variant_creatures(args[1], args[2] if len(args) >= 3 else "output", options["levels"], options["units"],
+                                  options["rules"], options["where"], reporter, options["fit"], options["card_options"],
+                                  options["input"])
+            elif command == "build":
+                if len(args) < 2:
+                    print("❌ Usage: python main.py build <manifeste.json> [--jobs n]")
+                    return
+                build_from_manifest(args[1], options["jobs"], reporter)
+            elif command == "distribute":
+                if len(args) < 3 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py distribute <{'|'.join(SYSTEMS)}> <file.db> [repertoire_sortie]")
+                    return
+                distribute_creatures(args[1], args[2], args[3] if len(args) >= 4 else "output", options["shard_size"],
+                                     options["workers"], reporter, options["fit"], options["card_options"])
+            elif command == "calibrate":
+                if len(args) >= 2 and args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py calibrate [{'|'.join(SYSTEMS)}] [--input source]")
+                    return
+                if len(args) < 2 and options["input"]:
+                    print("❌ --input n'accepte qu'un seul système : python main.py calibrate <système> --input source")
+                    return
+                calibrate_cost_model(args[1:2] or list(SYSTEMS), options["input"], reporter)
+            elif command == "worker":
+                if len(args) < 2:
+                    print("❌ Usage: python main.py worker <file.db> [--idle s]")
+                    return
+                work_queue(args[1], options["idle"], reporter)
+            elif command == "analyze":
+                if len(args) < 2 or args[1] not in SYSTEMS:
+                    print(f"❌ Usage: python main.py analyze <{'|'.join(SYSTEMS)}> [repertoire_sortie] [--input dossier]")
+                    return
+                analyze_creatures(args[1], args[2] if len(args) >= 3 else "output", options["input"], reporter,
+                                  options["card_options"])
+            else:
+                run_command(command, args, output_dir, reporter, options["fit"], options["card_options"], options["input"],
+                            options["combined"])
+    finally:
+        reporter.close()
+
+def run_command(command, args, output_dir, reporter, fit=None, card_options=None, source=None, combined=False):
+    """Exécute une commande de génération avec le rapporteur choisi
+
+    `source` (--input) remplace le dossier de créatures du système : dossier,
+    fichier en masse ou '-' pour l'entrée standard. Avec `combined`, 'all'
+    écrit un seul PDF pour tous les systèmes.
+    """
     if command == "dnd":
-        generate_dnd_creatures("dnd_creatures", output_dir)
+        generate_dnd_creatures(source or "dnd_creatures", output_dir, reporter, fit, card_options)
     elif command == "swn":
-        generate_swn_creatures("swn_creatures", output_dir)
+        generate_swn_creatures(source or "swn_creatures", output_dir, reporter, fit, card_options)
     elif command == "cofmini":
-        generate_cofmini_creatures("cofmini_creatures", output_dir)
+        generate_cofmini_creatures(source or "cofmini_creatures", output_dir, reporter, fit, card_options)
     elif command == "timothee":
-        generate_timothee_creatures("timothee_creatures", output_dir)
+        generate_timothee_creatures(source or "timothee_creatures", output_dir, reporter, fit, card_options)
+    elif command == "all" and source:
+        print("❌ 'all' lit les dossiers de chaque système : --input n'accepte qu'un seul système.")
+    elif command == "all" and combined:
+        reporter.message("🎲 Génération d'un PDF combiné pour tous les systèmes...\n")
+        generate_combined_creatures(output_dir, reporter, fit, card_options)
     elif command == "all":
-        print("🎲 Génération des fiches pour tous les systèmes...\n")
-        dnd_success = generate_dnd_creatures("dnd_creatures", output_dir)
-        print()  # Ligne vide entre les systèmes
-        swn_success = generate_swn_creatures("swn_creatures", output_dir)
-        print()  # Ligne vide entre les systèmes
-        cofmini_success = generate_cofmini_creatures("cofmini_creatures", output_dir)
+        reporter.message("🎲 Génération des fiches pour tous les systèmes...\n")
+        dnd_success = generate_dnd_creatures("dnd_creatures", output_dir, reporter, fit, card_options)
+        reporter.message("")  # Ligne vide entre les systèmes
+        swn_success = generate_swn_creatures("swn_creatures", output_dir, reporter, fit, card_options)
+        reporter.message("")  # Ligne vide entre les systèmes
+        cofmini_success = generate_cofmini_creatures("cofmini_creatures", output_dir, reporter, fit, card_options)
         
         successes = [dnd_success, swn_success, cofmini_success]
         if all(successes):
-            print("\n🎉 Tous les systèmes ont été générés avec succès!")
+            reporter.message("\n🎉 Tous les systèmes ont été générés avec succès!")
         elif any(successes):
-            print("\n⚠️  Certains systèmes ont été générés avec succès.")
+            reporter.message("\n⚠️  Certains systèmes ont été générés avec succès.")
         else:
-            print("\n❌ Aucun système n'a pu être généré.")
+            reporter.message("\n❌ Aucun système n'a pu être généré.")
+    elif command == "preview":
+        if len(args) < 2 or args[1] not in SYSTEMS:
+            print(f"❌ Usage: python main.py preview <{'|'.join(SYSTEMS)}> [repertoire_sortie]")
+            return
+        preview_output = args[2] if len(args) >= 3 else "output"
+        generate_preview_creatures(args[1], preview_output, reporter, fit, card_options)
     elif command == "--list":
         list_creatures()
     else:
@@ -175,7 +875,7 @@ def list_creatures():
             print(f"❌ '{directory}' n'est pas un répertoire.")
             continue
         
-        creature_files = list(creatures_dir.glob("*.json"))
+        creature_files = [path for path in creatures_dir.glob("*.json") if not path.name.startswith("_")]
         if not creature_files:
             print(f"❌ Aucun fichier JSON trouvé dans '{directory}'.")
             continue